@@ -0,0 +1,222 @@
+"""
+Notification throughput benchmark
+
+Starts a local SMTP sink, plays N bidders bidding on M auctions and delivers the resulting outbid and
+auction result emails through the same handlers and notification worker the outbox dispatcher uses.
+Reports messages per second, enqueue to delivery latency and SMTP connection churn.
+
+Run from the repository root (the email templates are loaded from there):
+
+    python -m benchmarks.notification_throughput --bidders 200 --auctions 50 --bids 400
+"""
+import argparse
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Dict, List
+
+
+class SMTPSink:
+    """ Minimal SMTP server that accepts everything and records when each recipient's message arrived """
+
+    def __init__(self, delay_ms: float = 0):
+        self.delay = delay_ms / 1000
+        self.loop = asyncio.new_event_loop()
+        self.server = None
+        self.port = None
+        self.connections = 0
+        self.messages = 0
+        self.delivered_at: Dict[str, float] = {}
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def start(self) -> int:
+        self.thread.start()
+        self.server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._session, "127.0.0.1", 0), self.loop
+        ).result()
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    def stop(self):
+        self.server.close()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    async def _session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        writer.write(b"220 sink ESMTP\r\n")
+        recipients: List[str] = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line[:4].upper()
+            if command == b"EHLO":
+                writer.write(b"250-sink\r\n250-8BITMIME\r\n250 SMTPUTF8\r\n")
+            elif command == b"RCPT":
+                recipients.append(line.split(b":", 1)[1].strip().strip(b"<>").decode())
+                writer.write(b"250 OK\r\n")
+            elif command == b"DATA":
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                await writer.drain()
+                while await reader.readline() not in (b".\r\n", b""):
+                    pass
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                received = time.perf_counter()
+                for recipient in recipients:
+                    self.delivered_at[recipient] = received
+                self.messages += 1
+                recipients = []
+                writer.write(b"250 OK\r\n")
+            elif command == b"RSET":
+                recipients = []
+                writer.write(b"250 OK\r\n")
+            elif command == b"QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:
+                # HELO, MAIL, NOOP
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+
+def simulate(bidders: int, auctions: int, bids: int, seed: int) -> List[tuple]:
+    """
+    Play `bids` random bids and close every auction
+
+    :return: (kind, payload) of every notification, in the order they would be queued
+    """
+    rng = random.Random(seed)
+    leaders: Dict[int, int] = {}
+    prices: Dict[int, int] = {}
+    seen: Dict[int, set] = {auction: set() for auction in range(auctions)}
+    notifications = []
+    for _ in range(bids):
+        auction = rng.randrange(auctions)
+        bidder = rng.randrange(bidders)
+        if leaders.get(auction) == bidder:
+            continue
+        prices[auction] = prices.get(auction, 100) + rng.randint(1, 50)
+        previous = leaders.get(auction)
+        leaders[auction] = bidder
+        seen[auction].add(bidder)
+        if previous is not None:
+            notifications.append(("outbid", {
+                "email_to": f"bidder{previous}@bench.local",
+                "item_name": f"Item {auction}",
+                "bid_amount": prices[auction],
+            }))
+    for auction, winner in leaders.items():
+        for bidder in seen[auction]:
+            notifications.append(("auction_result", {
+                "email": f"bidder{bidder}@bench.local",
+                "item_name": f"Item {auction}",
+                "amount": prices[auction],
+                "user_name": f"Bidder {bidder}",
+                "winner": bidder == winner,
+            }))
+    # every message gets its own recipient so the sink can match it back to its enqueue time
+    for number, (_, payload) in enumerate(notifications):
+        key = "email_to" if "email_to" in payload else "email"
+        payload[key] = payload[key].replace("@", f"+{number}@")
+    return notifications
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run(args) -> dict:
+    # the sink has to listen before the mail settings are read at import
+    sink = SMTPSink(args.sink_delay_ms)
+    port = sink.start()
+    os.environ.update({
+        "MAIL_SERVER": "127.0.0.1",
+        "MAIL_PORT": str(port),
+        "MAIL_TLS": "false",
+        "MAIL_FROM": "auctions@bench.local",
+        "MAIL_POOL_SIZE": str(args.pool_size),
+        "MAIL_RATE_PER_SECOND": str(args.rate),
+        "MAIL_MAX_MESSAGES_PER_CONNECTION": str(args.max_per_connection),
+    })
+    os.environ.pop("MAIL_USERNAME", None)
+
+    from src.common.utils.mailer import mail_pool
+    from src.common.utils.send_notification import send_bid_notification_email
+    from src.db.functions.notification_worker import NotificationWorker
+    from src.db.functions.task import send_winner_email_task
+
+    # one delivery per notification, as the Celery tasks do
+    handlers = {"outbid": send_bid_notification_email, "auction_result": send_winner_email_task}
+    notifications = simulate(args.bidders, args.auctions, args.bids, args.seed)
+    worker = NotificationWorker(queue_size=args.queue_size, concurrency=args.concurrency)
+    await worker.start()
+
+    enqueued_at: Dict[str, float] = {}
+    deliveries = []
+    started = time.perf_counter()
+    for number, (kind, payload) in enumerate(notifications):
+        if args.offered_rate:
+            await asyncio.sleep(max(0.0, started + number / args.offered_rate - time.perf_counter()))
+        recipient = payload.get("email_to") or payload["email"]
+        enqueued_at[recipient] = time.perf_counter()
+        deliveries.append(await worker.submit(handlers[kind], **payload))
+    results = await asyncio.gather(*deliveries, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    await worker.stop()
+    mail_pool.close()
+    sink.stop()
+
+    latencies = [
+        (sink.delivered_at[recipient] - queued) * 1000
+        for recipient, queued in enqueued_at.items()
+        if recipient in sink.delivered_at
+    ]
+    pool_stats = mail_pool.stats()
+    return {
+        "notifications": len(notifications),
+        "outbid": sum(1 for kind, _ in notifications if kind == "outbid"),
+        "auction_result": sum(1 for kind, _ in notifications if kind == "auction_result"),
+        "delivered": sink.messages,
+        "failed": sum(1 for result in results if isinstance(result, Exception)),
+        "seconds": elapsed,
+        "messages_per_second": sink.messages / elapsed if elapsed else 0.0,
+        "p50_latency_ms": percentile(latencies, 0.50),
+        "p99_latency_ms": percentile(latencies, 0.99),
+        "max_latency_ms": max(latencies, default=0.0),
+        "smtp_connections": sink.connections,
+        "messages_per_connection": sink.messages / sink.connections if sink.connections else 0.0,
+        "reconnects": pool_stats["reconnects"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure notification throughput against a local SMTP sink")
+    parser.add_argument("--bidders", type=int, default=200)
+    parser.add_argument("--auctions", type=int, default=50)
+    parser.add_argument("--bids", type=int, default=1000, help="bids placed before the auctions close")
+    parser.add_argument("--concurrency", type=int, default=8, help="notification worker consumers")
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--pool-size", type=int, default=4, help="SMTP connections")
+    parser.add_argument("--max-per-connection", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=0, help="messages per second, 0 for unlimited")
+    parser.add_argument("--offered-rate", type=float, default=0,
+                        help="notifications queued per second, 0 queues them all at once")
+    parser.add_argument("--sink-delay-ms", type=float, default=0, help="time the sink takes to accept a message")
+    parser.add_argument("--seed", type=int, default=1)
+    report = asyncio.run(run(parser.parse_args()))
+    width = max(len(name) for name in report)
+    for name, value in report.items():
+        print(f"{name:<{width}}  {value:.2f}" if isinstance(value, float) else f"{name:<{width}}  {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import asyncio
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
@@ -5,10 +7,22 @@ from starlette.middleware.cors import CORSMiddleware
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
-from src.common.utils.Schedulars_logging import job_wrapper
+from src.common.utils.Schedulars_logging import job_monitor
+from src.common.utils.image_derivatives import derivative_cache
+from src.common.utils.constants import ARCHIVE_INTERVAL_HOURS, OUTBID_DEBOUNCE_SECONDS, OUTBID_DIGEST_POLL_SECONDS, OUTBOX_IN_PROCESS, \
+    NOTIFICATION_BACKEND
 from src.common.utils.user_defined_errors import DataBaseErrors, FileErrors
+from src.db.functions.archive import archive_completed_bids
+from src.db.functions.auction_event_listener import auction_event_listener
+from src.db.functions.bidder_index import send_outbid_digests
+from src.db.functions.notification_worker import notification_worker
+from src.db.functions.outbox import outbox_dispatcher
+from src.db.functions.declare_auction_winner import check_and_finalize_ended_auctions
+from src.db.functions.live_catalog import live_catalog
 from src.db.functions.scheduler import update_item_statuses
-from src.resources import bidding, bid_history
+from src.db.functions.transitions import transition_scheduler
+from src.db.leader import scheduler_lease
+from src.resources import bidding, bid_history, admin, images
 # from src.resources.auction import auction_router
 from src.resources.item import item_router
 from src.resources.sign_up import add_user_router
@@ -37,15 +51,63 @@ app.include_router(item_router, prefix="/api/item")
 # app.include_router(auction_router, prefix="/api/auction")
 app.include_router(bidding.router, prefix="/api/bidding")
 app.include_router(bid_history.router, prefix="/api/bid-history", tags=["Bid History"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
+app.include_router(images.router, prefix="/api/images", tags=["Images"])
 
 scheduler = AsyncIOScheduler()
-scheduler.add_job(job_wrapper, IntervalTrigger(seconds=60))
+job_monitor.attach(scheduler)
+job_monitor.add_job(scheduler, "update_item_statuses", update_item_statuses, IntervalTrigger(seconds=60))
+job_monitor.add_job(scheduler, "finalize_ended_auctions", check_and_finalize_ended_auctions, IntervalTrigger(seconds=60))
+job_monitor.add_job(scheduler, "archive_completed_bids", archive_completed_bids, IntervalTrigger(hours=ARCHIVE_INTERVAL_HOURS))
+if OUTBID_DEBOUNCE_SECONDS:
+    job_monitor.add_job(scheduler, "send_outbid_digests", send_outbid_digests,
+                        IntervalTrigger(seconds=OUTBID_DIGEST_POLL_SECONDS))
+
+background_workers = []
+leader_jobs = []
+
+
+async def start_leader_jobs():
+    app.state.stop_leader_jobs = asyncio.Event()
+    leader_jobs.append(asyncio.create_task(transition_scheduler.run(app.state.stop_leader_jobs)))
+    scheduler.resume()
+
+
+async def stop_leader_jobs():
+    scheduler.pause()
+    app.state.stop_leader_jobs.set()
+    await asyncio.gather(*leader_jobs, return_exceptions=True)
+    leader_jobs.clear()
+
+
+# auction housekeeping runs in exactly one worker across every node, the scheduler lease holder
+scheduler_lease.on_acquired.append(start_leader_jobs)
+scheduler_lease.on_lost.append(stop_leader_jobs)
+
 
 @app.on_event("startup")
 async def start_scheduler():
     logger.info("Starting scheduler...")
-    scheduler.start()
-    logger.info("Scheduler started.")
+    scheduler.start(paused=True)
+    logger.info("Scheduler started, waiting for the leader lease.")
+    app.state.stop_workers = asyncio.Event()
+    background_workers.append(asyncio.create_task(scheduler_lease.run(app.state.stop_workers)))
+    background_workers.append(asyncio.create_task(auction_event_listener.run(app.state.stop_workers)))
+    background_workers.append(asyncio.create_task(live_catalog.run(app.state.stop_workers)))
+    derivative_cache.start()
+    if OUTBOX_IN_PROCESS:
+        if NOTIFICATION_BACKEND != "celery":
+            await notification_worker.start()
+        background_workers.append(asyncio.create_task(outbox_dispatcher.run(app.state.stop_workers)))
+
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    app.state.stop_workers.set()
+    await asyncio.gather(*background_workers, return_exceptions=True)
+    # deliveries still queued get their chance to finish, anything cut short stays leased in the outbox
+    await notification_worker.stop()
+    derivative_cache.stop()
 
 app.add_exception_handler(DataBaseErrors, database_error_handler)
 app.add_exception_handler(FileErrors, file_error_handler)
@@ -16,6 +16,8 @@ export interface AuctionItem {
   user_id: number;
   won_by?: number | null;
   image_url?: string | null;
+  thumbnail_url?: string | null;
+  medium_url?: string | null;
 }
 
 export interface Bid {
@@ -20,6 +20,8 @@ export default function AuctionCard({ item, featured = false }: AuctionCardProps
     name,
     description,
     image_url,
+    thumbnail_url,
+    medium_url,
     current_bid,
     start_price,
     end_time,
@@ -29,8 +31,8 @@ export default function AuctionCard({ item, featured = false }: AuctionCardProps
   // Calculate current price
   const currentPrice = current_bid || start_price;
   
-  // Placeholder image if none provided
-  const imageSrc = image_url || '/images/placeholder.jpg';
+  // Resized copy for the card, placeholder image if none provided
+  const imageSrc = (featured ? medium_url : thumbnail_url) || image_url || '/images/placeholder.jpg';
 
   return (
     <motion.div
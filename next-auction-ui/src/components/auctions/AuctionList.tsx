@@ -47,7 +47,7 @@ export default function AuctionList({ auctions }: AuctionListProps) {
             <div className="h-48 bg-gray-200 flex items-center justify-center">
               {auction.image_url ? (
                 <img 
-                  src={auction.image_url} 
+                  src={auction.thumbnail_url || auction.image_url} 
                   alt={auction.name} 
                   className="w-full h-full object-cover"
                 />
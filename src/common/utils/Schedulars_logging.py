@@ -1,11 +1,124 @@
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional
+
+from apscheduler.events import EVENT_JOB_SUBMITTED, EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+
 from src.common.utils.error_handlers import logger
-from src.db.functions.scheduler import update_item_statuses
 
 
-def job_wrapper():
+class JobStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.runs = 0
+        self.failures = 0
+        self.skipped_overlaps = 0
+        self.missed = 0
+        self.coalesced = 0
+        self.running = False
+        self.rows_total = 0
+        self.last_rows: Optional[int] = None
+        self.last_started: Optional[datetime] = None
+        self.last_duration_seconds = 0.0
+        self.max_duration_seconds = 0.0
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self.last_error: Optional[str] = None
+        self.scheduled_for: Optional[datetime] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped_overlaps": self.skipped_overlaps,
+            "missed": self.missed,
+            "coalesced": self.coalesced,
+            "running": self.running,
+            "rows_total": self.rows_total,
+            "last_rows": self.last_rows,
+            "last_started": self.last_started,
+            "last_duration_seconds": self.last_duration_seconds,
+            "max_duration_seconds": self.max_duration_seconds,
+            "last_lag_seconds": self.last_lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+            "last_error": self.last_error,
+        }
+
+
+def _count_rows(result) -> Optional[int]:
+    """ jobs return the number of rows they touched or the rows themselves """
+    if isinstance(result, bool) or result is None:
+        return None
+    if isinstance(result, int):
+        return result
     try:
-        logger.info("Running job: update_item_statuses")
-        update_item_statuses()
-        logger.info("Job completed: update_item_statuses")
-    except Exception as e:
-        logger.error(f"Error running update_item_statuses: {e}")
\ No newline at end of file
+        return len(result)
+    except TypeError:
+        return None
+
+
+class JobMonitor:
+    """
+    Runs coroutine jobs on an APScheduler scheduler and keeps per job metrics
+
+    Every job is added with max_instances=1, a run that comes due while the previous one is still
+    going is skipped, and coalesce=True, runs missed while the loop was busy (or the scheduler
+    paused) collapse into one. Lag is the time between the run's scheduled time and its start.
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, JobStats] = {}
+
+    def attach(self, scheduler):
+        scheduler.add_listener(self._on_event, EVENT_JOB_SUBMITTED | EVENT_JOB_MAX_INSTANCES | EVENT_JOB_MISSED)
+
+    def add_job(self, scheduler, name: str, func: Callable[[], Awaitable], trigger, **kwargs):
+        self.jobs[name] = JobStats(name)
+        # a late run still happens, once, instead of being dropped after the default 1s of grace
+        kwargs.setdefault("misfire_grace_time", None)
+        scheduler.add_job(self._run, trigger, args=[name, func], id=name, name=name,
+                          max_instances=1, coalesce=True, **kwargs)
+
+    def _on_event(self, event):
+        stats = self.jobs.get(event.job_id)
+        if stats is None:
+            return
+        if event.code == EVENT_JOB_SUBMITTED:
+            stats.scheduled_for = event.scheduled_run_times[-1]
+            stats.coalesced += len(event.scheduled_run_times) - 1
+        elif event.code == EVENT_JOB_MAX_INSTANCES:
+            stats.skipped_overlaps += 1
+            logger.warning(f"Job {event.job_id} still running, skipped a run")
+        elif event.code == EVENT_JOB_MISSED:
+            stats.missed += 1
+            logger.warning(f"Job {event.job_id} missed its run at {event.scheduled_run_time}")
+
+    async def _run(self, name: str, func: Callable[[], Awaitable]):
+        stats = self.jobs[name]
+        stats.running = True
+        stats.last_started = datetime.now(timezone.utc)
+        if stats.scheduled_for is not None:
+            stats.last_lag_seconds = max(0.0, (stats.last_started - stats.scheduled_for).total_seconds())
+            stats.max_lag_seconds = max(stats.max_lag_seconds, stats.last_lag_seconds)
+        started = time.monotonic()
+        logger.info(f"Running job: {name}")
+        try:
+            stats.last_rows = _count_rows(await func())
+            stats.rows_total += stats.last_rows or 0
+            stats.last_error = None
+            logger.info(f"Job completed: {name}, {stats.last_rows} rows")
+        except Exception as e:
+            stats.failures += 1
+            stats.last_error = str(e) or type(e).__name__
+            logger.error(f"Error running {name}: {e}")
+        finally:
+            stats.runs += 1
+            stats.running = False
+            stats.last_duration_seconds = time.monotonic() - started
+            stats.max_duration_seconds = max(stats.max_duration_seconds, stats.last_duration_seconds)
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: stats.as_dict() for name, stats in self.jobs.items()}
+
+
+job_monitor = JobMonitor()
@@ -1,6 +1,5 @@
 import os
 from dotenv import load_dotenv
-from fastapi_mail import ConnectionConfig
 from pathlib import Path
 
 load_dotenv()
@@ -19,22 +18,116 @@ ASYNC_DB_CONNECTION_LINK = "postgresql+asyncpg://{}:{}@{}/{}".format(
     os.getenv("DATABASE_DB"),
 )
 
+# Optional read replica, read-only endpoints are routed to it while its lag
+# stays under REPLICA_MAX_LAG_SECONDS
+REPLICA_DB_CONNECTION_LINK = None
+ASYNC_REPLICA_DB_CONNECTION_LINK = None
+if os.getenv("DATABASE_REPLICA_URL"):
+    REPLICA_DB_CONNECTION_LINK = "postgresql://{}:{}@{}/{}".format(
+        os.getenv("DATABASE_USER"),
+        os.getenv("DATABASE_PASS"),
+        os.getenv("DATABASE_REPLICA_URL"),
+        os.getenv("DATABASE_DB"),
+    )
+    ASYNC_REPLICA_DB_CONNECTION_LINK = "postgresql+asyncpg://{}:{}@{}/{}".format(
+        os.getenv("DATABASE_USER"),
+        os.getenv("DATABASE_PASS"),
+        os.getenv("DATABASE_REPLICA_URL"),
+        os.getenv("DATABASE_DB"),
+    )
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", 5))
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", 1))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 10))
+
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
 
-CONF = ConnectionConfig(
-    MAIL_USERNAME=os.getenv("MAIL_USERNAME"),
-    MAIL_PASSWORD=os.getenv("MAIL_PASSWORD"),
-    MAIL_FROM=os.getenv("MAIL_FROM"),
-    MAIL_PORT=int(os.getenv("MAIL_PORT")),
-    MAIL_SERVER=os.getenv("MAIL_SERVER"),
-    MAIL_TLS=True,
-    USE_CREDENTIALS=os.getenv("USE_CREDENTIALS"),
-    TEMPLATE_FOLDER=Path("src/bid email").parent
-)
+MAIL_SERVER = os.getenv("MAIL_SERVER")
+MAIL_PORT = int(os.getenv("MAIL_PORT", 587))
+MAIL_USERNAME = os.getenv("MAIL_USERNAME")
+MAIL_PASSWORD = os.getenv("MAIL_PASSWORD")
+MAIL_FROM = os.getenv("MAIL_FROM")
+MAIL_TLS = os.getenv("MAIL_TLS", "true").lower() == "true"
+MAIL_POOL_SIZE = int(os.getenv("MAIL_POOL_SIZE", 4))
+# provider limits, 0 means unlimited
+MAIL_RATE_PER_SECOND = float(os.getenv("MAIL_RATE_PER_SECOND", 0))
+MAIL_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("MAIL_MAX_MESSAGES_PER_CONNECTION", 100))
+MAIL_IDLE_CHECK_SECONDS = int(os.getenv("MAIL_IDLE_CHECK_SECONDS", 30))
+EMAIL_TEMPLATE_FOLDER = Path("src/bid email")
+# rendered blocks shared by many recipients (e.g. the result block of one auction)
+EMAIL_BLOCK_CACHE_SIZE = int(os.getenv("EMAIL_BLOCK_CACHE_SIZE", 256))
+
+# uploads are streamed to disk in chunks of this size, larger files are rejected
+BYTES_PER_CHUNK = int(os.getenv("BYTES_PER_CHUNK", 1024 * 1024))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 20 * 1024 * 1024))
+
+OUTBOX_IN_PROCESS = os.getenv("OUTBOX_IN_PROCESS", "true").lower() == "true"
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 100))
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", 10))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 5))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", 1))
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", 60))
+
+# "inprocess" delivers notifications from an asyncio worker inside the dispatcher's process,
+# "celery" hands them to the Celery workers through the broker
+NOTIFICATION_BACKEND = os.getenv("NOTIFICATION_BACKEND", "inprocess").lower()
+NOTIFICATION_QUEUE_SIZE = int(os.getenv("NOTIFICATION_QUEUE_SIZE", 1000))
+NOTIFICATION_CONCURRENCY = int(os.getenv("NOTIFICATION_CONCURRENCY", 8))
+NOTIFICATION_DRAIN_SECONDS = float(os.getenv("NOTIFICATION_DRAIN_SECONDS", 30))
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", CELERY_BROKER_URL)
+
+# outbid events of a user are collected for this long and sent as one digest, 0 emails every outbid
+OUTBID_DEBOUNCE_SECONDS = int(os.getenv("OUTBID_DEBOUNCE_SECONDS", 60))
+OUTBID_DIGEST_POLL_SECONDS = int(os.getenv("OUTBID_DIGEST_POLL_SECONDS", 5))
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 2000))
 
-BYTES_PER_CHUNK = 1000
+ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", 90))
+ARCHIVE_BATCH_ITEMS = int(os.getenv("ARCHIVE_BATCH_ITEMS", 100))
+ARCHIVE_INTERVAL_HOURS = int(os.getenv("ARCHIVE_INTERVAL_HOURS", 24))
+
+# scheduler jobs run only in the worker holding the leader lease, followers retry and the
+# leader refreshes its lease this often
+LEADER_HEARTBEAT_SECONDS = float(os.getenv("LEADER_HEARTBEAT_SECONDS", 5))
+
+# ended auctions closed per transaction
+FINALIZE_BATCH_SIZE = int(os.getenv("FINALIZE_BATCH_SIZE", 500))
+
+# soft close: a bid placed within SOFT_CLOSE_WINDOW_SECONDS of the end pushes the end back by
+# SOFT_CLOSE_EXTENSION_SECONDS, at most SOFT_CLOSE_MAX_EXTENSIONS times per auction (0 for no cap),
+# a window or extension of 0 turns it off
+SOFT_CLOSE_WINDOW_SECONDS = int(os.getenv("SOFT_CLOSE_WINDOW_SECONDS", 0))
+SOFT_CLOSE_EXTENSION_SECONDS = int(os.getenv("SOFT_CLOSE_EXTENSION_SECONDS", 0))
+SOFT_CLOSE_MAX_EXTENSIONS = int(os.getenv("SOFT_CLOSE_MAX_EXTENSIONS", 0))
+
+# auction start/end timers are rebuilt from the database this often, catching edits made by other processes
+TRANSITION_RESYNC_SECONDS = int(os.getenv("TRANSITION_RESYNC_SECONDS", 300))
+
+# items read by the item endpoints and bid checks stay in each worker's cache at most this long,
+# writers tell the other workers to drop or update their copy right away
+ITEM_CACHE_SIZE = int(os.getenv("ITEM_CACHE_SIZE", 10000))
+ITEM_CACHE_TTL_SECONDS = float(os.getenv("ITEM_CACHE_TTL_SECONDS", 30))
+
+# each worker's in-memory catalogue of live items is compared with the database this often,
+# differences are read again
+LIVE_CATALOG_CHECK_SECONDS = float(os.getenv("LIVE_CATALOG_CHECK_SECONDS", 30))
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", 50))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 200))
 
 FILE_FOLDER_PATH = os.path.join(os.getcwd(), 'files')
+
+# resized copies of item images, generated in IMAGE_WORKERS processes and evicted least recently
+# used first once the folder grows past IMAGE_CACHE_MAX_BYTES
+DERIVATIVE_FOLDER_PATH = os.path.join(FILE_FOLDER_PATH, 'derived')
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+IMAGE_THUMB_SIZE = int(os.getenv("IMAGE_THUMB_SIZE", 240))
+IMAGE_MEDIUM_SIZE = int(os.getenv("IMAGE_MEDIUM_SIZE", 960))
+# prefix of the image urls in item payloads, e.g. a CDN in front of the api
+IMAGE_BASE_URL = os.getenv("IMAGE_BASE_URL", "/api/images")
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+from markupsafe import Markup
+
+from src.common.utils.constants import EMAIL_TEMPLATE_FOLDER, EMAIL_BLOCK_CACHE_SIZE
+from src.common.utils.error_handlers import logger
+
+
+def _cache_key(name: str, context: dict) -> tuple:
+    return (name,) + tuple(sorted((key, repr(value)) for key, value in context.items()))
+
+
+class EmailTemplates:
+    """
+    Email templates compiled once and kept in memory
+
+    Every template of the folder is compiled by `load()` and never checked on disk again.
+    Blocks that are the same for many recipients (an auction's result, say) are rendered once
+    and kept in a small LRU cache, each recipient's email then only renders its own part.
+    """
+
+    def __init__(self, folder: Path = EMAIL_TEMPLATE_FOLDER, block_cache_size: int = EMAIL_BLOCK_CACHE_SIZE):
+        self.env = Environment(
+            loader=FileSystemLoader(str(folder)),
+            autoescape=select_autoescape(["html"]),
+            auto_reload=False,
+            cache_size=-1,
+        )
+        self.block_cache_size = block_cache_size
+        self.templates: Dict[str, Template] = {}
+        self.blocks: "OrderedDict[tuple, Markup]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.renders = 0
+        self.render_seconds = 0.0
+        self.block_hits = 0
+        self.block_misses = 0
+        self.load_seconds = 0.0
+
+    def load(self):
+        started = time.monotonic()
+        templates = {name: self.env.get_template(name) for name in self.env.list_templates(extensions=["html"])}
+        self.templates = templates
+        self.load_seconds = time.monotonic() - started
+        logger.info(f"Compiled {len(templates)} email templates in {self.load_seconds:.3f}s")
+
+    def get(self, name: str) -> Template:
+        template = self.templates.get(name)
+        if template is None:
+            # not there at startup, compiled once and kept like the others
+            template = self.templates[name] = self.env.get_template(name)
+        return template
+
+    def block(self, name: str, **context) -> Markup:
+        """ Render a shared block, cached on its name and context """
+        key = _cache_key(name, context)
+        with self.lock:
+            cached = self.blocks.get(key)
+            if cached is not None:
+                self.blocks.move_to_end(key)
+                self.block_hits += 1
+                return cached
+            self.block_misses += 1
+        rendered = Markup(self._render(name, context))
+        with self.lock:
+            self.blocks[key] = rendered
+            while len(self.blocks) > self.block_cache_size:
+                self.blocks.popitem(last=False)
+        return rendered
+
+    def _render(self, name: str, context: dict) -> str:
+        started = time.perf_counter()
+        html = self.get(name).render(**context)
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.renders += 1
+            self.render_seconds += elapsed
+        return html
+
+    def render(self, name: str, **context) -> str:
+        return self._render(name, context)
+
+    def render_batch(self, name: str, recipients: Iterable[dict], shared: Optional[dict] = None,
+                     blocks: Optional[Dict[str, str]] = None) -> List[str]:
+        """
+        Render `name` for every recipient
+
+        :param recipients: per recipient context
+        :param shared: context common to all recipients
+        :param blocks: variable name -> block template, rendered once with `shared`
+        """
+        shared = dict(shared or {})
+        for variable, block_name in (blocks or {}).items():
+            shared[variable] = self.block(block_name, **shared)
+        return [self._render(name, {**shared, **recipient}) for recipient in recipients]
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "templates": len(self.templates),
+                "load_seconds": self.load_seconds,
+                "renders": self.renders,
+                "render_seconds": self.render_seconds,
+                "avg_render_ms": self.render_seconds / self.renders * 1000 if self.renders else 0.0,
+                "block_cache_hits": self.block_hits,
+                "block_cache_misses": self.block_misses,
+                "block_cache_size": len(self.blocks),
+            }
+
+
+email_templates = EmailTemplates()
+email_templates.load()
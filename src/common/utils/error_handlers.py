@@ -12,7 +12,7 @@ def database_error_handler(_: Request, exc: DataBaseErrors) -> JSONResponse:
 
 
 def file_error_handler(request: Request, exc: FileErrors) -> JSONResponse:
-    logging.info(f"File not found: {request.path_params['filename']}")
+    logging.info(f"{exc.type}: {request.path_params.get('filename', request.url.path)}")
     return JSONResponse(content={'details': exc.message}, status_code=exc.response_code)
 
 
@@ -0,0 +1,31 @@
+import hashlib
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+# api responses are per user and change any time, clients keep them but ask before reusing them
+REVALIDATE_PRIVATE = "private, no-cache"
+
+
+def version_etag(*parts) -> str:
+    """ Weak ETag of a response identified by the versions of what it was built from """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """ If-None-Match comparison, which is weak """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return any((tag[2:] if tag.startswith("W/") else tag) == bare for tag in map(str.strip, header.split(",")))
+
+
+def not_modified(request: Request, etag: str, cache_control: str = REVALIDATE_PRIVATE) -> Optional[Response]:
+    """ 304 when the client already holds this version """
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"etag": etag, "cache-control": cache_control})
+    return None
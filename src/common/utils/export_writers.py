@@ -0,0 +1,101 @@
+import csv
+import io
+import json
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# (column name, type) with type one of int, string, timestamp (naive UTC) or timestamptz
+Columns = Sequence[Tuple[str, str]]
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _csv_value(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def write_csv(batches: Iterable[List[tuple]], columns: Columns) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    for batch in batches:
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def write_ndjson(batches: Iterable[List[tuple]], columns: Columns) -> Iterator[bytes]:
+    names = [name for name, _ in columns]
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(names, row)), default=_csv_value) + "\n" for row in batch
+        ).encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """ Write only file handed to the parquet writer, collects what was written since the last drain """
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def write_parquet(batches: Iterable[List[tuple]], columns: Columns) -> Iterator[bytes]:
+    """ One parquet row group per batch, each flushed to the client as soon as it is encoded """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {
+        "int": pa.int64(),
+        "string": pa.string(),
+        "timestamp": pa.timestamp("us"),
+        "timestamptz": pa.timestamp("us", tz="UTC"),
+    }
+    schema = pa.schema([(name, types[type_name]) for name, type_name in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in batches:
+            arrays = [pa.array([row[i] for row in batch], type=field.type) for i, field in enumerate(schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+WRITERS = {
+    "csv": write_csv,
+    "ndjson": write_ndjson,
+    "parquet": write_parquet,
+}
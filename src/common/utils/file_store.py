@@ -0,0 +1,103 @@
+import hashlib
+import os
+import re
+import tempfile
+from typing import BinaryIO, Optional, Tuple
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from src.common.utils.constants import FILE_FOLDER_PATH, BYTES_PER_CHUNK, MAX_UPLOAD_BYTES
+from src.common.utils.user_defined_errors import FileTooLarge
+
+EXTENSION = re.compile(r"^\.[a-z0-9]{1,8}$")
+
+
+def stored_name(digest: str, filename: Optional[str]) -> str:
+    """ sha256 of the content plus the upload's extension, which tells later readers the file type """
+    extension = os.path.splitext(os.path.basename(filename or ""))[1].lower()
+    return digest + (extension if EXTENSION.match(extension) else "")
+
+
+class ContentStore:
+    """
+    Content-addressed file storage, files are named after the sha256 of their bytes so an image
+    uploaded any number of times is stored once
+
+    The content is copied `chunk_size` bytes at a time into a temporary file of the same folder
+    and hashed on the way, then renamed to its final name with `os.replace`, readers never see a
+    partial file and an upload over `max_bytes` leaves nothing behind. Saving is blocking, the
+    async entry point runs it in the threadpool.
+    """
+
+    def __init__(self, folder: str = FILE_FOLDER_PATH, chunk_size: int = BYTES_PER_CHUNK,
+                 max_bytes: int = MAX_UPLOAD_BYTES):
+        self.folder = folder
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.stored = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.bytes_written = 0
+
+    def save(self, stream: BinaryIO, filename: Optional[str] = None) -> str:
+        """
+        :param stream: binary file object, read until exhausted
+        :param filename: original name, only its extension is kept
+        :return: path of the stored file
+        """
+        return self.store(stream, filename)[0]
+
+    def store(self, stream: BinaryIO, filename: Optional[str] = None) -> Tuple[str, bool]:
+        """ `save`, also telling whether this call created the file or found the same content stored """
+        os.makedirs(self.folder, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.folder, prefix=".upload-")
+        try:
+            digest = hashlib.sha256()
+            size = 0
+            with os.fdopen(fd, "wb") as temp:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        self.rejected += 1
+                        raise FileTooLarge(f"File is larger than {self.max_bytes} bytes.")
+                    digest.update(chunk)
+                    temp.write(chunk)
+            path = os.path.join(self.folder, stored_name(digest.hexdigest(), filename))
+            if os.path.exists(path):
+                os.remove(temp_path)
+                self.deduplicated += 1
+                return path, False
+            # atomic, a concurrent upload of the same bytes replaces it with identical content
+            os.replace(temp_path, path)
+            self.stored += 1
+            self.bytes_written += size
+            return path, True
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def discard(self, path: str):
+        """ Remove a stored file nothing refers to """
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    async def save_upload(self, upload: UploadFile) -> str:
+        return await run_in_threadpool(self.save, upload.file, upload.filename)
+
+    def stats(self) -> dict:
+        return {
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "bytes_written": self.bytes_written,
+        }
+
+
+content_store = ContentStore()
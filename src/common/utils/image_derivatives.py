@@ -0,0 +1,246 @@
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from src.common.utils.constants import (
+    FILE_FOLDER_PATH,
+    DERIVATIVE_FOLDER_PATH,
+    IMAGE_WORKERS,
+    IMAGE_CACHE_MAX_BYTES,
+    IMAGE_THUMB_SIZE,
+    IMAGE_MEDIUM_SIZE,
+    IMAGE_BASE_URL,
+)
+from src.common.utils.error_handlers import logger
+from src.common.utils.user_defined_errors import FileNotFound, InvalidImage
+
+# derivative name -> longest side in pixels
+IMAGE_SIZES = {"thumb": IMAGE_THUMB_SIZE, "medium": IMAGE_MEDIUM_SIZE}
+DERIVATIVE_FORMAT = ("WEBP", ".webp")
+# a cache hit bumps the file's mtime, the eviction order, at most this often
+TOUCH_SECONDS = 3600
+# eviction goes this far under the limit so it doesn't run again on the next write
+EVICT_TO = 0.9
+
+
+def pillow_available() -> bool:
+    try:
+        import PIL.Image  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def image_urls(filepath: Optional[str]) -> dict:
+    """ Urls of an item's original image and of every derivative, for item payloads """
+    urls = {"image_url": None, "thumbnail_url": None, "medium_url": None}
+    if filepath:
+        name = os.path.basename(filepath)
+        urls["image_url"] = f"{IMAGE_BASE_URL}/{name}"
+        urls["thumbnail_url"] = f"{IMAGE_BASE_URL}/thumb/{name}"
+        urls["medium_url"] = f"{IMAGE_BASE_URL}/medium/{name}"
+    return urls
+
+
+def render_derivative(source: str, target: str, max_side: int) -> int:
+    """
+    Runs in a worker process, scales `source` to fit `max_side` and writes it to `target`
+
+    :return: size of the written file
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        # JPEGs are decoded straight at a reduced scale, much less work for large photos
+        image.draft("RGB", (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side))
+        if image.mode not in ("RGB", "RGBA"):
+            transparent = image.mode in ("LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if transparent else "RGB")
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".render-")
+        try:
+            with os.fdopen(fd, "wb") as temp:
+                image.save(temp, DERIVATIVE_FORMAT[0], quality=80)
+            os.replace(temp_path, target)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    return os.path.getsize(target)
+
+
+class DerivativeCache:
+    """
+    Resized copies of the stored images, kept on disk under `<folder>/<size>/<source name>.webp`
+
+    A derivative is rendered in a process pool when its image is uploaded or, at the latest, on
+    its first request, concurrent requests for the same one share a single render. The folder
+    is kept under `max_bytes` by removing the least recently used files, a file's mtime being
+    bumped when it is served.
+    """
+
+    def __init__(self, source_folder: str = FILE_FOLDER_PATH, folder: str = DERIVATIVE_FOLDER_PATH,
+                 sizes: Optional[Dict[str, int]] = None, max_bytes: int = IMAGE_CACHE_MAX_BYTES,
+                 workers: int = IMAGE_WORKERS):
+        self.source_folder = source_folder
+        self.folder = folder
+        self.sizes = sizes or IMAGE_SIZES
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.background: Set[asyncio.Future] = set()
+        self.size_bytes: Optional[int] = None
+        self.evicting = False
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.failures = 0
+        self.evicted = 0
+
+    def start(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def stop(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def source_path(self, name: str) -> str:
+        # names come from urls, nothing outside the folder can be reached
+        if not name or os.path.basename(name) != name or name.startswith("."):
+            raise FileNotFound()
+        path = os.path.join(self.source_folder, name)
+        if not os.path.isfile(path):
+            raise FileNotFound()
+        return path
+
+    def path(self, size: str, name: str) -> str:
+        return os.path.join(self.folder, size, os.path.splitext(name)[0] + DERIVATIVE_FORMAT[1])
+
+    async def get(self, size: str, name: str) -> str:
+        """
+        :return: path of the `size` derivative of the stored image `name`, the original itself
+            when Pillow isn't installed
+        """
+        if size not in self.sizes:
+            raise FileNotFound()
+        source = self.source_path(name)
+        if not pillow_available():
+            return source
+        target = self.path(size, name)
+        try:
+            stat = os.stat(target)
+        except FileNotFoundError:
+            self.misses += 1
+            return await self._generate(source, target, self.sizes[size])
+        self.hits += 1
+        if time.time() - stat.st_mtime > TOUCH_SECONDS:
+            os.utime(target)
+        return target
+
+    def schedule(self, filepath: str):
+        """ Render every derivative of a new upload in the background """
+        if not pillow_available():
+            return
+        name = os.path.basename(filepath)
+        for size, max_side in self.sizes.items():
+            target = self.path(size, name)
+            if os.path.exists(target):
+                continue
+            task = asyncio.ensure_future(self._generate(filepath, target, max_side))
+            self.background.add(task)
+            task.add_done_callback(self._background_done)
+
+    def _background_done(self, task: asyncio.Future):
+        self.background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Background image derivative failed: {task.exception()}")
+
+    async def _generate(self, source: str, target: str, max_side: int) -> str:
+        task = self.inflight.get(target)
+        if task is None:
+            task = asyncio.ensure_future(self._render(source, target, max_side))
+            self.inflight[target] = task
+            task.add_done_callback(lambda _: self.inflight.pop(target, None))
+        # a cancelled request must not cancel the render other requests wait for
+        return await asyncio.shield(task)
+
+    async def _render(self, source: str, target: str, max_side: int) -> str:
+        self.start()
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            written = await asyncio.get_running_loop().run_in_executor(
+                self.executor, render_derivative, source, target, max_side
+            )
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Could not render {target} from {source}: {e}")
+            raise InvalidImage()
+        self.generated += 1
+        await self._account(written)
+        return target
+
+    async def _account(self, written: int):
+        if self.size_bytes is None:
+            # first write since start, the files already there count too
+            self.size_bytes = sum(size for _, size, _ in await run_in_threadpool(self._files))
+        else:
+            self.size_bytes += written
+        if self.size_bytes > self.max_bytes and not self.evicting:
+            self.evicting = True
+            try:
+                self.size_bytes = await run_in_threadpool(self._evict)
+            finally:
+                self.evicting = False
+
+    def _files(self) -> List[Tuple[float, int, str]]:
+        """ (mtime, size, path) of every derivative """
+        files = []
+        for directory, _, names in os.walk(self.folder):
+            for name in names:
+                if name.startswith("."):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _evict(self) -> int:
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evicted += 1
+        return total
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "generated": self.generated,
+            "failures": self.failures,
+            "evicted": self.evicted,
+            "rendering": len(self.inflight),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+derivative_cache = DerivativeCache()
@@ -0,0 +1,202 @@
+import queue
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+from typing import List, Optional
+
+from src.common.utils.constants import (
+    MAIL_SERVER,
+    MAIL_PORT,
+    MAIL_USERNAME,
+    MAIL_PASSWORD,
+    MAIL_TLS,
+    MAIL_POOL_SIZE,
+    MAIL_RATE_PER_SECOND,
+    MAIL_MAX_MESSAGES_PER_CONNECTION,
+    MAIL_IDLE_CHECK_SECONDS,
+)
+from src.common.utils.error_handlers import logger
+
+# errors after which the connection can't be trusted any more
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)
+
+
+def connection_lost(error: OSError) -> bool:
+    """ SMTP errors are OSErrors too, only these and socket errors mean the connection is gone """
+    return isinstance(error, CONNECTION_ERRORS) or not isinstance(error, smtplib.SMTPException)
+
+
+class RateLimiter:
+    """ Thread safe token bucket, `rate` messages per second with bursts up to `rate` """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class _Connection:
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPPool:
+    """
+    Small pool of authenticated SMTP connections shared by every sender thread
+
+    Connections are opened lazily up to `size`, reused for up to `max_messages` messages
+    (many providers cap messages per session), probed with NOOP when idle for a while and
+    reopened transparently when the server dropped them.
+    """
+
+    def __init__(self, host: Optional[str] = MAIL_SERVER, port: int = MAIL_PORT, username: Optional[str] = MAIL_USERNAME,
+                 password: Optional[str] = MAIL_PASSWORD, use_tls: bool = MAIL_TLS, size: int = MAIL_POOL_SIZE,
+                 rate_per_second: float = MAIL_RATE_PER_SECOND, max_messages: int = MAIL_MAX_MESSAGES_PER_CONNECTION,
+                 idle_check_seconds: int = MAIL_IDLE_CHECK_SECONDS, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.max_messages = max_messages
+        self.idle_check_seconds = idle_check_seconds
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(rate_per_second)
+        self.idle: "queue.LifoQueue[_Connection]" = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+        self.connections_opened = 0
+        self.reconnects = 0
+        self.messages_sent = 0
+        self.send_failures = 0
+
+    def _open(self) -> _Connection:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password)
+        self.connections_opened += 1
+        return _Connection(smtp)
+
+    @staticmethod
+    def _close(connection: Optional[_Connection]):
+        if connection is None:
+            return
+        try:
+            connection.smtp.quit()
+        except Exception:
+            connection.smtp.close()
+
+    def _usable(self, connection: _Connection) -> bool:
+        if connection.sent >= self.max_messages:
+            return False
+        if time.monotonic() - connection.last_used < self.idle_check_seconds:
+            return True
+        try:
+            return connection.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _acquire(self) -> _Connection:
+        self.slots.acquire()
+        try:
+            while True:
+                try:
+                    connection = self.idle.get_nowait()
+                except queue.Empty:
+                    return self._open()
+                if self._usable(connection):
+                    return connection
+                self._close(connection)
+        except Exception:
+            self.slots.release()
+            raise
+
+    def _release(self, connection: Optional[_Connection]):
+        if connection is not None:
+            connection.last_used = time.monotonic()
+            self.idle.put(connection)
+        self.slots.release()
+
+    def send_many(self, messages: List[EmailMessage]) -> List[Optional[Exception]]:
+        """
+        Send `messages` back to back over one pooled connection
+
+        :return: one entry per message, None when it was accepted or the error it failed with
+        """
+        results: List[Optional[Exception]] = []
+        connection = self._acquire()
+        try:
+            for message in messages:
+                self.rate_limiter.acquire()
+                for attempt in range(2):
+                    try:
+                        if connection is None or connection.sent >= self.max_messages:
+                            self._close(connection)
+                            connection = None
+                            connection = self._open()
+                        connection.smtp.send_message(message)
+                        connection.sent += 1
+                        self.messages_sent += 1
+                        results.append(None)
+                        break
+                    except OSError as e:
+                        if not connection_lost(e):
+                            # refused recipient or message, the connection itself is still fine
+                            self.send_failures += 1
+                            results.append(e)
+                            break
+                        # the connection went away, reopen it and retry the message once
+                        self._close(connection)
+                        connection = None
+                        if attempt:
+                            self.send_failures += 1
+                            results.append(e)
+                        else:
+                            self.reconnects += 1
+                            logger.warning(f"SMTP connection lost, reconnecting: {e}")
+        finally:
+            self._release(connection)
+        return results
+
+    def send(self, message: EmailMessage):
+        error = self.send_many([message])[0]
+        if error is not None:
+            raise error
+
+    def close(self):
+        while True:
+            try:
+                self._close(self.idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def stats(self) -> dict:
+        return {
+            "connections_opened": self.connections_opened,
+            "reconnects": self.reconnects,
+            "messages_sent": self.messages_sent,
+            "send_failures": self.send_failures,
+            "idle_connections": self.idle.qsize(),
+        }
+
+
+mail_pool = SMTPPool()
@@ -0,0 +1,75 @@
+import base64
+import binascii
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from src.common.utils.user_defined_errors import InvalidCursorError
+
+
+def encode_cursor(key: Any) -> str:
+    """ Wrap the last seen sort key into an opaque url safe token """
+    raw = json.dumps({"k": key}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Any:
+    """ Return the sort key stored in a cursor token, None for the first page """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))["k"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursorError
+    # every keyset is an integer id, anything else was forged and must not reach the query
+    if not isinstance(key, int) or isinstance(key, bool):
+        raise InvalidCursorError
+    return key
+
+
+def build_page(rows: List[Any], limit: int, key: Callable[[Any], Any], serialize: Callable[[Any], dict],
+               total_estimate: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Build a page response out of `limit + 1` fetched rows
+
+    :param rows: rows fetched with a limit of `limit + 1`
+    :param limit: requested page size
+    :param key: returns the keyset value of a row
+    :param serialize: converts a row into the response dict
+    :param total_estimate: optional estimated number of matching rows
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": [serialize(row) for row in rows],
+        "next_cursor": encode_cursor(key(rows[-1])) if has_more and rows else None,
+        "total_estimate": total_estimate,
+    }
+
+
+def explain_query(statement) -> str:
+    """ EXPLAIN statement used to read the planner row estimate of a query """
+    compiled = statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    return "EXPLAIN (FORMAT JSON) {}".format(compiled)
+
+
+def plan_rows(explain_result) -> int:
+    plan = explain_result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def estimate_count(session, statement) -> int:
+    """
+    Planner based row estimate, it costs the same for 10 rows or 10 million rows
+    unlike a COUNT(*) which has to visit every matching row
+    """
+    return plan_rows(session.execute(text(explain_query(statement))))
+
+
+async def async_estimate_count(session, statement) -> int:
+    return plan_rows(await session.execute(text(explain_query(statement))))
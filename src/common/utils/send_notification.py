@@ -1,66 +1,77 @@
-import os
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from fastapi_mail import FastMail, MessageSchema
-from src.common.utils.constants import CONF
+from email.message import EmailMessage
+from typing import Dict, List
+from starlette.concurrency import run_in_threadpool
+from src.common.utils.constants import MAIL_FROM
+from src.common.utils.email_templates import email_templates
+from src.common.utils.mailer import mail_pool
 
 
-async def send_bid_notification_email(email_to: str, item_name: str, bid_amount: int):
-    message = MessageSchema(
-        subject=f"New bid on item you bid: {item_name}",
-        recipients=[email_to],
-        template_body={
-            "item_name": item_name,
-            "bid_amount": bid_amount
-        },
-        subtype="html"
+def bid_notification_message(email_to: str, item_name: str, bid_amount: int) -> EmailMessage:
+    html_body = email_templates.render("bid_email.html", item_name=item_name, bid_amount=bid_amount)
+    return build_message(email_to, f"New bid on item you bid: {item_name}", html_body)
+
+
+def auction_result_message(email: str, item_name: str, amount: int, user_name: str, winner: bool = False) -> EmailMessage:
+    subject = "🎉 You won the auction!" if winner else f"Auction ended: {item_name}"
+    html_content = (
+        winner_email_template(item_name, amount, user_name)
+        if winner else
+        loser_email_template(item_name, amount, user_name)
     )
-    fm = FastMail(CONF)
-    await fm.send_message(message, template_name="bid_email.html")
+    return build_message(email, subject, html_content)
 
-def winner_email_template(item_name: str, amount: int, user_name: str) -> str:
-    return f"""
-    <html>
-    <body style="font-family: Arial, sans-serif;">
-        <h2 style="color: #2e6c80;">🎉 Congratulations, {user_name}!</h2>
-        <p>You have <strong>won</strong> the auction for:</p>
-        <ul>
-            <li><strong>Item:</strong> {item_name}</li>
-            <li><strong>Winning Bid:</strong> ₹{amount}</li>
-        </ul>
-        <p style="margin-top:20px;">Thank you for participating. We’ll be in touch with delivery details soon!</p>
-    </body>
-    </html>
+
+def auction_result_messages(payloads: List[dict]) -> List[EmailMessage]:
     """
+    `auction_result_message` for many recipients, the emails of one auction's winner or losers are
+    rendered together and share a single rendering of the result block
+    """
+    groups: Dict[tuple, List[int]] = {}
+    for position, payload in enumerate(payloads):
+        key = (payload["item_name"], payload["amount"], bool(payload.get("winner", False)))
+        groups.setdefault(key, []).append(position)
+    messages: List[EmailMessage] = [None] * len(payloads)
+    for (item_name, amount, winner), positions in groups.items():
+        bodies = email_templates.render_batch(
+            "winner_email.html" if winner else "loser_email.html",
+            [{"user_name": payloads[position]["user_name"]} for position in positions],
+            shared={"item_name": item_name, "amount": amount},
+            blocks={"item_block": "auction_result_block.html"},
+        )
+        subject = "🎉 You won the auction!" if winner else f"Auction ended: {item_name}"
+        for position, body in zip(positions, bodies):
+            messages[position] = build_message(payloads[position]["email"], subject, body)
+    return messages
+
+
+def outbid_digest_message(email: str, user_name: str, items: list) -> EmailMessage:
+    return build_message(email, f"You have been outbid on {len(items)} item(s)", outbid_digest_template(user_name, items))
+
+
+async def send_bid_notification_email(email_to: str, item_name: str, bid_amount: int):
+    await run_in_threadpool(mail_pool.send, bid_notification_message(email_to, item_name, bid_amount))
+
+def winner_email_template(item_name: str, amount: int, user_name: str) -> str:
+    item_block = email_templates.block("auction_result_block.html", item_name=item_name, amount=amount)
+    return email_templates.render("winner_email.html", user_name=user_name, item_block=item_block)
 
 def loser_email_template(item_name: str, amount: int, user_name: str) -> str:
-    return f"""
-    <html>
-    <body style="font-family: Arial, sans-serif;">
-        <h2 style="color: #d9534f;">Auction Ended: {item_name}</h2>
-        <p>Hi {user_name},</p>
-        <p>The auction has ended. Unfortunately, your bid was not the highest.</p>
-        <ul>
-            <li><strong>Winning Bid:</strong> ₹{amount}</li>
-        </ul>
-        <p>Better luck next time! Feel free to explore other active auctions.</p>
-    </body>
-    </html>
-    """
+    item_block = email_templates.block("auction_result_block.html", item_name=item_name, amount=amount)
+    return email_templates.render("loser_email.html", item_name=item_name, user_name=user_name, item_block=item_block)
 
 
-def send_email(to: str, subject: str, html_body: str):
-    from_email = os.getenv("MAIL_FROM")
-    msg = MIMEMultipart("alternative")
+def outbid_digest_template(user_name: str, items: list) -> str:
+    return email_templates.render("outbid_digest.html", user_name=user_name, items=items)
+
+
+def build_message(to: str, subject: str, html_body: str) -> EmailMessage:
+    msg = EmailMessage()
     msg["Subject"] = subject
-    msg["From"] = from_email
+    msg["From"] = MAIL_FROM
     msg["To"] = to
+    msg.set_content(html_body, subtype="html")
+    return msg
 
-    part = MIMEText(html_body, "html")
-    msg.attach(part)
 
-    with smtplib.SMTP("smtp.yourprovider.com", 587) as server:
-        server.starttls()
-        server.login("your_username", "your_password")
-        server.sendmail(from_email, to, msg.as_string())
\ No newline at end of file
+def send_email(to: str, subject: str, html_body: str):
+    mail_pool.send(build_message(to, subject, html_body))
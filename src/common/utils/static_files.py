@@ -0,0 +1,135 @@
+import os
+import re
+from mimetypes import guess_type
+from typing import Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from src.common.utils.constants import BYTES_PER_CHUNK
+from src.common.utils.etags import not_modified
+
+# content-addressed files never change under their name
+IMMUTABLE = "public, max-age=31536000, immutable"
+# files stored before content addressing can be replaced under the same name
+REVALIDATE = "no-cache"
+SHA256_NAME = re.compile(r"^[0-9a-f]{64}$")
+ZERO_COPY = "http.response.zerocopysend"
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def content_etag(name: str, variant: Optional[str] = None) -> Optional[str]:
+    """ Strong ETag of a content-addressed file, taken from its name, None for any other file """
+    stem = os.path.splitext(name)[0]
+    if not SHA256_NAME.match(stem):
+        return None
+    return f'"{stem}-{variant}"' if variant else f'"{stem}"'
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    First and last byte of a single `bytes=` range, None to send the whole file. Malformed and
+    multiple ranges are ignored, as HTTP allows
+
+    :raises RangeNotSatisfiable: the range starts past the end of the file
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+class FileRangeResponse(Response):
+    """
+    Sends a whole file or one byte range of it
+
+    With the ASGI zero-copy send extension the server sends it with sendfile, otherwise it is
+    read with `os.pread` in the threadpool, `BYTES_PER_CHUNK` bytes at a time.
+    """
+
+    chunk_size = BYTES_PER_CHUNK
+
+    def __init__(self, path: str, stat_result: os.stat_result, byte_range: Optional[Tuple[int, int]] = None,
+                 headers: dict = None, media_type: str = None, method: str = None):
+        self.path = path
+        self.size = stat_result.st_size
+        self.start, self.end = byte_range or (0, self.size - 1)
+        self.status_code = 206 if byte_range else 200
+        self.send_header_only = method is not None and method.upper() == "HEAD"
+        self.media_type = media_type or guess_type(path)[0] or "application/octet-stream"
+        self.background = None
+        self.init_headers(headers)
+        self.headers["content-length"] = str(self.end - self.start + 1)
+        self.headers["accept-ranges"] = "bytes"
+        if byte_range:
+            self.headers["content-range"] = f"bytes {self.start}-{self.end}/{self.size}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        remaining = self.end - self.start + 1
+        if self.send_header_only or not remaining:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        file = await run_in_threadpool(open, self.path, "rb")
+        try:
+            if ZERO_COPY in scope.get("extensions", {}):
+                await send({"type": ZERO_COPY, "file": file, "offset": self.start, "count": remaining})
+                return
+            offset = self.start
+            while remaining:
+                chunk = await run_in_threadpool(os.pread, file.fileno(), min(self.chunk_size, remaining), offset)
+                # a file cut short while being sent still ends the response
+                remaining = remaining - len(chunk) if chunk else 0
+                offset += len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": bool(remaining)})
+        finally:
+            file.close()
+
+
+def file_response(request: Request, path: str, etag: Optional[str] = None, media_type: str = None) -> Response:
+    """
+    Conditional and range aware response for a file on disk
+
+    :param etag: strong ETag of the content, the file is then cached as immutable. Without one
+        it gets a weak ETag from its size and mtime and is revalidated on every use
+    """
+    stat_result = os.stat(path)
+    cache_control = IMMUTABLE if etag else REVALIDATE
+    etag = etag or f'W/"{stat_result.st_size:x}-{int(stat_result.st_mtime):x}"'
+    cached = not_modified(request, etag, cache_control)
+    if cached is not None:
+        return cached
+    headers = {"etag": etag, "cache-control": cache_control}
+    byte_range = None
+    # a range of a different version than the client's would corrupt its copy, If-Range compares strongly
+    if_range = request.headers.get("if-range")
+    if if_range is None or (if_range.strip() == etag and not etag.startswith("W/")):
+        try:
+            byte_range = parse_range(request.headers.get("range"), stat_result.st_size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{stat_result.st_size}"})
+    return FileRangeResponse(path, stat_result, byte_range, headers, media_type, request.method)
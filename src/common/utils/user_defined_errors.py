@@ -32,6 +32,13 @@ class LessBidError(UserErrors):
         self.response_code = response_code if response_code else 400
         self.type = "LessBidError"
 
+
+class InvalidCursorError(UserErrors):
+    def __init__(self, message=None, response_code=None):
+        self.message = message if message else "Invalid pagination cursor"
+        self.response_code = response_code if response_code else 400
+        self.type = "InvalidCursorError"
+
 class DataBaseErrors(Exception):
     pass
 
@@ -49,4 +56,16 @@ class FileNotFound(FileErrors):
     def __init__(self, message = None, response_code = None):
         self.message = message if message else "File not Found."
         self.response_code = 404 if response_code is None else response_code
-        self.type = 'FileNotFound'
\ No newline at end of file
+        self.type = 'FileNotFound'
+
+class FileTooLarge(FileErrors):
+    def __init__(self, message = None, response_code = None):
+        self.message = message if message else "File is too large."
+        self.response_code = 413 if response_code is None else response_code
+        self.type = 'FileTooLarge'
+
+class InvalidImage(FileErrors):
+    def __init__(self, message = None, response_code = None):
+        self.message = message if message else "File is not a readable image."
+        self.response_code = 415 if response_code is None else response_code
+        self.type = 'InvalidImage'
@@ -1,7 +1,8 @@
 from typing import Dict, List
 from fastapi import WebSocket
+from starlette import status
 from src.common.utils.error_handlers import logger
-from src.db.functions.websocket_bids_manager import fetch_active_items
+from src.db.functions.websocket_bids_manager import active_items_json
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
@@ -11,31 +12,66 @@ class ActiveItemWebSocketResponse(BaseModel):
     name: str
     current_bid: Optional[int]
     start_price: int
-    status: bool
+    status: str
     start_time: Optional[datetime]
     end_time: Optional[datetime]
     won_by: Optional[int]
     image_url: Optional[str]
+    thumbnail_url: Optional[str]
+    medium_url: Optional[str]
 
 
 class BidManager:
     def __init__(self):
         self.active_connections: Dict[int, List[WebSocket]] = {}
+        # item_id -> user_id -> number of open sockets of that user on the item
+        self.watchers: Dict[int, Dict[int, int]] = {}
 
-    async def connect(self, websocket: WebSocket, item_id: int):
+    async def connect(self, websocket: WebSocket, item_id: int, user_id: Optional[int] = None):
         if item_id not in self.active_connections:
             self.active_connections[item_id] = []
         self.active_connections[item_id].append(websocket)
+        if user_id is not None:
+            watchers = self.watchers.setdefault(item_id, {})
+            watchers[user_id] = watchers.get(user_id, 0) + 1
 
-    def disconnect(self, websocket: WebSocket, item_id: int):
-        self.active_connections[item_id].remove(websocket)
-        if not self.active_connections[item_id]:
+    def disconnect(self, websocket: WebSocket, item_id: int, user_id: Optional[int] = None):
+        connections = self.active_connections.get(item_id)
+        if connections is None or websocket not in connections:
+            # already dropped, e.g. by close_item
+            return
+        connections.remove(websocket)
+        if not connections:
             del self.active_connections[item_id]
+        watchers = self.watchers.get(item_id, {})
+        if user_id in watchers:
+            watchers[user_id] -= 1
+            if not watchers[user_id]:
+                del watchers[user_id]
+            if not watchers:
+                del self.watchers[item_id]
+
+    def is_watching(self, item_id: int, user_id: int) -> bool:
+        return user_id in self.watchers.get(item_id, {})
 
     async def broadcast_bid(self, item_id: int, message: dict):
-        if item_id in self.active_connections:
-            for connection in self.active_connections[item_id]:
+        for connection in list(self.active_connections.get(item_id, [])):
+            try:
                 await connection.send_json(message)
+            except Exception as e:
+                # one dead socket must not keep the others from the update
+                logger.warning(f"Dropping bid socket of item {item_id}: {e}")
+                self.active_connections[item_id].remove(connection)
+
+    async def close_item(self, item_id: int):
+        """ Close every bid socket of an item that can't take bids any more """
+        connections = self.active_connections.pop(item_id, [])
+        self.watchers.pop(item_id, None)
+        for connection in connections:
+            try:
+                await connection.close(code=status.WS_1000_NORMAL_CLOSURE)
+            except Exception as e:
+                logger.warning(f"Error closing bid socket of item {item_id}: {e}")
 
 
 class ActiveItemsManager:
@@ -49,11 +85,24 @@ class ActiveItemsManager:
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
 
+    async def broadcast_event(self, message: dict):
+        """ Lifecycle event, clients add "auction_live" items to the feed and drop the others """
+        for connection in list(self.active_connections):
+            try:
+                await connection.send_json(message)
+            except Exception as e:
+                logger.warning(f"Dropping active items socket: {e}")
+                self.disconnect(connection)
+
     async def broadcast_active_items(self):
         try:
-            active_items = await fetch_active_items()
-            serialized = [ActiveItemWebSocketResponse(**item).dict() for item in active_items]
+            # encoded once for every socket, by the live catalog once per change
+            message = await active_items_json()
             for connection in self.active_connections:
-                await connection.send_json(active_items)
+                await connection.send_text(message)
         except Exception as e:
-            logger.error(f"Failed to broadcast active items: {str(e)}")
\ No newline at end of file
+            logger.error(f"Failed to broadcast active items: {str(e)}")
+
+
+active_items_manager = ActiveItemsManager()
+bid_manager = BidManager()
@@ -6,7 +6,10 @@ from sqlalchemy import (
     ForeignKey,
     Integer,
     String,
-    Enum
+    Enum,
+    Index,
+    JSON,
+    text
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import backref, relationship
@@ -58,6 +61,16 @@ class ItemInformation(Base):
     start_price = Column(Integer, nullable=True)
     won_by = Column(Integer, nullable=True)
     filepath = Column(String, nullable=True)
+    # soft-close extensions applied so far
+    extensions = Column(Integer, nullable=False, default=0, server_default="0")
+    # bumped by every write to the row, the ETag of the item and of the pages listing it
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __table_args__ = (
+        Index("ix_item_information_status_item_id", "status", "item_id"),
+        Index("ix_item_information_status_start_time", "status", "start_time"),
+        Index("ix_item_information_status_end_time", "status", "end_time"),
+    )
 
 
 class Bid(Base):
@@ -71,4 +84,84 @@ class Bid(Base):
     item = relationship("ItemInformation", backref="bids")
     user = relationship("Users", backref="bids")
 
+    # keyset pagination walks these in bid_id order
+    __table_args__ = (
+        Index("ix_bids_item_id_bid_id", "item_id", "bid_id"),
+        Index("ix_bids_user_id_bid_id", "user_id", "bid_id"),
+    )
+
+
+
+
+class ItemBidder(Base):
+    """
+    One row per (item, bidder) maintained on every accepted bid, so the distinct
+    bidders of an item are known without scanning `bids`
+    """
+    __tablename__ = "item_bidders"
+
+    item_id = Column(Integer, ForeignKey("item_information.item_id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("user_info.user_id"), primary_key=True)
+    last_bid_amount = Column(Integer, nullable=False)
+    last_bid_time = Column(DateTime(timezone=True), server_default=func.now())
+    # set when the user loses the lead, cleared when they bid again
+    outbid_at = Column(DateTime(timezone=True), nullable=True)
+    notified_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_item_bidders_pending_outbid", "user_id", postgresql_where=outbid_at.isnot(None)),
+    )
+
+
+class NotificationOutbox(Base):
+    """
+    Notifications written in the same transaction as the bid or auction close that caused them,
+    delivered later by the outbox dispatcher
+    """
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    # a second notification with the same key is dropped at insert time
+    dedup_key = Column(String, unique=True, nullable=True)
+    status = Column(String, nullable=False, default="pending", server_default="pending")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    available_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_notification_outbox_pending", "available_at", "id", postgresql_where=text("status = 'pending'")),
+    )
+
+
+class ArchivedBid(Base):
+    """
+    Cold copy of the bids of auctions completed before the retention window,
+    range partitioned by month on bid_time (partitions are created by the archival job)
+    """
+    __tablename__ = "bids_archive"
+
+    bid_id = Column(Integer, primary_key=True, autoincrement=False)
+    item_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    bid_amount = Column(Integer, nullable=False)
+    bid_time = Column(DateTime(timezone=True), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_bids_archive_item_id_bid_id", "item_id", "bid_id"),
+        Index("ix_bids_archive_user_id_bid_id", "user_id", "bid_id"),
+        {"postgresql_partition_by": "RANGE (bid_time)"},
+    )
+
+
+class SchedulerLease(Base):
+    """ Who currently holds a leader lease, written by the holder on every heartbeat """
+    __tablename__ = "scheduler_leases"
 
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    acquired_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    heartbeat_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
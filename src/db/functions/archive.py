@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, delete, insert, exists, func, distinct, text
+
+from src.common.utils.constants import ARCHIVE_RETENTION_DAYS, ARCHIVE_BATCH_ITEMS
+from src.common.utils.error_handlers import logger
+from src.db.database import Bid, ArchivedBid, ItemInformation, ItemStatus
+from src.db.utils import AsyncDBConnection
+
+PARTITION_DDL = (
+    "CREATE TABLE IF NOT EXISTS {name} PARTITION OF bids_archive "
+    "FOR VALUES FROM ('{start}') TO ('{end}')"
+)
+
+
+def _archive_month(bid_time):
+    return func.date_trunc("month", func.coalesce(bid_time, func.now()))
+
+
+def _next_month(month: datetime) -> datetime:
+    return (month.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+async def _ensure_partitions(db, item_ids):
+    """ Create the monthly archive partitions the bids of `item_ids` will land in """
+    months = await db.execute(
+        select(distinct(_archive_month(Bid.bid_time))).where(Bid.item_id.in_(item_ids))
+    )
+    for month in months.scalars():
+        await db.execute(text(PARTITION_DDL.format(
+            name="bids_archive_{:%Y_%m}".format(month),
+            start="{:%Y-%m-%d}".format(month),
+            end="{:%Y-%m-%d}".format(_next_month(month)),
+        )))
+
+
+async def archive_completed_bids(retention_days: int = ARCHIVE_RETENTION_DAYS, batch_items: int = ARCHIVE_BATCH_ITEMS):
+    """
+    Move the bids of auctions completed more than `retention_days` ago from `bids` to `bids_archive`
+
+    Works `batch_items` items per transaction, each batch is a single DELETE ... RETURNING
+    feeding an INSERT so a bid is never in both tables or in neither.
+
+    :return: number of archived bids
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    archived = 0
+    while True:
+        async with AsyncDBConnection(False) as db:
+            try:
+                result = await db.execute(
+                    select(ItemInformation.item_id)
+                    .where(
+                        ItemInformation.status == ItemStatus.COMPLETED,
+                        ItemInformation.end_time < cutoff,
+                        exists().where(Bid.item_id == ItemInformation.item_id),
+                    )
+                    .limit(batch_items)
+                )
+                item_ids = result.scalars().all()
+                if not item_ids:
+                    return archived
+
+                await _ensure_partitions(db, item_ids)
+                moved = (
+                    delete(Bid)
+                    .where(Bid.item_id.in_(item_ids))
+                    .returning(Bid.bid_id, Bid.item_id, Bid.user_id, Bid.bid_amount, Bid.bid_time)
+                    .cte("moved")
+                )
+                result = await db.execute(
+                    insert(ArchivedBid).from_select(
+                        ["bid_id", "item_id", "user_id", "bid_amount", "bid_time"],
+                        select(
+                            moved.c.bid_id,
+                            moved.c.item_id,
+                            moved.c.user_id,
+                            moved.c.bid_amount,
+                            func.coalesce(moved.c.bid_time, func.now()),
+                        ),
+                    )
+                )
+                await db.commit()
+                archived += result.rowcount
+                logger.info(f"Archived {result.rowcount} bids of items {item_ids}")
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Error archiving bids: {e}")
+                return archived
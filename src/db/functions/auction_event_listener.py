@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+from src.common.utils.error_handlers import logger
+from src.common.utils.webocket_connection import bid_manager, active_items_manager
+from src.db.functions.auction_events import AUCTION_EVENTS_CHANNEL
+from src.db.functions.item_cache import ITEM_CACHE_CHANNEL, WORKER_ID, item_cache
+from src.db.functions.live_catalog import live_catalog
+from src.db.routing import replica_router
+from src.db.utils import engine
+
+RETRY_SECONDS = 5
+
+
+async def dispatch_event(event: dict):
+    """ Push one event to this worker's subscribers """
+    kind = event.get("event")
+    if kind == "bid_placed":
+        # the bidder's worker already applied it and told its own sockets
+        if event.get("worker") != WORKER_ID:
+            item_cache.apply_bid(event)
+            live_catalog.apply_bid(event)
+            replica_router.mark_write(*event.get("bidder", []))
+        return
+    if kind not in ("auction_live", "auction_upcoming", "auction_extended", "auction_closed"):
+        return
+    item_id = event.get("item_id") or event["item"]["item_id"]
+    # the status or end time changed in whichever worker published it
+    item_cache.invalidate(item_id)
+    live_catalog.changed(item_id)
+    await active_items_manager.broadcast_event(event)
+    await bid_manager.broadcast_bid(item_id, event)
+    if kind == "auction_closed":
+        # nothing left to bid on, the sockets are closed normally after the result
+        await bid_manager.close_item(item_id)
+
+
+class AuctionEventListener:
+    """
+    LISTENs on `auction_events` in every worker and fans events out to the local websockets,
+    and on `item_cache` for other workers' item edits and deletes. The live
+    catalog is loaded every time it connects
+    """
+
+    def __init__(self):
+        self.received = 0
+        self.tasks = set()
+
+    def _on_notify(self, connection, pid, channel, payload: str):
+        self.received += 1
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.error(f"Ignoring malformed auction event {payload!r}")
+            return
+        task = asyncio.ensure_future(dispatch_event(event))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run(self, stop: asyncio.Event):
+        while not stop.is_set():
+            try:
+                async with engine.connect() as connection:
+                    listener = (await connection.get_raw_connection()).driver_connection
+                    await listener.add_listener(AUCTION_EVENTS_CHANNEL, self._on_notify)
+                    await listener.add_listener(ITEM_CACHE_CHANNEL, item_cache.on_notify)
+                    await listener.add_listener(ITEM_CACHE_CHANNEL, live_catalog.on_notify)
+                    # changes made while not listening were missed
+                    item_cache.clear()
+                    await live_catalog.load()
+                    try:
+                        # a closed connection has to be noticed to reconnect, so it is probed now and then
+                        while not stop.is_set():
+                            try:
+                                await asyncio.wait_for(stop.wait(), timeout=RETRY_SECONDS)
+                            except asyncio.TimeoutError:
+                                await listener.execute("SELECT 1")
+                    finally:
+                        await listener.remove_listener(AUCTION_EVENTS_CHANNEL, self._on_notify)
+                        await listener.remove_listener(ITEM_CACHE_CHANNEL, item_cache.on_notify)
+                        await listener.remove_listener(ITEM_CACHE_CHANNEL, live_catalog.on_notify)
+            except Exception as e:
+                logger.error(f"Auction event listener error: {e}")
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=RETRY_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+auction_event_listener = AuctionEventListener()
@@ -0,0 +1,68 @@
+import json
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from src.db.database import ItemInformation, ItemStatus
+from src.db.functions.item_cache import WORKER_ID
+from src.db.functions.live_catalog import serialize_item
+
+# lifecycle events of every worker's subscribers, published by whichever worker changed the item
+AUCTION_EVENTS_CHANNEL = "auction_events"
+
+PUBLISH_QUERY = text("SELECT pg_notify(:channel, event) FROM unnest(CAST(:events AS text[])) AS event")
+
+# what `serialize_item` reads, RETURNING these gives rows a status event can be built from
+ITEM_EVENT_COLUMNS = (
+    ItemInformation.item_id,
+    ItemInformation.name,
+    ItemInformation.current_bid,
+    ItemInformation.start_price,
+    ItemInformation.start_time,
+    ItemInformation.end_time,
+    ItemInformation.status,
+    ItemInformation.won_by,
+    ItemInformation.filepath,
+)
+
+
+def status_event(item) -> dict:
+    """ Event for an item that became live or went back to upcoming """
+    if item.status == ItemStatus.LIVE:
+        return {"event": "auction_live", "item": serialize_item(item)}
+    return {"event": "auction_upcoming", "item_id": item.item_id}
+
+
+def bid_event(item, bidder: Optional[List] = None) -> dict:
+    """
+    Event for a committed bid, with every column a bid changes so other workers apply it without a
+    read, and the bidder's id and email so they pin the bidder's reads to the primary too
+    """
+    return {
+        "event": "bid_placed",
+        "item_id": item.item_id,
+        "current_bid": item.current_bid,
+        "won_by": item.won_by,
+        "end_time": item.end_time,
+        "extensions": item.extensions,
+        "version": item.version,
+        "bidder": [key for key in bidder or [] if key is not None],
+        "worker": WORKER_ID,
+    }
+
+
+async def publish_events(db, events: List[dict]):
+    """
+    Queue lifecycle events in the caller's transaction, Postgres delivers them to every
+    listening worker only if it commits
+
+    Events are {"event": "auction_live", "item": {...}}, {"event": "auction_upcoming", "item_id": ...},
+    {"event": "auction_extended", "item_id": ..., "end_time": ...}
+    {"event": "auction_closed", "item_id": ..., "name": ..., "winner": ..., "winning_bid": ...}
+    or `bid_event`
+    """
+    if events:
+        await db.execute(PUBLISH_QUERY, {
+            "channel": AUCTION_EVENTS_CHANNEL,
+            "events": [json.dumps(event, default=str) for event in events],
+        })
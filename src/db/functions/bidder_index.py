@@ -0,0 +1,151 @@
+import asyncio
+from collections import defaultdict
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import select, update, func, or_, and_, case
+from sqlalchemy.dialects.postgresql import insert
+
+from src.common.utils.constants import OUTBID_DEBOUNCE_SECONDS
+from src.db.database import Bid, ItemBidder, ItemInformation, ItemStatus, Users
+from src.db.functions.outbox import enqueue_notification, enqueue_notifications
+from src.db.utils import AsyncDBConnection
+
+
+def _pending_outbid():
+    """ (item, user) rows with an outbid event that was neither seen live nor emailed yet """
+    return and_(
+        ItemBidder.outbid_at.isnot(None),
+        or_(ItemBidder.notified_at.is_(None), ItemBidder.notified_at < ItemBidder.outbid_at),
+    )
+
+
+async def record_bid(db, item_id: int, user_id: int, amount: int, previous_leader: Optional[int],
+                     leader_saw_it: bool = False):
+    """
+    Keep `item_bidders` in step with an accepted bid, must run in the bid's transaction
+
+    The bidder's row is upserted and, when the lead changed hands, the displaced leader gets
+    an outbid event. The event keeps the time of the first outbid not yet notified, so a
+    digest can't be pushed back forever by a long bidding war. When the displaced leader
+    is watching the item live the event is recorded as already notified.
+
+    :param leader_saw_it: previous leader has the item's bid websocket open
+    """
+    statement = insert(ItemBidder).values(item_id=item_id, user_id=user_id, last_bid_amount=amount)
+    await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[ItemBidder.item_id, ItemBidder.user_id],
+            set_={"last_bid_amount": amount, "last_bid_time": func.now(), "outbid_at": None},
+        )
+    )
+    if not previous_leader or previous_leader == user_id:
+        return
+    if leader_saw_it:
+        values = {"outbid_at": func.now(), "notified_at": func.now()}
+    else:
+        values = {"outbid_at": case((_pending_outbid(), ItemBidder.outbid_at), else_=func.now())}
+    await db.execute(
+        update(ItemBidder)
+        .where(ItemBidder.item_id == item_id, ItemBidder.user_id == previous_leader)
+        .values(**values)
+    )
+
+
+async def notify_displaced_leader(db, item_id: int, previous_leader: Optional[int], user_id: int, item_name: str,
+                                  amount: int, leader_saw_it: bool = False):
+    """
+    Without debouncing, queue the outbid email of the bidder who just lost the lead in the bid's
+    transaction. One primary key lookup whatever the length of the bidding war
+    """
+    if not previous_leader or previous_leader == user_id or leader_saw_it or OUTBID_DEBOUNCE_SECONDS:
+        return
+    leader = await db.get(Users, previous_leader)
+    if leader:
+        await enqueue_notification(
+            db,
+            "outbid",
+            {"email_to": leader.email_id, "item_name": item_name, "bid_amount": amount},
+            dedup_key=f"outbid:{item_id}:{amount}",
+        )
+
+
+async def send_outbid_digests(debounce_seconds: int = OUTBID_DEBOUNCE_SECONDS):
+    """
+    Queue one digest per user whose first pending outbid event is older than `debounce_seconds`,
+    listing every item they are outbid on with its current price
+    """
+    async with AsyncDBConnection(False) as db:
+        try:
+            due_users = (
+                select(ItemBidder.user_id)
+                .where(_pending_outbid())
+                .group_by(ItemBidder.user_id)
+                .having(func.min(ItemBidder.outbid_at) <= func.now() - timedelta(seconds=debounce_seconds))
+            )
+            result = await db.execute(
+                select(ItemBidder.user_id, ItemBidder.item_id, Users.email_id, Users.name,
+                       ItemInformation.name, ItemInformation.current_bid, ItemInformation.status)
+                .join(Users, ItemBidder.user_id == Users.user_id)
+                .join(ItemInformation, ItemBidder.item_id == ItemInformation.item_id)
+                .where(_pending_outbid(), ItemBidder.user_id.in_(due_users))
+                .with_for_update(of=ItemBidder)
+            )
+            digests = defaultdict(list)
+            pending = defaultdict(list)
+            recipients = {}
+            for user_id, item_id, email, user_name, item_name, current_bid, status in result.all():
+                pending[user_id].append(item_id)
+                recipients[user_id] = (email, user_name)
+                if status != ItemStatus.COMPLETED:
+                    digests[user_id].append({"item_id": item_id, "item_name": item_name, "current_bid": current_bid})
+            if not pending:
+                return 0
+
+            for user_id, item_ids in pending.items():
+                await db.execute(
+                    update(ItemBidder)
+                    .where(ItemBidder.user_id == user_id, ItemBidder.item_id.in_(item_ids))
+                    .values(notified_at=func.now())
+                )
+            await enqueue_notifications(db, [
+                {
+                    "kind": "outbid_digest",
+                    "payload": {"email": recipients[user_id][0], "user_name": recipients[user_id][1], "items": items},
+                }
+                for user_id, items in digests.items()
+            ])
+            await db.commit()
+            return len(digests)
+        except Exception:
+            await db.rollback()
+            raise
+
+
+async def rebuild_bidder_index():
+    """ Backfill `item_bidders` from `bids`, needed once for bids placed before the index existed """
+    async with AsyncDBConnection(False) as db:
+        rows = (
+            select(
+                Bid.item_id,
+                Bid.user_id,
+                func.max(Bid.bid_amount),
+                func.max(Bid.bid_time),
+            )
+            .group_by(Bid.item_id, Bid.user_id)
+        )
+        statement = insert(ItemBidder).from_select(["item_id", "user_id", "last_bid_amount", "last_bid_time"], rows)
+        await db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[ItemBidder.item_id, ItemBidder.user_id],
+                set_={
+                    "last_bid_amount": statement.excluded.last_bid_amount,
+                    "last_bid_time": statement.excluded.last_bid_time,
+                },
+            )
+        )
+        await db.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_bidder_index())
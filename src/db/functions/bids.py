@@ -1,48 +1,119 @@
+from typing import Optional
+
 from fastapi import HTTPException
-from sqlalchemy import select
-from src.db.database import Bid, ItemInformation, Users
+from sqlalchemy import select, union_all, func
+from src.common.utils.etags import etag_matches, version_etag
+from src.common.utils.pagination import decode_cursor, build_page, async_estimate_count
+from src.db.database import Bid, ArchivedBid, ItemInformation, Users
 from src.db.utils import AsyncDBConnection
 
-async def fetch_user_bids(user_id: int):
+
+def bid_source(condition, include_archived: bool):
+    """
+    Bids matching `condition` (built with the columns of `Bid`), optionally together with
+    the archived bids of completed auctions, exposed as a single selectable
+    """
+    live = select(Bid.bid_id, Bid.item_id, Bid.user_id, Bid.bid_amount, Bid.bid_time).where(condition(Bid))
+    if not include_archived:
+        return live.subquery("bid_rows")
+    archived = select(
+        ArchivedBid.bid_id, ArchivedBid.item_id, ArchivedBid.user_id, ArchivedBid.bid_amount, ArchivedBid.bid_time
+    ).where(condition(ArchivedBid))
+    return union_all(live, archived).subquery("bid_rows")
+
+
+async def fetch_user_bids(user_id: int, limit: int, cursor: Optional[str] = None, include_total: bool = False,
+                          include_archived: bool = False):
+    """
+    Newest first page of the bids placed by a user
+
+    :param user_id: bidder id
+    :param limit: page size
+    :param cursor: next_cursor of the previous page
+    :param include_total: add a planner estimate of the total number of bids
+    :param include_archived: also return the archived bids of long completed auctions
+    """
+    last_bid_id = decode_cursor(cursor)
     try:
-        async with AsyncDBConnection(False) as db:
-            result = await db.execute(
-                select(Bid, ItemInformation)
-                .join(ItemInformation, Bid.item_id == ItemInformation.item_id)
-                .where(Bid.user_id == user_id)
+        async with AsyncDBConnection(False, read_only=True, user_key=user_id) as db:
+            bids = bid_source(lambda table: table.user_id == user_id, include_archived)
+            query = (
+                select(bids.c.bid_id, bids.c.bid_amount, bids.c.bid_time, ItemInformation.name)
+                .join(ItemInformation, bids.c.item_id == ItemInformation.item_id)
+            )
+            total = await async_estimate_count(db, query) if include_total else None
+            if last_bid_id is not None:
+                query = query.where(bids.c.bid_id < last_bid_id)
+            result = await db.execute(query.order_by(bids.c.bid_id.desc()).limit(limit + 1))
+            return build_page(
+                result.all(),
+                limit,
+                key=lambda row: row.bid_id,
+                serialize=lambda row: {
+                    "bid_id": row.bid_id,
+                    "item_name": row.name,
+                    "bid_amount": row.bid_amount,
+                    "timestamp": row.bid_time.isoformat(),
+                },
+                total_estimate=total,
             )
-            bids = result.all()
-            return [
-                {
-                    "item_name": item.name,
-                    "bid_amount": bid.bid_amount,
-                    "timestamp": bid.created_at.isoformat(),
-                }
-                for bid, item in bids
-            ]
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-async def get_items_bids(item_id: int):
+
+async def latest_bid_ids(db, item_id: int, include_archived: bool) -> tuple:
+    """ Newest bid id of the item in each table read, index only lookups on (item_id, bid_id) """
+    tables = (Bid, ArchivedBid) if include_archived else (Bid,)
+    return tuple([
+        (await db.execute(select(func.max(table.bid_id)).where(table.item_id == item_id))).scalar()
+        for table in tables
+    ])
+
+
+async def get_items_bids(item_id: int, limit: int, cursor: Optional[str] = None, include_total: bool = False,
+                         include_archived: bool = False, if_none_match: Optional[str] = None, user_key=None):
+    """
+    Newest first page of the bid history of an item
+
+    :param item_id: item id
+    :param limit: page size
+    :param cursor: next_cursor of the previous page
+    :param include_total: add a planner estimate of the total number of bids
+    :param include_archived: also look for the bids in the archive, needed for long completed auctions
+    :param if_none_match: ETag the client holds, only `etag` and `not_modified` come back when it's current
+    :param user_key: caller id or email, keeps reads on the primary right after the caller's own bid
+    """
+    last_bid_id = decode_cursor(cursor)
     try:
-        async with AsyncDBConnection(False) as db:
-            result = await db.execute(
-                select(Bid, Users)
-                .join(Users, Bid.user_id == Users.user_id)
-                .where(Bid.item_id == item_id)
-                .order_by(Bid.created_at.desc())
+        async with AsyncDBConnection(False, read_only=True, user_key=user_key) as db:
+            # bids are only ever added, or moved to the archive, the newest ids version the history
+            etag = version_etag("bids", item_id, limit, last_bid_id, include_total, include_archived,
+                                await latest_bid_ids(db, item_id, include_archived))
+            if etag_matches(if_none_match, etag):
+                return {"etag": etag, "not_modified": True}
+            bids = bid_source(lambda table: table.item_id == item_id, include_archived)
+            query = (
+                select(bids.c.bid_id, bids.c.bid_amount, bids.c.bid_time, Users.email_id)
+                .join(Users, bids.c.user_id == Users.user_id)
             )
-            bids = result.all()
-            return [
-                {
-                    "user_email": user.email_id,
-                    "bid_amount": bid.bid_amount,
-                    "timestamp": bid.created_at.isoformat(),
-                }
-                for bid, user in bids
-            ]
+            total = await async_estimate_count(db, query) if include_total else None
+            if last_bid_id is not None:
+                query = query.where(bids.c.bid_id < last_bid_id)
+            result = await db.execute(query.order_by(bids.c.bid_id.desc()).limit(limit + 1))
+            page = build_page(
+                result.all(),
+                limit,
+                key=lambda row: row.bid_id,
+                serialize=lambda row: {
+                    "bid_id": row.bid_id,
+                    "user_email": row.email_id,
+                    "bid_amount": row.bid_amount,
+                    "timestamp": row.bid_time.isoformat(),
+                },
+                total_estimate=total,
+            )
+            page["etag"] = etag
+            return page
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-
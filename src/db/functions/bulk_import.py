@@ -0,0 +1,278 @@
+import argparse
+import csv
+import json
+import os
+import zipfile
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+from pydantic import BaseModel, ValidationError, validator
+from sqlalchemy import insert, select
+
+from src.common.utils.constants import DB_CONNECTION_LINK, IMPORT_CHUNK_SIZE
+from src.common.utils.error_handlers import logger
+from src.common.utils.file_store import content_store
+from src.common.utils.user_defined_errors import FileTooLarge
+from src.db.database import ItemInformation
+from src.db.errors import DatabaseErrors, DatabaseConnectionError
+from src.db.functions.item import resolve_item_status, to_utc_naive
+from src.db.utils import DBConnection
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+# what the client is told about a row the database refused, the database error itself is logged
+INSERT_FAILED = "row could not be saved"
+NOT_UTF8 = "row is not valid UTF-8"
+
+
+class ImportItemRow(BaseModel):
+    item_name: str
+    start_time: datetime
+    end_time: datetime
+    start_price: int
+    image: Optional[str] = None
+
+    @validator("image", pre=True)
+    def empty_image(cls, value):
+        return value or None
+
+    @validator("start_price")
+    def positive_price(cls, value):
+        if value < 0:
+            raise ValueError("start_price can't be negative")
+        return value
+
+    @validator("end_time")
+    def end_after_start(cls, value, values):
+        if "start_time" in values and to_utc_naive(value) <= to_utc_naive(values["start_time"]):
+            raise ValueError("end_time must be after start_time")
+        return value
+
+
+def detect_format(filename: Optional[str]) -> str:
+    extension = os.path.splitext(filename or "")[1].lstrip(".").lower()
+    return "jsonl" if extension in ("jsonl", "ndjson", "json") else "csv"
+
+
+class _DecodedLines:
+    """ The stream's lines as text, a line that isn't UTF-8 is decoded with replacement characters and remembered """
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.line_no = 0
+        self.undecodable: Set[int] = set()
+
+    def __iter__(self) -> Iterator[str]:
+        for raw in self.stream:
+            self.line_no += 1
+            encoding = "utf-8-sig" if self.line_no == 1 else "utf-8"
+            try:
+                yield raw.decode(encoding)
+            except UnicodeDecodeError:
+                self.undecodable.add(self.line_no)
+                yield raw.decode(encoding, errors="replace")
+
+    def valid(self, first: int, last: int) -> bool:
+        return not any(line_no in self.undecodable for line_no in range(first, last + 1))
+
+
+def iter_raw_rows(stream: BinaryIO, file_format: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Yield (row number, parsed row or ValueError) one line at a time, the file is never loaded whole.
+    Lines that aren't UTF-8 and malformed CSV records are reported as rows, they don't stop the import.
+    """
+    lines = _DecodedLines(stream)
+    if file_format == "csv":
+        reader = csv.DictReader(lines)
+        first = 1
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                # the reader doesn't count the line it failed on
+                yield lines.line_no, ValueError(f"Invalid CSV: {e}")
+            else:
+                # the header's lines are checked with the first row
+                yield reader.line_num, row if lines.valid(first, reader.line_num) else ValueError(NOT_UTF8)
+            first = lines.line_no + 1
+        return
+    for line in lines:
+        line_no = lines.line_no
+        if line_no in lines.undecodable:
+            yield line_no, ValueError(NOT_UTF8)
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as e:
+            yield line_no, ValueError(f"Invalid JSON: {e}")
+
+
+class ItemImporter:
+    """
+    Streams an item catalogue into `item_information`
+
+    Rows are validated one by one and inserted `chunk_size` at a time with a single
+    executemany per chunk. When a chunk fails it is replayed row by row so only the
+    offending rows are reported, the rest of the import carries on.
+
+    An image is extracted only once its row is valid. Images this import stored that no
+    item refers to once it is done, their rows refused by the database, are removed again.
+    """
+
+    def __init__(self, db, images: Optional[zipfile.ZipFile] = None, chunk_size: int = IMPORT_CHUNK_SIZE):
+        self.db = db
+        self.images = images
+        self.image_names = set(images.namelist()) if images else set()
+        self.extracted: Dict[str, str] = {}
+        # files stored by this import, not found already in the content store
+        self.created: Set[str] = set()
+        # files of the imported rows
+        self.used: Set[str] = set()
+        self.chunk_size = chunk_size
+        self.imported = 0
+        self.errors: List[dict] = []
+
+    def _error(self, row_no: int, errors: List[str]):
+        self.errors.append({"row": row_no, "errors": errors})
+
+    def _image_path(self, name: str) -> str:
+        if name in self.extracted:
+            return self.extracted[name]
+        if name not in self.image_names:
+            raise ValueError(f"image {name} not found in the archive")
+        try:
+            with self.images.open(name) as image:
+                filepath, created = content_store.store(image, name)
+        except FileTooLarge as e:
+            raise ValueError(f"image {name}: {e.message}")
+        self.extracted[name] = filepath
+        if created:
+            self.created.add(filepath)
+        return filepath
+
+    def _values(self, row: ImportItemRow) -> dict:
+        start_time, end_time = to_utc_naive(row.start_time), to_utc_naive(row.end_time)
+        return {
+            "name": row.item_name,
+            "start_time": start_time,
+            "end_time": end_time,
+            "status": resolve_item_status(start_time, end_time),
+            "start_price": row.start_price,
+            "current_bid": row.start_price,
+            "filepath": self._image_path(row.image) if row.image else None,
+        }
+
+    def _flush(self, chunk: List[Tuple[int, dict]]):
+        if not chunk:
+            return
+        session = self.db.session
+        try:
+            session.execute(insert(ItemInformation.__table__), [values for _, values in chunk])
+            session.commit()
+            self.imported += len(chunk)
+            self.used.update(values["filepath"] for _, values in chunk if values["filepath"])
+            return
+        except Exception:
+            session.rollback()
+        for row_no, values in chunk:
+            try:
+                session.execute(insert(ItemInformation.__table__), values)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                logger.warning(f"Bulk import row {row_no} failed: {str(getattr(e, 'orig', e)).strip()}")
+                self._error(row_no, [INSERT_FAILED])
+                continue
+            self.imported += 1
+            if values["filepath"]:
+                self.used.add(values["filepath"])
+
+    def _discard_unused_images(self):
+        unused = self.created - self.used
+        if not unused:
+            return
+        try:
+            # the same content uploaded meanwhile for another item is kept
+            result = self.db.session.execute(
+                select(ItemInformation.filepath).where(ItemInformation.filepath.in_(list(unused)))
+            )
+            unused -= set(result.scalars().all())
+        except Exception as e:
+            self.db.session.rollback()
+            logger.warning(f"Bulk import kept {len(unused)} unused images: {e}")
+            return
+        for filepath in unused:
+            content_store.discard(filepath)
+
+    def run(self, stream: BinaryIO, file_format: str) -> dict:
+        try:
+            self._import(stream, file_format)
+        finally:
+            self._discard_unused_images()
+        return {"imported": self.imported, "failed": len(self.errors), "errors": self.errors}
+
+    def _import(self, stream: BinaryIO, file_format: str):
+        chunk: List[Tuple[int, dict]] = []
+        for row_no, raw in iter_raw_rows(stream, file_format):
+            if isinstance(raw, ValueError):
+                self._error(row_no, [str(raw)])
+                continue
+            try:
+                chunk.append((row_no, self._values(ImportItemRow.parse_obj(raw))))
+            except ValidationError as e:
+                self._error(row_no, [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()])
+                continue
+            except ValueError as e:
+                self._error(row_no, [str(e)])
+                continue
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk)
+                chunk = []
+        self._flush(chunk)
+
+
+def import_items(stream: BinaryIO, file_format: str, images: Optional[BinaryIO] = None,
+                 chunk_size: int = IMPORT_CHUNK_SIZE) -> dict:
+    """
+    :param stream: binary CSV or JSON lines file
+    :param file_format: csv or jsonl
+    :param images: optional zip archive holding the files referenced by the `image` column
+    :param chunk_size: rows per insert batch
+    :return: imported and failed counts with the per row errors
+    """
+    try:
+        with DBConnection(DB_CONNECTION_LINK, False) as db:
+            try:
+                archive = zipfile.ZipFile(images) if images else None
+                return ItemImporter(db, archive, chunk_size).run(stream, file_format)
+            finally:
+                db.session.close()
+    except DatabaseErrors:
+        raise
+    except zipfile.BadZipFile:
+        raise
+    except Exception as e:
+        logger.error(f"Bulk import failed: {e}", exc_info=True)
+        raise DatabaseConnectionError
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import auction items from a CSV or JSON lines file")
+    parser.add_argument("path", help="CSV or JSONL file with item_name,start_time,end_time,start_price,image")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="defaults to the file extension")
+    parser.add_argument("--images", help="zip archive with the images referenced by the image column")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    with open(args.path, "rb") as items_file:
+        images_file = open(args.images, "rb") if args.images else None
+        try:
+            summary = import_items(items_file, args.format or detect_format(args.path), images_file, args.chunk_size)
+        finally:
+            if images_file:
+                images_file.close()
+    print(json.dumps(summary, indent=2))
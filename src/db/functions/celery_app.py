@@ -1,11 +1,14 @@
 from celery import Celery
 
+from src.common.utils.constants import CELERY_BROKER_URL, CELERY_RESULT_BACKEND
+
 celery_app = Celery(
     "auction_tasks",
-    broker="redis://localhost:6379/0",  # update if needed
-    backend="redis://localhost:6379/0"
+    broker=CELERY_BROKER_URL,
+    backend=CELERY_RESULT_BACKEND,
+    include=["src.db.functions.task"],
 )
 
 celery_app.conf.task_routes = {
-    "app.tasks.email.send_email_task": {"queue": "emails"}
+    "src.db.functions.task.*": {"queue": "emails"}
 }
@@ -1,58 +1,114 @@
 from datetime import datetime
-from sqlalchemy import select, and_
-from starlette.background import BackgroundTasks
+from typing import List, Optional
+
+from sqlalchemy import select, update, case
+
+from src.common.utils.constants import FINALIZE_BATCH_SIZE
 from src.db.utils import AsyncDBConnection
-from src.db.database import ItemInformation, Bid, Users
-from src.db.functions.task import send_email_task, send_winner_email_task
+from src.db.database import ItemInformation, Bid, Users, ItemStatus
+from src.db.functions.auction_events import publish_events
+from src.db.functions.outbox import enqueue_notifications
+
+
+async def finalize_auctions(item_ids: Optional[List[int]] = None, limit: int = FINALIZE_BATCH_SIZE) -> List[dict]:
+    """
+    Close up to `limit` ended auctions in one transaction
 
+    Ended items are locked with SKIP LOCKED, so concurrent finalizers split the work, the winner
+    of every item comes from one DISTINCT ON query over its bids, all items are completed by one
+    UPDATE and the winner and loser emails of every bidder go to the outbox in one INSERT.
+    Every worker's subscribers get an `auction_closed` event once it commits.
 
-async def declare_auction_winner(item_id: int, background_tasks: BackgroundTasks):
+    :param item_ids: only consider these items, every ended item otherwise
+    :return: item_id, name, winner and winning_bid of every auction closed
+    """
+    now = datetime.utcnow()
     async with AsyncDBConnection(False) as db:
-        item = await db.get(ItemInformation, item_id)
-        if not item or item.status is False:
-            return  # Auction already inactive or not found
+        ended = (
+            select(ItemInformation.item_id, ItemInformation.name)
+            .where(
+                ItemInformation.status.in_([ItemStatus.UPCOMING, ItemStatus.LIVE]),
+                ItemInformation.end_time <= now,
+            )
+            .order_by(ItemInformation.item_id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        if item_ids is not None:
+            ended = ended.where(ItemInformation.item_id.in_(item_ids))
+        names = dict((await db.execute(ended)).all())
+        if not names:
+            return []
 
-        # Get highest bid
         result = await db.execute(
-            select(Bid).where(Bid.item_id == item_id).order_by(Bid.bid_amount.desc())
+            select(Bid.item_id, Bid.user_id, Bid.bid_amount)
+            .where(Bid.item_id.in_(list(names)))
+            .distinct(Bid.item_id)
+            .order_by(Bid.item_id, Bid.bid_amount.desc(), Bid.bid_id)
         )
-        bids = result.scalars().all()
+        winners = {item_id: (user_id, amount) for item_id, user_id, amount in result.all()}
 
-        if not bids:
-            item.status = False  # No bids placed
-            await db.commit()
-            return
+        values = {"status": ItemStatus.COMPLETED, "version": ItemInformation.version + 1}
+        if winners:
+            values["won_by"] = case(
+                {item_id: user_id for item_id, (user_id, _) in winners.items()},
+                value=ItemInformation.item_id,
+                else_=ItemInformation.won_by,
+            )
+        await db.execute(
+            update(ItemInformation)
+            .where(ItemInformation.item_id.in_(list(names)))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
 
-        # Winner is first in sorted bids
-        winning_bid = bids[0]
-        item.status = False  # Mark auction as ended
-        item.won_by = winning_bid.user_id
-        await db.commit()
+        if winners:
+            # from the bids the winner was picked from, not `item_bidders`, which misses bids
+            # placed before it was backfilled
+            bidders = await db.execute(
+                select(Bid.item_id, Users.user_id, Users.email_id, Users.name)
+                .join(Users, Bid.user_id == Users.user_id)
+                .where(Bid.item_id.in_(list(winners)))
+                .distinct()
+            )
+            await enqueue_notifications(db, [
+                {
+                    "kind": "auction_result",
+                    "payload": {
+                        "email": email,
+                        "item_name": names[item_id],
+                        "amount": winners[item_id][1],
+                        "user_name": user_name,
+                        "winner": user_id == winners[item_id][0],
+                    },
+                    "dedup_key": f"auction_result:{item_id}:{user_id}",
+                }
+                for item_id, user_id, email, user_name in bidders.all()
+            ])
 
-        # Get winner's email
-        winner = await db.get(Users, winning_bid.user_id)
-        if winner:
-            background_tasks.add_task(send_winner_email_task, winner.email_id, item.name, winning_bid.bid_amount, winner=True)
+        closed = [
+            {
+                "item_id": item_id,
+                "name": name,
+                "winner": winners[item_id][0] if item_id in winners else None,
+                "winning_bid": winners[item_id][1] if item_id in winners else None,
+            }
+            for item_id, name in names.items()
+        ]
+        await publish_events(db, [{"event": "auction_closed", **auction} for auction in closed])
+        await db.commit()
+    return closed
 
-        # Notify all other bidders
-        other_user_ids = {bid.user_id for bid in bids if bid.user_id != winning_bid.user_id}
-        if other_user_ids:
-            users_result = await db.execute(select(Users).where(Users.user_id.in_(other_user_ids)))
-            other_users = users_result.scalars().all()
-            for user in other_users:
-                background_tasks.add_task(send_winner_email_task, user.email_id, item.name, winning_bid.bid_amount, winner=False)
 
+async def check_and_finalize_ended_auctions(item_ids: Optional[List[int]] = None) -> List[dict]:
+    """ Close every ended auction, `FINALIZE_BATCH_SIZE` per transaction """
+    closed = []
+    while True:
+        batch = await finalize_auctions(item_ids)
+        closed.extend(batch)
+        if len(batch) < FINALIZE_BATCH_SIZE:
+            return closed
 
-async def check_and_finalize_ended_auctions(background_tasks: BackgroundTasks):
-    async with AsyncDBConnection(False) as db:
-        now = datetime.utcnow()
-        result = await db.execute(
-            select(ItemInformation).where(
-                and_(ItemInformation.status == True, ItemInformation.end_time <= now)
-            )
-        )
-        items = result.scalars().all()
-        for item in items:
-            await declare_auction_winner(item.item_id, background_tasks)
 
-    # Logic to send email...
+async def declare_auction_winner(item_id: int):
+    await check_and_finalize_ended_auctions([item_id])
@@ -0,0 +1,131 @@
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from sqlalchemy import select, and_, true
+
+from src.common.utils.constants import EXPORT_BATCH_SIZE
+from src.db.database import ItemInformation, ItemStatus, Users
+from src.db.functions.bids import bid_source
+from src.db.routing import replica_router
+from src.db.utils import DBConnection
+
+BID_EXPORT_COLUMNS = (
+    ("bid_id", "int"),
+    ("item_id", "int"),
+    ("item_name", "string"),
+    ("item_status", "string"),
+    ("user_id", "int"),
+    ("user_email", "string"),
+    ("user_name", "string"),
+    ("bid_amount", "int"),
+    ("bid_time", "timestamptz"),
+)
+
+RESULT_EXPORT_COLUMNS = (
+    ("item_id", "int"),
+    ("item_name", "string"),
+    ("status", "string"),
+    ("start_time", "timestamp"),
+    ("end_time", "timestamp"),
+    ("start_price", "int"),
+    ("final_bid", "int"),
+    ("winner_id", "int"),
+    ("winner_email", "string"),
+    ("winner_name", "string"),
+)
+
+
+def _stream(query, batch_size: int) -> Iterator[List[tuple]]:
+    """
+    Run `query` on a server side cursor and yield its rows `batch_size` at a time,
+    only one batch is ever held in memory
+    """
+    with DBConnection(replica_router.read_connection_link(), False) as db:
+        try:
+            result = db.session.execute(query.execution_options(stream_results=True, max_row_buffer=batch_size))
+            for partition in result.partitions(batch_size):
+                yield [
+                    tuple(value.value if isinstance(value, ItemStatus) else value for value in row)
+                    for row in partition
+                ]
+        finally:
+            db.session.close()
+
+
+def stream_bids(date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                item_id: Optional[int] = None, status: Optional[ItemStatus] = None,
+                include_archived: bool = False, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[tuple]]:
+    """
+    Batches of bids joined with their bidder and item, in bid_id order
+
+    :param date_from: bids placed at or after
+    :param date_to: bids placed before
+    :param item_id: bids of a single item
+    :param status: bids of items in this status
+    :param include_archived: also export the archived bids
+    """
+    def condition(table):
+        return and_(
+            table.bid_time >= date_from if date_from else true(),
+            table.bid_time < date_to if date_to else true(),
+            table.item_id == item_id if item_id else true(),
+        )
+
+    bids = bid_source(condition, include_archived)
+    query = (
+        select(
+            bids.c.bid_id,
+            bids.c.item_id,
+            ItemInformation.name,
+            ItemInformation.status,
+            bids.c.user_id,
+            Users.email_id,
+            Users.name,
+            bids.c.bid_amount,
+            bids.c.bid_time,
+        )
+        .join(ItemInformation, bids.c.item_id == ItemInformation.item_id)
+        .join(Users, bids.c.user_id == Users.user_id)
+        .order_by(bids.c.bid_id)
+    )
+    if status:
+        query = query.where(ItemInformation.status == status)
+    return _stream(query, batch_size)
+
+
+def stream_results(date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                   item_id: Optional[int] = None, status: Optional[ItemStatus] = None,
+                   batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[tuple]]:
+    """
+    Batches of auction results (final bid and winner of every item), in item_id order
+
+    :param date_from: auctions ending at or after
+    :param date_to: auctions ending before
+    :param item_id: a single item
+    :param status: items in this status
+    """
+    query = (
+        select(
+            ItemInformation.item_id,
+            ItemInformation.name,
+            ItemInformation.status,
+            ItemInformation.start_time,
+            ItemInformation.end_time,
+            ItemInformation.start_price,
+            ItemInformation.current_bid,
+            ItemInformation.won_by,
+            Users.email_id,
+            Users.name,
+        )
+        .outerjoin(Users, ItemInformation.won_by == Users.user_id)
+        .order_by(ItemInformation.item_id)
+    )
+    if date_from:
+        query = query.where(ItemInformation.end_time >= date_from)
+    if date_to:
+        query = query.where(ItemInformation.end_time < date_to)
+    if item_id:
+        query = query.where(ItemInformation.item_id == item_id)
+    if status:
+        query = query.where(ItemInformation.status == status)
+    return _stream(query, batch_size)
@@ -1,10 +1,10 @@
-from src.common.utils.constants import DB_CONNECTION_LINK
 from src.db.errors import (
     ItemNotFound,
     DatabaseErrors,
     DataExtractionError,
     DatabaseConnectionError,
 )
+from src.db.routing import replica_router
 from src.db.utils import DBConnection
 from src.db.database import Users
 
@@ -18,7 +18,7 @@ def find_user_pass_email(email_id):
     @rtype: Tuple[str,bool]
     """
     try:
-        with DBConnection(DB_CONNECTION_LINK, False) as db:
+        with DBConnection(replica_router.read_connection_link(email_id), False) as db:
             try:
                 data = (
                     db.session.query(Users).filter(Users.email_id == email_id).first()
@@ -54,7 +54,7 @@ def find_user_pass_email_id(email_id):
     @rtype: Tuple[str,bool]
     """
     try:
-        with DBConnection(DB_CONNECTION_LINK, False) as db:
+        with DBConnection(replica_router.read_connection_link(email_id), False) as db:
             try:
                 data = (
                     db.session.query(Users).filter(Users.email_id == email_id).first()
@@ -1,27 +1,44 @@
-from sqlalchemy.sql.functions import now
+from datetime import datetime, timezone
+from typing import Optional
+
 from src.common.utils.constants import DB_CONNECTION_LINK
-from src.db.database import ItemInformation
+from src.common.utils.etags import etag_matches, version_etag
+from src.common.utils.image_derivatives import image_urls
+from src.common.utils.pagination import decode_cursor, build_page, estimate_count
+from src.db.database import ItemInformation, ItemStatus
 from src.db.errors import DataInjectionError, DatabaseErrors, DatabaseConnectionError
+from src.db.functions.item_cache import CachedItem, item_cache, changed_statement
+from src.db.functions.live_catalog import live_catalog, item_listing_row
+from src.db.routing import replica_router
 from src.db.utils import DBConnection
 
 
+def to_utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """ item times are stored as naive UTC """
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def resolve_item_status(start_time: datetime, end_time: datetime, now: Optional[datetime] = None) -> ItemStatus:
+    now = now or datetime.utcnow()
+    if start_time and start_time > now:
+        return ItemStatus.UPCOMING
+    elif end_time and end_time < now:
+        return ItemStatus.COMPLETED
+    return ItemStatus.LIVE
+
+
 def add_item_detail(item_name: str, start_time, end_time, start_price: int, filepath: str):
+    start_time, end_time = to_utc_naive(start_time), to_utc_naive(end_time)
     try:
         with DBConnection(DB_CONNECTION_LINK, False) as db:
             try:
-
-                if start_time and start_time > now:
-                    status = "upcoming"
-                elif end_time and end_time < now:
-                    status = "completed"
-                else:
-                    status = "live"
-
                 item = ItemInformation(
                     name=item_name,
                     start_time=start_time,
                     end_time=end_time,
-                    status=status,
+                    status=resolve_item_status(start_time, end_time),
                     start_price=start_price,
                     current_bid=start_price,
                     user_id=None,
@@ -29,8 +46,11 @@ def add_item_detail(item_name: str, start_time, end_time, start_price: int, file
                     filepath=filepath
                 )
                 db.session.add(item)
+                db.session.flush()
+                cached = CachedItem.from_row(item)
                 db.session.commit()
-                return item.item_id
+                live_catalog.apply(cached)
+                return cached.item_id
             except Exception as e:
                 print(e)
                 raise DataInjectionError
@@ -49,7 +69,13 @@ def update_item_detail(item_id: int, item_name: str, start_time, end_time, start
     try:
         with DBConnection(DB_CONNECTION_LINK, False) as db:
             try:
-                item = db.session.query(ItemInformation).filter(ItemInformation.item_id == item_id).first()
+                # locked like a bid would, so neither loses the other's version bump
+                item = (
+                    db.session.query(ItemInformation)
+                    .filter(ItemInformation.item_id == item_id)
+                    .with_for_update()
+                    .first()
+                )
 
                 item.name = item_name
                 item.start_time = start_time
@@ -59,8 +85,13 @@ def update_item_detail(item_id: int, item_name: str, start_time, end_time, start
                 item.user_id = user_id
                 item.status = status
                 item.won_by = won_by
+                item.version += 1
+                cached = CachedItem.from_row(item)
+                db.session.execute(changed_statement(item.item_id))
                 db.session.commit()
-                return item.item_id
+                item_cache.put(cached)
+                live_catalog.apply(cached)
+                return cached.item_id
             except Exception as e:
                 print(e)
                 raise DataInjectionError
@@ -74,28 +105,40 @@ def update_item_detail(item_id: int, item_name: str, start_time, end_time, start
         raise DatabaseConnectionError
 
 
-def get_item_detail():
+def _item_page(db, query, scope: str, limit: int, last_item_id, include_total: bool, if_none_match: Optional[str]):
+    total_query = query
+    if last_item_id is not None:
+        query = query.filter(ItemInformation.item_id > last_item_id)
+    query = query.order_by(ItemInformation.item_id).limit(limit + 1)
+    # the ids and versions of the page's rows identify it, two narrow columns instead of the whole page
+    versions = query.with_entities(ItemInformation.item_id, ItemInformation.version).all()
+    etag = version_etag("items", scope, limit, last_item_id, include_total,
+                        [tuple(row) for row in versions])
+    if etag_matches(if_none_match, etag):
+        return {"etag": etag, "not_modified": True}
+    total = estimate_count(db.session, total_query.statement) if include_total else None
+    page = build_page(query.all(), limit, key=lambda item: item.item_id, serialize=item_listing_row,
+                      total_estimate=total)
+    page["etag"] = etag
+    return page
+
+
+def get_item_detail(limit: int, cursor: Optional[str] = None, include_total: bool = False, user_key=None,
+                    if_none_match: Optional[str] = None):
+    """
+    :param limit: page size
+    :param cursor: next_cursor of the previous page
+    :param include_total: add a planner estimate of the total number of items
+    :param user_key: caller id, keeps reads on the primary right after the caller's own writes
+    :param if_none_match: ETag the client holds, only `etag` and `not_modified` come back when it's current
+    :return: page of every item ordered by item_id, with its etag
+    """
+    last_item_id = decode_cursor(cursor)
     try:
-        with DBConnection(DB_CONNECTION_LINK, False) as db:
+        with DBConnection(replica_router.read_connection_link(user_key), False) as db:
             try:
-                item = db.session.query(ItemInformation).all()
-                output = []
-                if item:
-                    for item in item:
-                        output.append({
-                            "item_id": item.item_id,
-                            "item_name": item.name,
-                            "start_time": item.start_time,
-                            "end_time": item.end_time,
-                            "start_price": item.start_price,
-                            "current_bid": item.current_bid,
-                            "user_id": item.user_id,
-                            "status": item.status,
-                            "won_by": item.won_by
-                        })
-                return output if output else {
-                    "message": "No item found"
-                }
+                return _item_page(db, db.session.query(ItemInformation), "all", limit, last_item_id, include_total,
+                                  if_none_match)
             except Exception as e:
                 print(e)
                 raise DataInjectionError
@@ -109,29 +152,26 @@ def get_item_detail():
         raise DatabaseConnectionError
 
 
-def get_item_detail_for_user():
+def get_item_detail_for_user(limit: int, cursor: Optional[str] = None, include_total: bool = False, user_key=None,
+                             if_none_match: Optional[str] = None):
+    """
+    :param limit: page size
+    :param cursor: next_cursor of the previous page
+    :param include_total: add a planner estimate of the total number of live items
+    :param user_key: caller id, keeps reads on the primary right after the caller's own writes
+    :param if_none_match: ETag the client holds, only `etag` and `not_modified` come back when it's current
+    :return: page of the live items ordered by item_id, with its etag, from the live catalog once
+        it is loaded, its rows are then already encoded in `items_json`
+    """
+    last_item_id = decode_cursor(cursor)
+    snapshot = live_catalog.snapshot
+    if snapshot is not None:
+        return snapshot.page(limit, last_item_id, include_total, if_none_match)
     try:
-        with DBConnection(DB_CONNECTION_LINK, False) as db:
+        with DBConnection(replica_router.read_connection_link(user_key), False) as db:
             try:
-                item = db.session.query(ItemInformation).filter(ItemInformation.status == True).all()
-                output = []
-                if item:
-                    for item in item:
-                        output.append({
-                            "item_id": item.item_id,
-                            "item_name": item.name,
-                            "start_time": item.start_time,
-                            "end_time": item.end_time,
-                            "start_price": item.start_price,
-                            "current_bid": item.current_bid,
-                            "user_id": item.user_id,
-                            "status": item.status,
-                            "won_by": item.won_by
-                        })
-                else:
-                    return output if output else {
-                        "message": "No item found"
-                    }
+                query = db.session.query(ItemInformation).filter(ItemInformation.status == ItemStatus.LIVE)
+                return _item_page(db, query, "live", limit, last_item_id, include_total, if_none_match)
             except Exception as e:
                 print(e)
                 raise DataInjectionError
@@ -145,31 +185,16 @@ def get_item_detail_for_user():
         raise DatabaseConnectionError
 
 
-def get_item_detail_by_id(item_id):
+def load_item(item_id: int) -> Optional[CachedItem]:
+    """ Item from the cache, read from the primary and cached on a miss """
+    item = item_cache.get(item_id)
+    if item is not None:
+        return item
     try:
         with DBConnection(DB_CONNECTION_LINK, False) as db:
             try:
-                item = db.session.query(ItemInformation).filter(ItemInformation.item_id == item_id).first()
-
-                if item:
-                    print(type(item.start_price))
-                    return {
-                        "item_id": item.item_id,
-                        "item_name": item.name,
-                        "start_time": item.start_time.strftime("%Y-%m-%d %H:%M:%S"),
-                        "end_time": item.end_time.strftime("%Y-%m-%d %H:%M:%S"),
-                        "start_price": item.start_price,
-                        "current_bid": item.current_bid,
-                        "user_id": item.user_id,
-                        "status": item.status,
-                        "won_by": item.won_by
-                    }
-
-                else:
-                    return {
-                        "message": "No item found"
-                    }
-
+                row = db.session.query(ItemInformation).filter(ItemInformation.item_id == item_id).first()
+                return item_cache.put(CachedItem.from_row(row)) if row else None
             except Exception as e:
                 print(e)
                 raise DataInjectionError
@@ -183,6 +208,33 @@ def get_item_detail_by_id(item_id):
         raise DatabaseConnectionError
 
 
+def get_item_detail_by_id(item_id):
+    try:
+        item = load_item(int(item_id))
+    except ValueError:
+        item = None
+
+    if item:
+        return {
+            "item_id": item.item_id,
+            "item_name": item.name,
+            "start_time": item.start_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "end_time": item.end_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "start_price": item.start_price,
+            "current_bid": item.current_bid,
+            "user_id": item.user_id,
+            "status": item.status,
+            "won_by": item.won_by,
+            "version": item.version,
+            **image_urls(item.filepath),
+        }
+
+    else:
+        return {
+            "message": "No item found"
+        }
+
+
 def delete_item(item_id):
     try:
         with DBConnection(DB_CONNECTION_LINK, False) as db:
@@ -191,7 +243,10 @@ def delete_item(item_id):
 
                 if item:
                     db.session.delete(item)
+                    db.session.execute(changed_statement(item.item_id))
                     db.session.commit()
+                    item_cache.invalidate(item.item_id)
+                    live_catalog.remove(item.item_id)
                     return {
                         "message": "Item deleted successfully"
                     }
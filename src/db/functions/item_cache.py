@@ -0,0 +1,152 @@
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields, replace
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, func
+
+from src.common.utils.constants import ITEM_CACHE_SIZE, ITEM_CACHE_TTL_SECONDS
+from src.db.database import ItemStatus
+
+# admin edits and deletes are announced here, every other worker drops its copy
+ITEM_CACHE_CHANNEL = "item_cache"
+# a worker skips its own announcements, its copy is already up to date
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass(frozen=True)
+class CachedItem:
+    """ Detached copy of an `ItemInformation` row, safe to share between requests """
+    item_id: int
+    name: Optional[str]
+    start_time: datetime
+    end_time: datetime
+    current_bid: Optional[int]
+    user_id: Optional[int]
+    status: ItemStatus
+    start_price: Optional[int]
+    won_by: Optional[int]
+    filepath: Optional[str]
+    extensions: int = 0
+    version: int = 1
+
+    @classmethod
+    def from_row(cls, item) -> "CachedItem":
+        return cls(**{field.name: getattr(item, field.name) for field in fields(cls)})
+
+
+class ItemCache:
+    """
+    LRU of `CachedItem` with a TTL, shared by the item endpoints, bid validation and the live feed
+
+    Writers in this worker update entries in place after their commit. Other workers' writes
+    reach it through the auction lifecycle and `bid_placed` events and through NOTIFY
+    item_cache, the TTL bounds how stale a copy gets while the listener is reconnecting.
+    """
+
+    def __init__(self, max_size: int = ITEM_CACHE_SIZE, ttl_seconds: float = ITEM_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[int, tuple]" = OrderedDict()
+        # sync item functions also run in the threadpool
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, item_id: int) -> Optional[CachedItem]:
+        with self.lock:
+            entry = self.entries.get(item_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, item = entry
+            if expires_at <= time.monotonic():
+                del self.entries[item_id]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(item_id)
+            self.hits += 1
+            return item
+
+    def put(self, item: CachedItem) -> CachedItem:
+        if not self.max_size:
+            return item
+        with self.lock:
+            self.entries[item.item_id] = (time.monotonic() + self.ttl_seconds, item)
+            self.entries.move_to_end(item.item_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return item
+
+    def update(self, item_id: int, **changes):
+        """ Apply a committed change to a cached copy, nothing to do when it isn't cached """
+        with self.lock:
+            entry = self.entries.get(item_id)
+            if entry is not None:
+                self.entries[item_id] = (entry[0], replace(entry[1], **changes))
+
+    def apply_bid(self, event: dict):
+        """ Apply another worker's `bid_placed` event, a copy that missed a change in between is dropped """
+        with self.lock:
+            entry = self.entries.get(event["item_id"])
+            if entry is None:
+                return
+            expires_at, item = entry
+            if item.version != event["version"] - 1:
+                del self.entries[item.item_id]
+                self.invalidations += 1
+                return
+            end_time = event["end_time"]
+            self.entries[item.item_id] = (expires_at, replace(
+                item,
+                current_bid=event["current_bid"],
+                won_by=event["won_by"],
+                end_time=datetime.fromisoformat(end_time) if isinstance(end_time, str) else end_time,
+                extensions=event["extensions"],
+                version=event["version"],
+            ))
+
+    def invalidate(self, item_id: int):
+        with self.lock:
+            if self.entries.pop(item_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def on_notify(self, connection, pid, channel, payload: str):
+        item_id, _, worker = payload.partition(":")
+        if worker != WORKER_ID:
+            self.invalidate(int(item_id))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+def changed_statement(item_id: int):
+    """ NOTIFY for the other workers' caches, executed in the writer's transaction """
+    return select(func.pg_notify(ITEM_CACHE_CHANNEL, f"{item_id}:{WORKER_ID}"))
+
+
+item_cache = ItemCache()
@@ -0,0 +1,310 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from functools import cached_property
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+
+from src.common.utils.constants import LIVE_CATALOG_CHECK_SECONDS
+from src.common.utils.error_handlers import logger
+from src.common.utils.etags import etag_matches, version_etag
+from src.common.utils.image_derivatives import image_urls
+from src.common.utils.pagination import encode_cursor
+from src.db.database import ItemInformation, ItemStatus
+from src.db.functions.item_cache import CachedItem, WORKER_ID
+from src.db.utils import AsyncDBConnection
+
+# version recorded for deleted items, no later read can bring them back
+DELETED = sys.maxsize
+
+
+def item_listing_row(item) -> dict:
+    return {
+        "item_id": item.item_id,
+        "item_name": item.name,
+        "start_time": item.start_time,
+        "end_time": item.end_time,
+        "start_price": item.start_price,
+        "current_bid": item.current_bid,
+        "user_id": item.user_id,
+        "status": item.status,
+        "won_by": item.won_by,
+        **image_urls(item.filepath),
+    }
+
+
+# Helper to serialize item information, rows and cached items alike
+def serialize_item(item) -> dict:
+    return {
+        "item_id": item.item_id,
+        "name": item.name,
+        "current_bid": item.current_bid,
+        "end_time": item.end_time.isoformat() if item.end_time else None,
+        "start_time": item.start_time.isoformat() if item.start_time else None,
+        "status": item.status.value,
+        "start_price": item.start_price,
+        "won_by": item.won_by,
+        **image_urls(item.filepath),
+    }
+
+
+def encode(value) -> str:
+    """ Same JSON as the framework's responses """
+    return json.dumps(jsonable_encoder(value), ensure_ascii=False, separators=(",", ":"))
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """ A live item with its listing row and websocket payload, encoded once when it changes """
+    item: CachedItem
+    listing: bytes
+    feed: str
+
+    @classmethod
+    def of(cls, item: CachedItem) -> "CatalogEntry":
+        return cls(item, encode(item_listing_row(item)).encode(), encode(serialize_item(item)))
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """ Immutable view of every live item ordered by item_id, replaced as a whole on every change """
+    version: int
+    entries: Tuple[CatalogEntry, ...]
+    ids: Tuple[int, ...] = field(repr=False)
+
+    @cached_property
+    def feed_json(self) -> str:
+        """ The active items websocket message, encoded once per snapshot """
+        return "[" + ",".join(entry.feed for entry in self.entries) + "]"
+
+    def page(self, limit: int, last_item_id=None, include_total: bool = False,
+             if_none_match: Optional[str] = None) -> dict:
+        """
+        Same page and ETag as the database listing of the live items, with `items_json`, the
+        encoded rows, in place of `items`
+        """
+        start = bisect_right(self.ids, last_item_id) if last_item_id is not None else 0
+        window = self.entries[start:start + limit + 1]
+        etag = version_etag("items", "live", limit, last_item_id, include_total,
+                            [(entry.item.item_id, entry.item.version) for entry in window])
+        if etag_matches(if_none_match, etag):
+            return {"etag": etag, "not_modified": True}
+        rows = window[:limit]
+        return {
+            "items_json": b"[" + b",".join(entry.listing for entry in rows) + b"]",
+            "next_cursor": encode_cursor(rows[-1].item.item_id) if len(window) > limit and rows else None,
+            "total_estimate": len(self.ids) if include_total else None,
+            "etag": etag,
+        }
+
+
+class LiveCatalog:
+    """
+    Every live item of the auction held in memory, the live listing and the active items feed
+    are served from its current `snapshot` without touching the database
+
+    It is loaded whenever the event listener (re)connects. After that bids and edits of this
+    worker are applied once committed and other workers' bids from their `bid_placed` events,
+    lifecycle events and other workers' edits (NOTIFY item_cache) make it read the item again.
+    Item versions order the changes, an older copy never replaces a newer one. `check` compares
+    it with the database every LIVE_CATALOG_CHECK_SECONDS and reads the differing items again.
+    """
+
+    def __init__(self, check_seconds: float = LIVE_CATALOG_CHECK_SECONDS):
+        self.check_seconds = check_seconds
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self.entries: Dict[int, CatalogEntry] = {}
+        # newest version seen of every item, live or not
+        self.versions: Dict[int, int] = {}
+        # items changed while a load reads the database, their newer state survives the load
+        self.loading: Optional[Set[int]] = None
+        self.version = 0
+        # sync item functions also run in the threadpool
+        self.lock = threading.Lock()
+        self.tasks = set()
+        self.loads = 0
+        self.applied = 0
+        self.stale = 0
+        self.checks = 0
+        self.mismatches = 0
+        self.loaded_at: Optional[float] = None
+        self.checked_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.snapshot is not None
+
+    def _publish(self):
+        self.version += 1
+        entries = tuple(self.entries[item_id] for item_id in sorted(self.entries))
+        self.snapshot = CatalogSnapshot(self.version, entries, tuple(entry.item.item_id for entry in entries))
+
+    def apply(self, item: CachedItem) -> bool:
+        """ Take a committed copy of an item, False when a newer one was already applied """
+        with self.lock:
+            known = self.versions.get(item.item_id)
+            if known is not None and item.version <= known:
+                self.stale += 1
+                return False
+            self.versions[item.item_id] = item.version
+            if self.loading is not None:
+                self.loading.add(item.item_id)
+            self.applied += 1
+            if item.status == ItemStatus.LIVE:
+                self.entries[item.item_id] = CatalogEntry.of(item)
+            elif self.entries.pop(item.item_id, None) is None:
+                return True
+            if self.snapshot is not None:
+                self._publish()
+            return True
+
+    def apply_bid(self, event: dict):
+        """ Apply another worker's `bid_placed` event, the item is read again when a change was missed before it """
+        if self.snapshot is None:
+            return
+        item_id, version = event["item_id"], event["version"]
+        entry = self.entries.get(item_id)
+        if entry is None or entry.item.version != version - 1:
+            if self.versions.get(item_id, 0) < version:
+                self.changed(item_id)
+            return
+        end_time = event["end_time"]
+        self.apply(replace(
+            entry.item,
+            current_bid=event["current_bid"],
+            won_by=event["won_by"],
+            end_time=datetime.fromisoformat(end_time) if isinstance(end_time, str) else end_time,
+            extensions=event["extensions"],
+            version=version,
+        ))
+
+    def remove(self, item_id: int):
+        """ Drop a deleted item """
+        with self.lock:
+            self.versions[item_id] = DELETED
+            if self.loading is not None:
+                self.loading.add(item_id)
+            if self.entries.pop(item_id, None) is not None and self.snapshot is not None:
+                self._publish()
+
+    async def load(self):
+        """ Read every live item, the cold start and the recovery after missed events """
+        with self.lock:
+            self.loading = set()
+        try:
+            async with AsyncDBConnection(False) as db:
+                result = await db.execute(select(ItemInformation).where(ItemInformation.status == ItemStatus.LIVE))
+                items = [CachedItem.from_row(row) for row in result.scalars().all()]
+        except BaseException:
+            with self.lock:
+                self.loading = None
+            raise
+        with self.lock:
+            changed, self.loading = self.loading, None
+            entries = {}
+            for item in items:
+                if item.item_id in changed and self.versions[item.item_id] >= item.version:
+                    continue
+                self.versions[item.item_id] = item.version
+                entries[item.item_id] = CatalogEntry.of(item)
+            for item_id in changed:
+                if item_id in self.entries and item_id not in entries:
+                    entries[item_id] = self.entries[item_id]
+            self.entries = entries
+            self.loads += 1
+            self.loaded_at = time.time()
+            self._publish()
+        logger.info(f"Live catalog loaded, {len(entries)} items")
+
+    async def refresh(self, item_ids: Iterable[int]):
+        """ Read items again after a change made elsewhere """
+        item_ids = set(item_ids)
+        if not item_ids:
+            return
+        async with AsyncDBConnection(False) as db:
+            result = await db.execute(select(ItemInformation).where(ItemInformation.item_id.in_(item_ids)))
+            items = [CachedItem.from_row(row) for row in result.scalars().all()]
+        for item in items:
+            self.apply(item)
+        for item_id in item_ids - {item.item_id for item in items}:
+            self.remove(item_id)
+
+    def changed(self, item_id: int):
+        """ Refresh an item in the background, a failed read is caught up by the next check """
+        task = asyncio.ensure_future(self.refresh([item_id]))
+        self.tasks.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task: asyncio.Future):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Live catalog refresh failed: {task.exception()}")
+
+    def on_notify(self, connection, pid, channel, payload: str):
+        item_id, _, worker = payload.partition(":")
+        if worker != WORKER_ID:
+            self.changed(int(item_id))
+
+    async def check(self) -> int:
+        """
+        Compare the snapshot with the live items of the database and read the differing ones again
+
+        :return: number of differing items
+        """
+        snapshot = self.snapshot
+        if snapshot is None:
+            return 0
+        async with AsyncDBConnection(False) as db:
+            result = await db.execute(
+                select(ItemInformation.item_id, ItemInformation.version)
+                .where(ItemInformation.status == ItemStatus.LIVE)
+            )
+            expected = dict(result.all())
+        held = {entry.item.item_id: entry.item.version for entry in snapshot.entries}
+        differing = {item_id for item_id in expected.keys() | held.keys() if expected.get(item_id) != held.get(item_id)}
+        self.checks += 1
+        self.checked_at = time.time()
+        if differing:
+            self.mismatches += len(differing)
+            logger.warning(f"Live catalog differed from the database on {len(differing)} items")
+            await self.refresh(differing)
+        return len(differing)
+
+    async def run(self, stop: asyncio.Event):
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.check_seconds)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                break
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"Live catalog check error: {e}")
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        snapshot = self.snapshot
+        return {
+            "ready": snapshot is not None,
+            "version": snapshot.version if snapshot else None,
+            "items": len(snapshot.entries) if snapshot else 0,
+            "loads": self.loads,
+            "applied": self.applied,
+            "stale": self.stale,
+            "checks": self.checks,
+            "mismatches": self.mismatches,
+            "loaded_at": self.loaded_at,
+            "checked_at": self.checked_at,
+        }
+
+
+live_catalog = LiveCatalog()
@@ -0,0 +1,110 @@
+import asyncio
+import inspect
+import time
+from typing import Callable, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from src.common.utils.constants import NOTIFICATION_QUEUE_SIZE, NOTIFICATION_CONCURRENCY, NOTIFICATION_DRAIN_SECONDS
+from src.common.utils.error_handlers import logger
+
+
+class NotificationWorker:
+    """
+    Delivers notifications from asyncio tasks inside the current process, no broker needed
+
+    Submissions wait when the queue already holds `queue_size` notifications, so a burst slows the
+    producer down instead of growing memory. At most `concurrency` deliveries run at once; blocking
+    handlers are run in the threadpool. `stop()` stops accepting work and lets the queue drain for
+    up to `drain_seconds` before the remaining deliveries are cancelled.
+    """
+
+    def __init__(self, queue_size: int = NOTIFICATION_QUEUE_SIZE, concurrency: int = NOTIFICATION_CONCURRENCY,
+                 drain_seconds: float = NOTIFICATION_DRAIN_SECONDS):
+        self.queue_size = queue_size
+        self.concurrency = concurrency
+        self.drain_seconds = drain_seconds
+        self.queue: Optional[asyncio.Queue] = None
+        self.consumers: List[asyncio.Task] = []
+        self.accepting = False
+        self.delivered = 0
+        self.failed = 0
+        self.delivery_seconds = 0.0
+
+    async def start(self):
+        if self.accepting:
+            return
+        # created here so the queue belongs to the running loop
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.accepting = True
+        self.consumers = [asyncio.create_task(self._consume()) for _ in range(self.concurrency)]
+        logger.info(f"Notification worker started with {self.concurrency} consumers")
+
+    async def submit(self, handler: Callable, **kwargs) -> asyncio.Future:
+        """ Queue `handler(**kwargs)`, the returned future resolves once it has run """
+        if not self.accepting:
+            raise RuntimeError("Notification worker is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((handler, kwargs, future))
+        return future
+
+    async def deliver(self, handler: Callable, **kwargs):
+        """ Queue `handler(**kwargs)` and wait for it, returning what the handler returned or raising what it raised """
+        return await (await self.submit(handler, **kwargs))
+
+    async def _consume(self):
+        while True:
+            handler, kwargs, future = await self.queue.get()
+            started = time.monotonic()
+            try:
+                if inspect.iscoroutinefunction(handler):
+                    result = await handler(**kwargs)
+                else:
+                    result = await run_in_threadpool(handler, **kwargs)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                self.delivered += 1
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self.delivery_seconds += time.monotonic() - started
+                self.queue.task_done()
+
+    async def stop(self, drain_seconds: Optional[float] = None):
+        if not self.consumers:
+            return
+        self.accepting = False
+        timeout = self.drain_seconds if drain_seconds is None else drain_seconds
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Notification worker stopped with {self.queue.qsize()} notifications not delivered")
+        for consumer in self.consumers:
+            consumer.cancel()
+        await asyncio.gather(*self.consumers, return_exceptions=True)
+        self.consumers = []
+        while not self.queue.empty():
+            _, _, future = self.queue.get_nowait()
+            future.cancel()
+        logger.info("Notification worker stopped")
+
+    def stats(self) -> dict:
+        handled = self.delivered + self.failed
+        return {
+            "running": self.accepting,
+            "queued": self.queue.qsize() if self.queue else 0,
+            "queue_size": self.queue_size,
+            "concurrency": self.concurrency,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "avg_delivery_ms": self.delivery_seconds / handled * 1000 if handled else 0.0,
+        }
+
+
+notification_worker = NotificationWorker()
@@ -0,0 +1,285 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update, func, text, Integer, String, JSON, DateTime
+from sqlalchemy.dialects.postgresql import insert
+from starlette.concurrency import run_in_threadpool
+
+from src.common.utils.constants import (
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_CONCURRENCY,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_POLL_SECONDS,
+    OUTBOX_LEASE_SECONDS,
+    NOTIFICATION_BACKEND,
+)
+from src.common.utils.error_handlers import logger
+from src.common.utils.mailer import mail_pool
+from src.common.utils.send_notification import bid_notification_message, auction_result_message, \
+    auction_result_messages, outbid_digest_message
+from src.db.database import NotificationOutbox
+from src.db.functions.notification_worker import notification_worker
+from src.db.functions.task import send_email_task, send_winner_email_task, send_outbid_digest_task
+from src.db.utils import AsyncDBConnection
+
+# kind -> email builder, called with the payload as keyword arguments, the built messages of a
+# batch are sent over pooled SMTP connections by the in-process notification worker
+MESSAGES = {
+    "outbid": bid_notification_message,
+    "auction_result": auction_result_message,
+    "outbid_digest": outbid_digest_message,
+}
+
+# kind -> builder of every email of that kind in a batch at once, called with the payloads,
+# preferred over MESSAGES so an auction's results are rendered together
+BATCH_MESSAGES = {
+    "auction_result": auction_result_messages,
+}
+
+# kind -> Celery task, used instead of MESSAGES when NOTIFICATION_BACKEND is "celery"
+CELERY_TASKS = {
+    "outbid": send_email_task,
+    "auction_result": send_winner_email_task,
+    "outbid_digest": send_outbid_digest_task,
+}
+
+CLAIM_QUERY = text(
+    """
+    UPDATE notification_outbox
+    SET attempts = attempts + 1, available_at = now() + make_interval(secs => :lease)
+    WHERE id IN (
+        SELECT id FROM notification_outbox
+        WHERE status = 'pending' AND available_at <= now()
+        ORDER BY available_at, id
+        FOR UPDATE SKIP LOCKED
+        LIMIT :batch_size
+    )
+    RETURNING id, kind, payload, attempts, created_at
+    """
+).columns(id=Integer, kind=String, payload=JSON, attempts=Integer, created_at=DateTime(timezone=True))
+
+
+async def enqueue_notifications(db, notifications: List[dict]):
+    """
+    Add notifications to the outbox, they are committed (or rolled back) together with
+    the caller's transaction
+
+    :param notifications: dicts with kind, payload and an optional dedup_key
+    """
+    if not notifications:
+        return
+    await db.execute(
+        insert(NotificationOutbox)
+        .values([
+            {"kind": n["kind"], "payload": n["payload"], "dedup_key": n.get("dedup_key")}
+            for n in notifications
+        ])
+        .on_conflict_do_nothing(index_elements=[NotificationOutbox.dedup_key])
+    )
+
+
+async def enqueue_notification(db, kind: str, payload: dict, dedup_key: Optional[str] = None):
+    await enqueue_notifications(db, [{"kind": kind, "payload": payload, "dedup_key": dedup_key}])
+
+
+def error_text(error: BaseException) -> str:
+    return str(error) or type(error).__name__
+
+
+class OutboxDispatcher:
+    """
+    Drains `notification_outbox` in batches
+
+    A batch is claimed with FOR UPDATE SKIP LOCKED and leased for `lease_seconds`, so any number
+    of dispatchers (in the web workers or standalone) can run side by side and a crashed
+    dispatcher's batch is picked up again once its lease expires. Failed deliveries are retried
+    with exponential backoff until `max_attempts`, then left as `failed`.
+
+    Notifications are built into emails, an auction's results rendered together, and sent in groups over pooled SMTP connections by the
+    in-process notification worker, or only handed to the broker when `backend` is "celery", the
+    tasks then retry failed deliveries themselves with backoff, up to `OUTBOX_MAX_ATTEMPTS` times.
+    """
+
+    def __init__(self, batch_size: int = OUTBOX_BATCH_SIZE, concurrency: int = OUTBOX_CONCURRENCY,
+                 max_attempts: int = OUTBOX_MAX_ATTEMPTS, poll_interval: float = OUTBOX_POLL_SECONDS,
+                 lease_seconds: int = OUTBOX_LEASE_SECONDS, backend: str = NOTIFICATION_BACKEND):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.backend = backend
+        self.started_at = time.monotonic()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.batches = 0
+        self.last_batch_seconds = 0.0
+        self.last_delivery_lag_seconds = 0.0
+
+    async def _enqueue_task(self, semaphore: asyncio.Semaphore, row) -> Optional[str]:
+        task = CELERY_TASKS.get(row.kind)
+        if task is None:
+            return f"unknown notification kind {row.kind}"
+        async with semaphore:
+            try:
+                await run_in_threadpool(task.delay, **row.payload)
+            except Exception as e:
+                return error_text(e)
+        return None
+
+    async def _send_batch(self, rows) -> List[Optional[str]]:
+        """
+        Build the emails of a batch and send them in `concurrency` groups, each group back to back
+        over one pooled SMTP connection
+
+        :return: one entry per row, None when it was sent or why it wasn't
+        """
+        errors: List[Optional[str]] = [None] * len(rows)
+        built: Dict[int, EmailMessage] = {}
+        batched: Dict[str, List[int]] = {}
+        for position, row in enumerate(rows):
+            if row.kind in BATCH_MESSAGES:
+                batched.setdefault(row.kind, []).append(position)
+                continue
+            build = MESSAGES.get(row.kind)
+            if build is None:
+                errors[position] = f"unknown notification kind {row.kind}"
+                continue
+            try:
+                built[position] = build(**row.payload)
+            except Exception as e:
+                errors[position] = error_text(e)
+        for kind, kind_positions in batched.items():
+            try:
+                built.update(zip(kind_positions, BATCH_MESSAGES[kind]([rows[p].payload for p in kind_positions])))
+            except Exception as e:
+                for position in kind_positions:
+                    errors[position] = error_text(e)
+        positions = sorted(built)
+        messages = [built[position] for position in positions]
+        if not messages:
+            return errors
+
+        size = -(-len(messages) // self.concurrency)
+        groups = [range(start, min(start + size, len(messages))) for start in range(0, len(messages), size)]
+        results = await asyncio.gather(
+            *(notification_worker.deliver(mail_pool.send_many, messages=[messages[i] for i in group])
+              for group in groups),
+            return_exceptions=True,
+        )
+        for group, result in zip(groups, results):
+            for offset, i in enumerate(group):
+                error = result if isinstance(result, BaseException) else result[offset]
+                if error is not None:
+                    errors[positions[i]] = error_text(error)
+        return errors
+
+    async def drain_once(self) -> int:
+        """ Claim and deliver one batch, returns the number of claimed notifications """
+        started = time.monotonic()
+        async with AsyncDBConnection(False) as db:
+            result = await db.execute(CLAIM_QUERY, {"lease": self.lease_seconds, "batch_size": self.batch_size})
+            rows = result.all()
+            await db.commit()
+        if not rows:
+            return 0
+
+        if self.backend == "celery":
+            semaphore = asyncio.Semaphore(self.concurrency)
+            errors = await asyncio.gather(*(self._enqueue_task(semaphore, row) for row in rows))
+        else:
+            errors = await self._send_batch(rows)
+
+        sent_ids = [row.id for row, error in zip(rows, errors) if error is None]
+        async with AsyncDBConnection(False) as db:
+            if sent_ids:
+                await db.execute(
+                    update(NotificationOutbox)
+                    .where(NotificationOutbox.id.in_(sent_ids))
+                    .values(status="sent", sent_at=func.now(), last_error=None)
+                )
+            for row, error in zip(rows, errors):
+                if error is None:
+                    continue
+                if row.attempts >= self.max_attempts:
+                    values = {"status": "failed", "last_error": error}
+                    self.failed += 1
+                else:
+                    backoff = timedelta(seconds=min(2 ** row.attempts, 300))
+                    values = {"available_at": func.now() + backoff, "last_error": error}
+                    self.retried += 1
+                await db.execute(
+                    update(NotificationOutbox).where(NotificationOutbox.id == row.id).values(**values)
+                )
+            await db.commit()
+
+        oldest = min(row.created_at for row in rows)
+        self.last_delivery_lag_seconds = (datetime.now(timezone.utc) - oldest).total_seconds()
+        self.sent += len(sent_ids)
+        self.batches += 1
+        self.last_batch_seconds = time.monotonic() - started
+        for row, error in zip(rows, errors):
+            if error is not None:
+                logger.warning(f"Notification {row.id} ({row.kind}) attempt {row.attempts} failed: {error}")
+        return len(rows)
+
+    async def run(self, stop: asyncio.Event):
+        logger.info("Outbox dispatcher started")
+        while not stop.is_set():
+            try:
+                claimed = await self.drain_once()
+            except Exception as e:
+                logger.error(f"Outbox dispatcher error: {e}")
+                claimed = 0
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        logger.info("Outbox dispatcher stopped")
+
+    async def stats(self) -> Dict[str, float]:
+        """ Dispatcher counters plus the outbox backlog and the age of its oldest pending notification """
+        async with AsyncDBConnection(False) as db:
+            result = await db.execute(
+                select(func.count(), func.now() - func.min(NotificationOutbox.created_at))
+                .where(NotificationOutbox.status == "pending")
+            )
+            pending, oldest = result.one()
+            failed_total = (await db.execute(
+                select(func.count()).where(NotificationOutbox.status == "failed")
+            )).scalar()
+        uptime = time.monotonic() - self.started_at
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "batches": self.batches,
+            "sent_per_second": self.sent / uptime if uptime else 0.0,
+            "last_batch_seconds": self.last_batch_seconds,
+            "last_delivery_lag_seconds": self.last_delivery_lag_seconds,
+            "pending": pending,
+            "failed_total": failed_total,
+            "oldest_pending_seconds": oldest.total_seconds() if oldest else 0.0,
+        }
+
+
+outbox_dispatcher = OutboxDispatcher()
+
+
+async def run_worker():
+    if outbox_dispatcher.backend != "celery":
+        await notification_worker.start()
+    try:
+        await outbox_dispatcher.run(asyncio.Event())
+    finally:
+        await notification_worker.stop()
+
+
+if __name__ == "__main__":
+    # standalone worker: python -m src.db.functions.outbox
+    asyncio.run(run_worker())
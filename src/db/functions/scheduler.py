@@ -1,26 +1,55 @@
 from datetime import datetime
-from sqlalchemy import select
-from src.db.database import ItemInformation
+from typing import List, Tuple
+
+from sqlalchemy import update, case, cast, literal, or_, and_
+from src.db.database import ItemInformation, ItemStatus
+from src.db.functions.auction_events import ITEM_EVENT_COLUMNS, publish_events, status_event
 from src.db.utils import AsyncDBConnection
-from src.common.utils.error_handlers import logger
 
-async def update_item_statuses():
 
+async def update_item_statuses() -> List[Tuple[int, ItemStatus]]:
+    """
+    Safety net next to the transition scheduler: puts back in step, in one statement, every
+    upcoming or live item whose status disagrees with its start time. Both cases are found
+    through the (status, start_time) index, rows already right are never touched.
 
-    now = datetime.now(datetime.UTC)
-    async with AsyncDBConnection(False) as db:
-        try:
-            result = await db.execute(select(ItemInformation))
-            items = result.scalars().all()
+    Ended items are left to `check_and_finalize_ended_auctions`, closing one needs its winner.
 
-            for item in items:
-                if item.start_time and item.start_time > now:
-                    item.status = "upcoming"
-                elif item.end_time and item.end_time < now:
-                    item.status = "completed"
-                else:
-                    item.status = "live"
+    Subscribers of every worker are told about each change once the update commits.
 
+    :return: (item_id, new status) of every item that changed
+    """
+    now = datetime.utcnow()
+    # CASE over bare parameters would come out as text, the casts keep it an itemtype
+    status_type = ItemInformation.status.type
+    async with AsyncDBConnection(False) as db:
+        try:
+            result = await db.execute(
+                update(ItemInformation)
+                .where(
+                    or_(
+                        and_(
+                            ItemInformation.status == ItemStatus.UPCOMING,
+                            ItemInformation.start_time <= now,
+                            ItemInformation.end_time > now,
+                        ),
+                        and_(ItemInformation.status == ItemStatus.LIVE, ItemInformation.start_time > now),
+                    )
+                )
+                .values(
+                    status=case(
+                        (ItemInformation.start_time > now, cast(literal(ItemStatus.UPCOMING, status_type), status_type)),
+                        else_=cast(literal(ItemStatus.LIVE, status_type), status_type),
+                    ),
+                    version=ItemInformation.version + 1,
+                )
+                .returning(*ITEM_EVENT_COLUMNS)
+                .execution_options(synchronize_session=False)
+            )
+            changed = result.all()
+            await publish_events(db, [status_event(item) for item in changed])
             await db.commit()
-        except Exception as e:
-            logger.error(f"Error updating item statuses: {e}")
+            return [(item.item_id, item.status) for item in changed]
+        except Exception:
+            await db.rollback()
+            raise
@@ -1,22 +1,36 @@
-from src.common.utils.send_notification import send_bid_notification_email, winner_email_template, loser_email_template, \
-    send_email
+import smtplib
+
+from src.common.utils.constants import OUTBOX_MAX_ATTEMPTS
+from src.common.utils.mailer import mail_pool
+from src.common.utils.send_notification import bid_notification_message, auction_result_message, \
+    outbid_digest_message
 from src.db.functions.celery_app import celery_app
 
-@celery_app.task
-def send_email_task(email: str, item_name: str, bid_amount: int):
-    # Simulated email logic (replace with actual)
-    send_bid_notification_email(email, item_name, bid_amount)
-    print(f"Sending email to {email}: New bid of ₹{bid_amount} on item {item_name}")
+# the outbox counts a notification as sent once it is queued, from then on the task retries it:
+# connection and SMTP errors with backoff (a refused recipient never gets better), and a task lost
+# with its worker is delivered again
+RETRY_OPTIONS = {
+    "autoretry_for": (OSError,),
+    "dont_autoretry_for": (smtplib.SMTPRecipientsRefused,),
+    "retry_backoff": True,
+    "retry_backoff_max": 300,
+    "retry_jitter": True,
+    "max_retries": OUTBOX_MAX_ATTEMPTS,
+    "acks_late": True,
+    "reject_on_worker_lost": True,
+}
+
+
+@celery_app.task(**RETRY_OPTIONS)
+def send_email_task(email_to: str, item_name: str, bid_amount: int):
+    mail_pool.send(bid_notification_message(email_to, item_name, bid_amount))
 
 
-@celery_app.task
+@celery_app.task(**RETRY_OPTIONS)
 def send_winner_email_task(email: str, item_name: str, amount: int, user_name: str, winner: bool = False):
-    subject = "🎉 You won the auction!" if winner else f"Auction ended: {item_name}"
-    html_content = (
-        winner_email_template(item_name, amount, user_name)
-        if winner else
-        loser_email_template(item_name, amount, user_name)
-    )
-
-    # This function must handle sending email with HTML body
-    send_email(to=email, subject=subject, html_body=html_content)
\ No newline at end of file
+    mail_pool.send(auction_result_message(email, item_name, amount, user_name, winner))
+
+
+@celery_app.task(**RETRY_OPTIONS)
+def send_outbid_digest_task(email: str, user_name: str, items: list):
+    mail_pool.send(outbid_digest_message(email, user_name, items))
@@ -0,0 +1,293 @@
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select, update, func
+
+from src.common.utils.constants import TRANSITION_RESYNC_SECONDS
+from src.common.utils.error_handlers import logger
+from src.db.database import ItemInformation, ItemStatus
+from src.db.functions.auction_events import ITEM_EVENT_COLUMNS, publish_events, status_event
+from src.db.functions.declare_auction_winner import check_and_finalize_ended_auctions
+from src.db.utils import AsyncDBConnection, engine
+
+# a failed transition batch is retried from a fresh load after this long
+RETRY_SECONDS = 5
+# item changes made in workers that don't run the scheduler reach it on this channel
+TRANSITION_CHANNEL = "item_transitions"
+
+
+class TransitionQueue:
+    """
+    Min-heap of upcoming auction boundaries, (time, version, item_id, order, target status), the
+    order puts an item's opening before its closing when both fall at the same time
+
+    Rescheduling or cancelling an item gives it a new version instead of searching the heap,
+    entries of an older version are dropped when they reach the top.
+    """
+
+    def __init__(self):
+        self.heap: List[Tuple[datetime, int, int, int, ItemStatus]] = []
+        self.versions: Dict[int, int] = {}
+        self.counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.versions)
+
+    def _entries(self, item_id: int, start_time: Optional[datetime], end_time: Optional[datetime]) -> list:
+        version = next(self.counter)
+        self.versions[item_id] = version
+        entries = []
+        if start_time is not None:
+            entries.append((start_time, version, item_id, 0, ItemStatus.LIVE))
+        if end_time is not None:
+            entries.append((end_time, version, item_id, 1, ItemStatus.COMPLETED))
+        return entries
+
+    def schedule(self, item_id: int, start_time: Optional[datetime], end_time: Optional[datetime]):
+        for entry in self._entries(item_id, start_time, end_time):
+            heapq.heappush(self.heap, entry)
+        self._compact()
+
+    def cancel(self, item_id: int):
+        self.versions.pop(item_id, None)
+        self._compact()
+
+    def load(self, items: Iterable[Tuple[int, datetime, datetime]]):
+        """ Replace everything with (item_id, start_time, end_time) rows """
+        self.versions = {}
+        self.heap = [entry for row in items for entry in self._entries(*row)]
+        heapq.heapify(self.heap)
+
+    def _current(self, entry) -> bool:
+        return self.versions.get(entry[2]) == entry[1]
+
+    def _compact(self):
+        # rebuild once stale entries outnumber the live ones
+        if len(self.heap) > 4 * len(self.versions) + 64:
+            self.heap = [entry for entry in self.heap if self._current(entry)]
+            heapq.heapify(self.heap)
+
+    def next_due(self) -> Optional[datetime]:
+        while self.heap and not self._current(self.heap[0]):
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now: datetime) -> List[Tuple[datetime, int, ItemStatus]]:
+        """ Remove and return (time, item_id, target status) of every boundary reached by `now` """
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            when, version, item_id, _, target = heapq.heappop(self.heap)
+            if self.versions.get(item_id) != version:
+                continue
+            if target == ItemStatus.COMPLETED:
+                # nothing left to fire for this item
+                del self.versions[item_id]
+            due.append((when, item_id, target))
+        return due
+
+
+class TransitionScheduler:
+    """
+    Opens and closes auctions at their exact start and end time
+
+    Every non-completed item's boundaries sit in a `TransitionQueue`, the loop sleeps until the
+    earliest one, or until an item changes, and then updates only the items that reached it:
+    upcoming items become live with one guarded UPDATE, ended ones are closed together by
+    `check_and_finalize_ended_auctions`. The queue is rebuilt from the database at start and
+    every `resync_seconds`, so a restart or a missed change notification is picked up.
+    """
+
+    def __init__(self, resync_seconds: int = TRANSITION_RESYNC_SECONDS):
+        self.resync_seconds = resync_seconds
+        self.queue = TransitionQueue()
+        self.wakeup: Optional[asyncio.Event] = None
+        self.reload_requested = True
+        self.pending: Set[int] = set()
+        self.opened = 0
+        self.closed = 0
+        self.last_lateness_seconds = 0.0
+
+    def _wake(self):
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def refresh(self, item_id: int):
+        """ Re-read an added, edited or deleted item on the next turn """
+        self.pending.add(item_id)
+        self._wake()
+
+    def request_reload(self):
+        """ Reload every item on the next turn, e.g. after a bulk import """
+        self.reload_requested = True
+        self._wake()
+
+    async def item_changed(self, item_id: Optional[int] = None):
+        """
+        Tell the scheduler an item changed, `None` for many items. Only the leader runs the
+        scheduler, any other worker passes the change on with NOTIFY
+        """
+        if self.wakeup is not None:
+            self.request_reload() if item_id is None else self.refresh(item_id)
+            return
+        async with AsyncDBConnection(False) as db:
+            await db.execute(select(func.pg_notify(TRANSITION_CHANNEL, "*" if item_id is None else str(item_id))))
+            await db.commit()
+
+    def move_end(self, item_id: int, end_time: datetime):
+        """ A live item's end moved, e.g. by a soft-close extension, nothing to read back """
+        self.queue.schedule(item_id, None, end_time)
+        self._wake()
+
+    @staticmethod
+    async def end_moved(db, item_id: int, end_time: datetime):
+        """ Pass a new end time to the scheduler, wherever it runs, if the caller's transaction commits """
+        await db.execute(select(func.pg_notify(TRANSITION_CHANNEL, f"{item_id}@{end_time.isoformat()}")))
+
+    def _on_notify(self, connection, pid, channel, payload: str):
+        if payload == "*":
+            self.request_reload()
+        elif "@" in payload:
+            item_id, end_time = payload.split("@", 1)
+            self.move_end(int(item_id), datetime.fromisoformat(end_time))
+        else:
+            self.refresh(int(payload))
+
+    async def load(self):
+        async with AsyncDBConnection(False) as db:
+            result = await db.execute(
+                select(ItemInformation.item_id, ItemInformation.start_time, ItemInformation.end_time,
+                       ItemInformation.status)
+                .where(ItemInformation.status != ItemStatus.COMPLETED)
+            )
+            # live items only have their end left
+            self.queue.load(
+                (item_id, None if status == ItemStatus.LIVE else start_time, end_time)
+                for item_id, start_time, end_time, status in result.all()
+            )
+        self.pending.clear()
+        logger.info(f"Transition scheduler loaded {len(self.queue)} items")
+
+    async def load_items(self, item_ids: Set[int]):
+        async with AsyncDBConnection(False) as db:
+            result = await db.execute(
+                select(ItemInformation.item_id, ItemInformation.start_time, ItemInformation.end_time,
+                       ItemInformation.status)
+                .where(ItemInformation.item_id.in_(list(item_ids)))
+            )
+            rows = result.all()
+        for item_id in item_ids - {row.item_id for row in rows}:
+            self.queue.cancel(item_id)
+        for item_id, start_time, end_time, status in rows:
+            if status == ItemStatus.COMPLETED:
+                self.queue.cancel(item_id)
+            else:
+                self.queue.schedule(item_id, None if status == ItemStatus.LIVE else start_time, end_time)
+
+    async def _open(self, item_ids: List[int]):
+        now = datetime.utcnow()
+        async with AsyncDBConnection(False) as db:
+            result = await db.execute(
+                update(ItemInformation)
+                .where(
+                    ItemInformation.item_id.in_(item_ids),
+                    ItemInformation.status == ItemStatus.UPCOMING,
+                    ItemInformation.start_time <= now,
+                    ItemInformation.end_time > now,
+                )
+                .values(status=ItemStatus.LIVE, version=ItemInformation.version + 1)
+                .returning(*ITEM_EVENT_COLUMNS)
+                .execution_options(synchronize_session=False)
+            )
+            opened = result.all()
+            await publish_events(db, [status_event(item) for item in opened])
+            await db.commit()
+        self.opened += len(opened)
+
+    async def fire(self, due: List[Tuple[datetime, int, ItemStatus]]):
+        now = datetime.utcnow()
+        self.last_lateness_seconds = max((now - when).total_seconds() for when, _, _ in due)
+        to_open = [item_id for _, item_id, target in due if target == ItemStatus.LIVE]
+        if to_open:
+            await self._open(to_open)
+        to_close = [item_id for _, item_id, target in due if target == ItemStatus.COMPLETED]
+        if to_close:
+            closed = await check_and_finalize_ended_auctions(to_close)
+            self.closed += len(closed)
+            # skipped because a bid held the row, re-read so a soft-close extension isn't lost
+            self.pending.update(set(to_close) - {auction["item_id"] for auction in closed})
+
+    async def _sleep(self, stop: asyncio.Event, timeout: float):
+        waiters = [asyncio.ensure_future(stop.wait()), asyncio.ensure_future(self.wakeup.wait())]
+        try:
+            await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+    async def run(self, stop: asyncio.Event):
+        while not stop.is_set():
+            try:
+                async with engine.connect() as connection:
+                    listener = (await connection.get_raw_connection()).driver_connection
+                    await listener.add_listener(TRANSITION_CHANNEL, self._on_notify)
+                    try:
+                        await self._run(stop)
+                    finally:
+                        await listener.remove_listener(TRANSITION_CHANNEL, self._on_notify)
+            except Exception as e:
+                logger.error(f"Transition scheduler stopped on error: {e}")
+                self.wakeup = None
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=RETRY_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _run(self, stop: asyncio.Event):
+        logger.info("Transition scheduler started")
+        self.wakeup = asyncio.Event()
+        self.reload_requested = True
+        next_resync = 0.0
+        while not stop.is_set():
+            self.wakeup.clear()
+            try:
+                if self.reload_requested or time.monotonic() >= next_resync:
+                    self.reload_requested = False
+                    await self.load()
+                    next_resync = time.monotonic() + self.resync_seconds
+                elif self.pending:
+                    item_ids, self.pending = self.pending, set()
+                    await self.load_items(item_ids)
+                due = self.queue.pop_due(datetime.utcnow())
+                if due:
+                    await self.fire(due)
+            except Exception as e:
+                # whatever was popped comes back with the reload
+                logger.error(f"Transition scheduler error: {e}")
+                self.reload_requested = True
+                next_resync = time.monotonic() + RETRY_SECONDS
+
+            timeout = next_resync - time.monotonic()
+            next_due = self.queue.next_due()
+            if next_due is not None and not self.reload_requested:
+                timeout = min(timeout, (next_due - datetime.utcnow()).total_seconds())
+            if timeout > 0 and not self.pending:
+                await self._sleep(stop, timeout)
+        self.wakeup = None
+        logger.info("Transition scheduler stopped")
+
+    def stats(self) -> dict:
+        next_due = self.queue.next_due()
+        return {
+            "scheduled_items": len(self.queue),
+            "opened": self.opened,
+            "closed": self.closed,
+            "last_lateness_seconds": self.last_lateness_seconds,
+            "next_transition": next_due.isoformat() if next_due else None,
+        }
+
+
+transition_scheduler = TransitionScheduler()
@@ -1,13 +1,24 @@
-import os
+import json
+from datetime import datetime, timedelta
+from typing import Callable, Optional
 
 from fastapi import HTTPException
 from sqlalchemy import select
-from starlette.background import BackgroundTasks
 
+from src.common.utils.constants import (
+    SOFT_CLOSE_WINDOW_SECONDS,
+    SOFT_CLOSE_EXTENSION_SECONDS,
+    SOFT_CLOSE_MAX_EXTENSIONS,
+)
 from src.common.utils.error_handlers import logger
-from src.common.utils.user_defined_errors import NoEntityFound, LessBidError
-from src.db.database import Bid, Users, ItemInformation
-from src.db.functions.task import send_email_task
+from src.common.utils.user_defined_errors import NoEntityFound, LessBidError, TimeExceedError, UserErrors
+from src.db.database import Bid, ItemInformation, ItemStatus
+from src.db.functions.auction_events import publish_events, bid_event
+from src.db.functions.bidder_index import record_bid, notify_displaced_leader
+from src.db.functions.item_cache import CachedItem, item_cache
+from src.db.functions.live_catalog import live_catalog, serialize_item
+from src.db.functions.transitions import transition_scheduler
+from src.db.routing import replica_router
 from src.db.utils import AsyncDBConnection
 
 
@@ -17,51 +28,92 @@ async def validate_bid(item, amount: int):
         raise LessBidError()
 
 
-async def notify_previous_bidders(
-    db, item_id: int, user_id: int, item_name: str, amount: int, background_tasks: BackgroundTasks
-):
-    prev_bids = await db.execute(
-        select(Bid).where(Bid.item_id == item_id, Bid.user_id != user_id)
-    )
-    prev_bidder_ids = {b.user_id for b in prev_bids.scalars().all()}
+def soft_close_deadline(end_time: datetime, bid_time: datetime, extensions: int,
+                        window_seconds: int = SOFT_CLOSE_WINDOW_SECONDS,
+                        extension_seconds: int = SOFT_CLOSE_EXTENSION_SECONDS,
+                        max_extensions: int = SOFT_CLOSE_MAX_EXTENSIONS) -> Optional[datetime]:
+    """
+    New end time of an auction that takes a bid at `bid_time`, None when the bid doesn't extend it
+
+    :param extensions: extensions the auction already had
+    """
+    if window_seconds <= 0 or extension_seconds <= 0:
+        return None
+    if max_extensions and extensions >= max_extensions:
+        return None
+    if (end_time - bid_time).total_seconds() > window_seconds:
+        return None
+    return end_time + timedelta(seconds=extension_seconds)
+
+
+async def process_bid(item_id: int, user_id: int, amount: int, is_watching: Callable[[int], bool] = None,
+                      user_email: Optional[str] = None):
+    """
+    :param user_email: bidder email, pinned to the primary with the id for read-your-writes
+    :param is_watching: tells whether a user has this item's bid websocket open, used to skip
+        outbid emails for bids the displaced leader sees live
+    """
+    # other workers' bids, admin edits (which can lower the bid or reopen an item) and lifecycle events reach
+    # every worker's copy as soon as they commit, the locked check below still decides what is accepted
+    cached = item_cache.get(item_id)
+    if cached is not None:
+        if cached.status == ItemStatus.COMPLETED:
+            raise TimeExceedError()
+        await validate_bid(cached, amount)
 
-    if prev_bidder_ids:
-        users = await db.execute(
-            select(Users).where(Users.user_id.in_(prev_bidder_ids))
-        )
-        user_emails = [u.email_id for u in users.scalars().all()]
-        for email in user_emails:
-            # Schedule email sending as background task
-            background_tasks.add_task(send_email_task, email, item_name, amount)
-
-
-async def process_bid(item_id: int, user_id: int, amount: int, background_tasks: BackgroundTasks):
     async with AsyncDBConnection(False) as db:
         try:
-            item = await db.get(ItemInformation, item_id)
+            # row lock so concurrent bids on the same item see each other's leader and amount
+            item = await db.get(ItemInformation, item_id, with_for_update=True)
             if not item:
                 raise NoEntityFound("Item not found.")
 
+            # checked under the lock, the close can't slip in between the check and the bid
+            now = datetime.utcnow()
+            if item.status == ItemStatus.UPCOMING:
+                raise TimeExceedError("The auction has not started yet")
+            if item.status != ItemStatus.LIVE or item.end_time <= now:
+                raise TimeExceedError()
+
             await validate_bid(item, amount)
 
+            previous_leader = item.won_by
+            leader_saw_it = bool(previous_leader and is_watching and is_watching(previous_leader))
             item.current_bid = amount
             item.won_by = user_id
+            item.version += 1
 
             new_bid = Bid(item_id=item_id, user_id=user_id, bid_amount=amount)
             db.add(new_bid)
+            await record_bid(db, item_id, user_id, amount, previous_leader, leader_saw_it)
+            await notify_displaced_leader(db, item_id, previous_leader, user_id, item.name, amount, leader_saw_it)
+
+            events = []
+            end_time = soft_close_deadline(item.end_time, now, item.extensions)
+            if end_time is not None:
+                item.end_time = end_time
+                item.extensions += 1
+                events.append({"event": "auction_extended", "item_id": item_id, "end_time": end_time})
+                await transition_scheduler.end_moved(db, item_id, end_time)
+            # watchers, the close timer and the other workers' copies hear of it only if the bid commits
+            events.append(bid_event(item, [user_id, user_email]))
+            await publish_events(db, events)
 
             await db.commit()
-
-            await notify_previous_bidders(db, item_id, user_id, item.name, amount, background_tasks)
+            cached = item_cache.put(CachedItem.from_row(item))
+            live_catalog.apply(cached)
+            replica_router.mark_write(user_id, user_email)
 
             return {
                 "item_id": item_id,
                 "new_bid": amount,
                 "user_id": user_id,
+                "end_time": item.end_time.isoformat(),
                 "status": "accepted"
             }
 
-        except HTTPException:
+        except (HTTPException, UserErrors, NoEntityFound):
+            await db.rollback()
             raise
         except Exception as e:
             await db.rollback()
@@ -69,10 +121,13 @@ async def process_bid(item_id: int, user_id: int, amount: int, background_tasks:
 
 
 async def fetch_active_items():
+    snapshot = live_catalog.snapshot
+    if snapshot is not None:
+        return [serialize_item(entry.item) for entry in snapshot.entries]
     try:
-        async with AsyncDBConnection(False) as db:
+        async with AsyncDBConnection(False, read_only=True) as db:
             result = await db.execute(
-                select(ItemInformation).where(ItemInformation.status == True)
+                select(ItemInformation).where(ItemInformation.status == ItemStatus.LIVE)
             )
             items = result.scalars().all()
             return [serialize_item(item) for item in items]
@@ -80,16 +135,10 @@ async def fetch_active_items():
         logger.exception("Error fetching active items from database")
         return []
 
-# Helper to serialize item information
-def serialize_item(item: ItemInformation) -> dict:
-    return {
-        "item_id": item.item_id,
-        "name": item.name,
-        "current_bid": item.current_bid,
-        "end_time": item.end_time.isoformat() if item.end_time else None,
-        "start_time": item.start_time.isoformat() if item.start_time else None,
-        "status": item.status.value,
-        "start_price": item.start_price,
-        "won_by": item.won_by,
-        "image_url": f"{os.path.basename(item.filepath)}" if item.filepath else None
-    }
\ No newline at end of file
+
+async def active_items_json() -> str:
+    """ The active items websocket message, already encoded by the live catalog once it is loaded """
+    snapshot = live_catalog.snapshot
+    if snapshot is not None:
+        return snapshot.feed_json
+    return json.dumps(await fetch_active_items())
@@ -0,0 +1,133 @@
+import asyncio
+import os
+import socket
+import zlib
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import select, text, update, func
+from sqlalchemy.dialects.postgresql import insert
+
+from src.common.utils.constants import LEADER_HEARTBEAT_SECONDS
+from src.common.utils.error_handlers import logger
+from src.db.database import SchedulerLease
+from src.db.utils import engine, AsyncDBConnection
+
+
+class LeaderLease:
+    """
+    Elects one leader among every worker of every node with a Postgres session advisory lock
+
+    The lock is taken with pg_try_advisory_lock on a connection kept open for as long as the
+    lease is held, so it goes away with the leader: a crashed worker's connection is closed by
+    the server and a follower takes over on its next try, at most `heartbeat_seconds` later.
+    The leader writes a heartbeat to `scheduler_leases` on that same connection, when that
+    fails it can't be sure it still holds the lock and steps down.
+    """
+
+    def __init__(self, name: str, heartbeat_seconds: float = LEADER_HEARTBEAT_SECONDS):
+        self.name = name
+        # advisory locks are keyed by a bigint
+        self.key = zlib.crc32(name.encode())
+        self.heartbeat_seconds = heartbeat_seconds
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+        self.is_leader = False
+        self.acquired_at: Optional[datetime] = None
+        self.on_acquired: List[Callable[[], Awaitable]] = []
+        self.on_lost: List[Callable[[], Awaitable]] = []
+
+    async def _execute(self, connection, statement, params=None):
+        result = await connection.execute(statement, params or {})
+        # no transaction left open between heartbeats, the session lock doesn't need one
+        await connection.commit()
+        return result
+
+    async def _acquire(self, connection) -> bool:
+        result = await self._execute(connection, text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key})
+        if not result.scalar():
+            return False
+        statement = insert(SchedulerLease).values(name=self.name, holder=self.holder)
+        await self._execute(connection, statement.on_conflict_do_update(
+            index_elements=[SchedulerLease.name],
+            set_={"holder": self.holder, "acquired_at": text("now()"), "heartbeat_at": text("now()")},
+        ))
+        self.is_leader = True
+        self.acquired_at = datetime.utcnow()
+        logger.info(f"{self.holder} is now the {self.name} leader")
+        for callback in self.on_acquired:
+            try:
+                await callback()
+            except Exception as e:
+                logger.error(f"Error starting {self.name} leader jobs: {e}")
+        return True
+
+    async def _heartbeat(self, connection):
+        result = await self._execute(connection, (
+            update(SchedulerLease)
+            .where(SchedulerLease.name == self.name, SchedulerLease.holder == self.holder)
+            .values(heartbeat_at=text("now()"))
+        ))
+        if not result.rowcount:
+            raise RuntimeError(f"{self.name} lease was taken over")
+
+    async def _step_down(self):
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        self.acquired_at = None
+        logger.info(f"{self.holder} stepped down as the {self.name} leader")
+        for callback in self.on_lost:
+            try:
+                await callback()
+            except Exception as e:
+                logger.error(f"Error stopping {self.name} leader jobs: {e}")
+
+    async def _wait(self, stop: asyncio.Event):
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=self.heartbeat_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self, stop: asyncio.Event):
+        while not stop.is_set():
+            try:
+                async with engine.connect() as connection:
+                    try:
+                        while not stop.is_set():
+                            if self.is_leader:
+                                await self._heartbeat(connection)
+                            else:
+                                await self._acquire(connection)
+                            await self._wait(stop)
+                        if self.is_leader:
+                            await self._step_down()
+                            await self._execute(connection, text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+                    except Exception:
+                        # never hand a connection that may still hold the lock back to the pool
+                        await connection.invalidate()
+                        raise
+            except Exception as e:
+                # the lock lived on that connection, whatever happened to it the lease is gone
+                logger.error(f"{self.name} leader lease error: {e}")
+                await self._step_down()
+                await self._wait(stop)
+        await self._step_down()
+
+    async def status(self) -> dict:
+        """ This worker's view plus the lease row every worker sees """
+        async with AsyncDBConnection(False) as db:
+            lease = await db.get(SchedulerLease, self.name)
+            now = (await db.execute(select(func.now()))).scalar()
+        return {
+            "name": self.name,
+            "worker": self.holder,
+            "is_leader": self.is_leader,
+            "leader": lease.holder if lease else None,
+            "acquired_at": lease.acquired_at if lease else None,
+            "heartbeat_at": lease.heartbeat_at if lease else None,
+            # a leader that missed a few heartbeats has lost its connection, the lock follows soon
+            "stale": bool(lease and (now - lease.heartbeat_at).total_seconds() > 3 * self.heartbeat_seconds),
+        }
+
+
+scheduler_lease = LeaderLease("auction_scheduler")
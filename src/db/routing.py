@@ -0,0 +1,124 @@
+import time
+from typing import Dict, Hashable, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.common.utils.constants import (
+    DB_CONNECTION_LINK,
+    REPLICA_DB_CONNECTION_LINK,
+    ASYNC_REPLICA_DB_CONNECTION_LINK,
+    REPLICA_MAX_LAG_SECONDS,
+    REPLICA_LAG_CHECK_SECONDS,
+    READ_YOUR_WRITES_SECONDS,
+)
+from src.common.utils.error_handlers import logger
+
+# seconds the replica is behind the primary, 0 when it has replayed everything it received
+# and also 0 when the "replica" is not a standby at all (handy for local testing)
+REPLICA_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())::float8,
+            'Infinity'::float8
+        )
+    END
+    """
+)
+
+replica_engine = (
+    create_async_engine(ASYNC_REPLICA_DB_CONNECTION_LINK, future=True)
+    if ASYNC_REPLICA_DB_CONNECTION_LINK else None
+)
+sync_replica_engine = (
+    create_engine(REPLICA_DB_CONNECTION_LINK, pool_size=1, max_overflow=0)
+    if REPLICA_DB_CONNECTION_LINK else None
+)
+
+
+class ReplicaRouter:
+    """
+    Decides whether a read can go to the replica
+
+    A read is sent to the replica only when one is configured, its last measured lag is
+    within `max_lag` and the caller did not write recently (read your own writes).
+    The lag is measured at most once every `check_interval` seconds.
+
+    Pins live in each worker's memory. Bids are pinned in every worker through their
+    `bid_placed` event, other writes only in the worker that made them, so read-your-writes
+    after those is best effort once several workers serve requests.
+    """
+
+    def __init__(self, max_lag: float, check_interval: float, pin_seconds: float):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.pin_seconds = pin_seconds
+        self.lag: Optional[float] = None
+        self.checked_at = 0.0
+        self._pins: Dict[Hashable, float] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return replica_engine is not None
+
+    def mark_write(self, *keys: Hashable):
+        """ Pin the reads of the given users (ids or emails) to the primary for a while """
+        now = time.monotonic()
+        if len(self._pins) > 10000:
+            self._pins = {key: until for key, until in self._pins.items() if until > now}
+        until = now + self.pin_seconds
+        for key in keys:
+            if key is not None:
+                self._pins[key] = until
+
+    def is_pinned(self, key: Optional[Hashable]) -> bool:
+        if key is None or key not in self._pins:
+            return False
+        if self._pins[key] > time.monotonic():
+            return True
+        del self._pins[key]
+        return False
+
+    def _needs_check(self) -> bool:
+        return time.monotonic() - self.checked_at >= self.check_interval
+
+    def _record_lag(self, lag: Optional[float]):
+        self.lag = lag
+        self.checked_at = time.monotonic()
+
+    def _lag_ok(self) -> bool:
+        return self.lag is not None and self.lag <= self.max_lag
+
+    def use_replica(self, key: Optional[Hashable] = None) -> bool:
+        if not self.enabled or self.is_pinned(key):
+            return False
+        if self._needs_check():
+            try:
+                with sync_replica_engine.connect() as conn:
+                    self._record_lag(conn.execute(REPLICA_LAG_QUERY).scalar())
+            except Exception as e:
+                logger.warning(f"Replica lag check failed, reading from primary: {e}")
+                self._record_lag(None)
+        return self._lag_ok()
+
+    async def use_replica_async(self, key: Optional[Hashable] = None) -> bool:
+        if not self.enabled or self.is_pinned(key):
+            return False
+        if self._needs_check():
+            try:
+                async with replica_engine.connect() as conn:
+                    self._record_lag((await conn.execute(REPLICA_LAG_QUERY)).scalar())
+            except Exception as e:
+                logger.warning(f"Replica lag check failed, reading from primary: {e}")
+                self._record_lag(None)
+        return self._lag_ok()
+
+    def read_connection_link(self, key: Optional[Hashable] = None) -> str:
+        """ Connection string for a sync `DBConnection` doing a read-only query """
+        return REPLICA_DB_CONNECTION_LINK if self.use_replica(key) else DB_CONNECTION_LINK
+
+
+replica_router = ReplicaRouter(REPLICA_MAX_LAG_SECONDS, REPLICA_LAG_CHECK_SECONDS, READ_YOUR_WRITES_SECONDS)
@@ -5,6 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from src.common.utils.constants import ASYNC_DB_CONNECTION_LINK
+from src.db.routing import replica_router, replica_engine
 
 
 class CustomBaseModel:
@@ -74,11 +75,21 @@ engine = create_async_engine(
 
 
 class AsyncDBConnection:
-    def __init__(self, expire_commit: bool = True):
+    """
+    Async session on the primary, or on the read replica when `read_only` is set
+    and the replica router allows it for `user_key` (user id or email)
+    """
+
+    def __init__(self, expire_commit: bool = True, read_only: bool = False, user_key=None):
         self.expire_commit = expire_commit
+        self.read_only = read_only
+        self.user_key = user_key
 
     async def __aenter__(self):
-        self.session = AsyncSession(bind=engine, expire_on_commit=self.expire_commit)
+        bind = engine
+        if self.read_only and await replica_router.use_replica_async(self.user_key):
+            bind = replica_engine
+        self.session = AsyncSession(bind=bind, expire_on_commit=self.expire_commit)
         return self.session
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
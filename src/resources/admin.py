@@ -0,0 +1,175 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.responses import StreamingResponse
+
+from src.common.utils.Schedulars_logging import job_monitor
+from src.common.utils.email_templates import email_templates
+from src.common.utils.export_writers import EXPORT_FORMATS, WRITERS, parquet_available
+from src.common.utils.generate_error_details import generate_details
+from src.common.utils.image_derivatives import derivative_cache
+from src.common.utils.mailer import mail_pool
+from src.common.utils.user_defined_errors import UserUser
+from src.db.database import ItemStatus
+from src.db.functions.item_cache import item_cache
+from src.db.functions.live_catalog import live_catalog
+from src.db.functions.notification_worker import notification_worker
+from src.db.leader import scheduler_lease
+from src.db.functions.outbox import outbox_dispatcher
+from src.db.functions.transitions import transition_scheduler
+from src.db.functions.export import stream_bids, stream_results, BID_EXPORT_COLUMNS, RESULT_EXPORT_COLUMNS
+from src.resources.token import UserBase, get_current_active_user
+
+router = APIRouter()
+
+FORMAT_PATTERN = "^(csv|ndjson|parquet)$"
+
+
+def _export_response(name: str, batches, columns, export_format: str) -> StreamingResponse:
+    if export_format == "parquet" and not parquet_available():
+        raise HTTPException(
+            status_code=400,
+            detail=generate_details("Parquet export needs pyarrow installed", "UnsupportedFormat"),
+        )
+    media_type, extension = EXPORT_FORMATS[export_format]
+    return StreamingResponse(
+        WRITERS[export_format](batches, columns),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{extension}"'},
+    )
+
+
+@router.get("/export/bids")
+async def export_bids(
+    export_format: str = Query("csv", alias="format", regex=FORMAT_PATTERN),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    item_id: Optional[int] = None,
+    status: Optional[ItemStatus] = None,
+    include_archived: bool = False,
+    current_user: UserBase = Depends(get_current_active_user),
+):
+    """
+    Stream every bid matching the filters with its bidder and item
+
+    """
+    if current_user.user_type == "user":
+        raise UserUser(message="Normal User can't export bids login as admin")
+
+    batches = stream_bids(date_from, date_to, item_id, status, include_archived)
+    return _export_response("bids", batches, BID_EXPORT_COLUMNS, export_format)
+
+
+@router.get("/export/results")
+async def export_results(
+    export_format: str = Query("csv", alias="format", regex=FORMAT_PATTERN),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    item_id: Optional[int] = None,
+    status: Optional[ItemStatus] = None,
+    current_user: UserBase = Depends(get_current_active_user),
+):
+    """
+    Stream the result (final bid and winner) of every auction matching the filters
+
+    """
+    if current_user.user_type == "user":
+        raise UserUser(message="Normal User can't export results login as admin")
+
+    batches = stream_results(date_from, date_to, item_id, status)
+    return _export_response("auction_results", batches, RESULT_EXPORT_COLUMNS, export_format)
+
+
+@router.get("/metrics/outbox")
+async def outbox_metrics(current_user: UserBase = Depends(get_current_active_user)):
+    """
+    Notification outbox throughput, backlog and delivery lag of this worker's dispatcher
+
+    """
+    if current_user.user_type == "user":
+        raise UserUser(message="Normal User can't read metrics login as admin")
+
+    return await outbox_dispatcher.stats()
+
+
+@router.get("/metrics/notifications")
+async def notification_metrics(current_user: UserBase = Depends(get_current_active_user)):
+    """
+    Email template render times, notification worker queue and SMTP pool counters of this worker
+
+    """
+    if current_user.user_type == "user":
+        raise UserUser(message="Normal User can't read metrics login as admin")
+
+    return {
+        "templates": email_templates.stats(),
+        "worker": notification_worker.stats(),
+        "smtp": mail_pool.stats(),
+    }
+
+
+@router.get("/metrics/images")
+async def image_metrics(current_user: UserBase = Depends(get_current_active_user)):
+    """
+    Image derivative cache hits, renders, failures, evictions and size of this worker
+
+    """
+    if current_user.user_type == "user":
+        raise UserUser(message="Normal User can't read metrics login as admin")
+
+    return derivative_cache.stats()
+
+
+@router.get("/metrics/items")
+async def item_cache_metrics(current_user: UserBase = Depends(get_current_active_user)):
+    """
+    Item cache size, hit rate, expirations, evictions and invalidations of this worker
+
+    """
+    if current_user.user_type == "user":
+        raise UserUser(message="Normal User can't read metrics login as admin")
+
+    return item_cache.stats()
+
+
+@router.get("/metrics/catalog")
+async def live_catalog_metrics(current_user: UserBase = Depends(get_current_active_user)):
+    """
+    Live catalog version, size, loads, applied and stale changes and consistency check results of this worker
+
+    """
+    if current_user.user_type == "user":
+        raise UserUser(message="Normal User can't read metrics login as admin")
+
+    return live_catalog.stats()
+
+
+@router.get("/metrics/jobs")
+async def job_metrics(current_user: UserBase = Depends(get_current_active_user)):
+    """
+    Runs, duration, lag, rows touched and failures of every scheduler job, and the transition timers.
+    Only the scheduler leader runs them, other workers report idle jobs
+
+    """
+    if current_user.user_type == "user":
+        raise UserUser(message="Normal User can't read metrics login as admin")
+
+    return {
+        "leader": scheduler_lease.is_leader,
+        "worker": scheduler_lease.holder,
+        "jobs": job_monitor.stats(),
+        "transitions": transition_scheduler.stats(),
+    }
+
+
+@router.get("/scheduler/leader")
+async def scheduler_leader(current_user: UserBase = Depends(get_current_active_user)):
+    """
+    Which worker holds the scheduler lease and runs the auction housekeeping jobs
+
+    """
+    if current_user.user_type == "user":
+        raise UserUser(message="Normal User can't read scheduler status login as admin")
+
+    return await scheduler_lease.status()
@@ -1,26 +1,72 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.common.utils.constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.common.utils.etags import REVALIDATE_PRIVATE
+from src.common.utils.generate_error_details import generate_details
+from src.common.utils.user_defined_errors import InvalidCursorError
 from src.db.functions.bids import fetch_user_bids, get_items_bids
-from src.resources.token import get_current_user, UserBase
+from src.resources.token import get_current_user, get_token_email, UserBase
 
 router = APIRouter()
 
 @router.get("/user/bids")
-async def get_user_bids(current_user: UserBase = Depends(get_current_user)):
+async def get_user_bids(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    include_archived: bool = False,
+    current_user: UserBase = Depends(get_current_user),
+):
 
     if current_user.user_type == "admin":
         raise HTTPException(status_code=403, detail="Admin cannot place bids")
 
-    bid = await fetch_user_bids(current_user.user_id)
+    try:
+        page = await fetch_user_bids(current_user.user_id, limit, cursor, include_total, include_archived)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=e.response_code, detail=generate_details(e.message, e.type))
 
-    return {"message": "your bids are", "bid": bid}
+    return {
+        "message": "your bids are",
+        "bid": page["items"],
+        "next_cursor": page["next_cursor"],
+        "total_estimate": page["total_estimate"],
+    }
 
 
 
 
 
 @router.get("/item/{item_id}/bids")
-async def get_item_bids(item_id: int):
+async def get_item_bids(
+    item_id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    include_archived: bool = False,
+    user_email: Optional[str] = Depends(get_token_email),
+):
+
+    try:
+        page = await get_items_bids(item_id, limit, cursor, include_total, include_archived,
+                                    request.headers.get("if-none-match"), user_email)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=e.response_code, detail=generate_details(e.message, e.type))
 
-    item_bid = await get_items_bids(item_id)
+    headers = {"etag": page["etag"], "cache-control": REVALIDATE_PRIVATE}
+    if page.get("not_modified"):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
 
-    return {"message": "your bids are", "bid": item_bid}
+    return {
+        "message": "your bids are",
+        "bid": page["items"],
+        "next_cursor": page["next_cursor"],
+        "total_estimate": page["total_estimate"],
+    }
@@ -1,12 +1,11 @@
 import json
 from typing import List
 from src.common.utils.user_defined_errors import UserErrors, NoEntityFound, PermissionDeniedError
-from src.common.utils.webocket_connection import BidManager, ActiveItemsManager
+from src.common.utils.webocket_connection import bid_manager, active_items_manager
 from fastapi import APIRouter
 from pydantic import BaseModel, ValidationError
 from starlette import status
-from starlette.background import BackgroundTasks
-from starlette.websockets import WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocket, WebSocketDisconnect, WebSocketState
 from src.db.functions.websocket_bids_manager import process_bid
 from src.resources.token import get_websocket_user
 
@@ -25,11 +24,6 @@ class ActiveItemResponse(BaseModel):
     end_time: str
 
 
-# Initialize managers
-active_items_manager = ActiveItemsManager()
-bid_manager = BidManager()
-
-
 @router.websocket("/ws/active-items")
 async def active_items_endpoint(websocket: WebSocket):
     await websocket.accept()
@@ -72,12 +66,20 @@ sample output for the active items endpoint
   }
 ]
 
+
+lifecycle events pushed to the same socket, clients add live items and drop the others
+
+{"event": "auction_live", "item": {"item_id": 3, "name": "Oil Painting", "status": "live", ...}}
+{"event": "auction_upcoming", "item_id": 3}
+{"event": "auction_extended", "item_id": 1, "end_time": "2025-04-29T18:02:00"}
+{"event": "auction_closed", "item_id": 1, "name": "Antique Vase", "winner": 3, "winning_bid": 500}
+
 """
 
 
 
 @router.websocket("/ws/bid/{item_id}")
-async def bid_endpoint(websocket: WebSocket, item_id: int, background_tasks: BackgroundTasks):
+async def bid_endpoint(websocket: WebSocket, item_id: int):
     token = websocket.query_params.get("token")
     if not token:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
@@ -97,10 +99,11 @@ async def bid_endpoint(websocket: WebSocket, item_id: int, background_tasks: Bac
         return
 
     await websocket.accept()
-    await bid_manager.connect(websocket, item_id)
+    await bid_manager.connect(websocket, item_id, current_user.user_id)
 
     try:
-        while True:
+        # the socket is closed from our side once the auction closes
+        while websocket.application_state == WebSocketState.CONNECTED:
             data = await websocket.receive_text()
             try:
                 bid_data = BidRequest.parse_raw(data)
@@ -109,7 +112,8 @@ async def bid_endpoint(websocket: WebSocket, item_id: int, background_tasks: Bac
                     item_id=item_id,
                     user_id=current_user.user_id,
                     amount=bid_data.amount,
-                    background_tasks=background_tasks,
+                    is_watching=lambda watcher_id: bid_manager.is_watching(item_id, watcher_id),
+                    user_email=current_user.email_id,
                 )
 
                 if isinstance(result, dict) and "error" in result:
@@ -129,10 +133,12 @@ async def bid_endpoint(websocket: WebSocket, item_id: int, background_tasks: Bac
 
 
     except WebSocketDisconnect:
-        bid_manager.disconnect(websocket, item_id)
+        bid_manager.disconnect(websocket, item_id, current_user.user_id)
     except Exception as e:
         print(f"Unexpected error in bid endpoint: {str(e)}")
-        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        bid_manager.disconnect(websocket, item_id, current_user.user_id)
+        if websocket.application_state == WebSocketState.CONNECTED:
+            await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
 
 
 """
@@ -149,10 +155,17 @@ sample output for the bid endpoint
   "item_id": 2,
   "new_bid": 900,
   "user_id": 4,
+  "end_time": "2025-04-30T20:00:00",
   "status": "accepted"
 }
 
 
+events on the bid socket: the auction_live / auction_upcoming / auction_extended / auction_closed
+events of the active items endpoint, after auction_closed the server closes the socket with code 1000
+
+a bid inside the soft-close window moves end_time, the bid's own result already carries the new one
+
+
 sample output for the bid endpoint when the bid is not bidder
 
 {
@@ -0,0 +1,41 @@
+from fastapi import APIRouter
+from starlette.requests import Request
+
+from src.common.utils.etags import not_modified
+from src.common.utils.image_derivatives import derivative_cache, DERIVATIVE_FORMAT
+from src.common.utils.static_files import IMMUTABLE, content_etag, file_response
+
+router = APIRouter()
+
+
+@router.api_route("/{size}/{filename}", methods=["GET", "HEAD"])
+async def get_image_derivative(size: str, filename: str, request: Request):
+    """
+    Resized copy of an item image, rendered on the first request when the upload didn't already.
+    Supports Range, answers If-None-Match with 304 without touching the disk
+
+    """
+    etag = None
+    if size in derivative_cache.sizes:
+        # the pixel size is part of the version, changing it gives clients new copies
+        etag = content_etag(filename, f"{size}{derivative_cache.sizes[size]}")
+    if etag:
+        cached = not_modified(request, etag, IMMUTABLE)
+        if cached is not None:
+            return cached
+    path = await derivative_cache.get(size, filename)
+    return file_response(request, path, etag, "image/webp" if path.endswith(DERIVATIVE_FORMAT[1]) else None)
+
+
+@router.api_route("/{filename}", methods=["GET", "HEAD"])
+async def get_image(filename: str, request: Request):
+    """
+    Original item image as uploaded, cached as immutable since its name is its content hash
+
+    """
+    etag = content_etag(filename)
+    if etag:
+        cached = not_modified(request, etag, IMMUTABLE)
+        if cached is not None:
+            return cached
+    return file_response(request, derivative_cache.source_path(filename), etag)
@@ -1,25 +1,43 @@
-import asyncio
-import os
+import json
+import zipfile
 from datetime import datetime
 from typing import Optional
-from fastapi import APIRouter, Depends, File, UploadFile
-from pydantic import BaseModel
-
-from src.common.utils.constants import FILE_FOLDER_PATH, BYTES_PER_CHUNK
-from src.common.utils.user_defined_errors import UserUser
+from fastapi import APIRouter, Depends, File, UploadFile, Query, HTTPException
+from pydantic import BaseModel, validator
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.common.utils.constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.common.utils.etags import REVALIDATE_PRIVATE, not_modified, version_etag
+from src.common.utils.file_store import content_store
+from src.common.utils.image_derivatives import derivative_cache
+from src.common.utils.generate_error_details import generate_details
+from src.common.utils.user_defined_errors import UserUser, InvalidCursorError
 from src.db.functions.item import update_item_detail, add_item_detail, get_item_detail, get_item_detail_by_id, \
-    get_item_detail_for_user, delete_item
+    get_item_detail_for_user, delete_item, to_utc_naive
+from src.db.functions.bulk_import import import_items, detect_format
+from src.db.functions.transitions import transition_scheduler
+from src.db.routing import replica_router
 from src.resources.token import UserBase, get_current_active_user
 
 item_router = APIRouter()
 
 
+def end_after_start(value, values):
+    if "start_time" in values and to_utc_naive(value) <= to_utc_naive(values["start_time"]):
+        raise ValueError("end_time must be after start_time")
+    return value
+
+
 class ItemBase(BaseModel):
     item_name: str
     start_time: datetime
     end_time: datetime
     start_price: int
 
+    _end_after_start = validator("end_time", allow_reuse=True)(end_after_start)
+
 
 class UpdateItem(BaseModel):
     item_name: str
@@ -31,6 +49,8 @@ class UpdateItem(BaseModel):
     status: bool
     won_by: Optional[int] = None
 
+    _end_after_start = validator("end_time", allow_reuse=True)(end_after_start)
+
 
 @item_router.post("/add_item_details")
 async def add_item_details(data: ItemBase, file: UploadFile = File(..., description='Upload a file'),
@@ -39,25 +59,40 @@ async def add_item_details(data: ItemBase, file: UploadFile = File(..., descript
     if current_user.user_type == "user":
         raise UserUser(message="Normal User can't add item login as admin")
 
-    file_pointer = 0  # Stores which part of file we're reading currently
-    filename = file.filename
-    filepath = os.path.join(FILE_FOLDER_PATH, filename)
-    data2 = await file.read(BYTES_PER_CHUNK)
-
-    with open(filepath, 'wb+') as f:
-
-        while data2:
-            task = asyncio.create_task(file.seek(file_pointer))  # Highly Optional
-            f.write(data2)
-            file_pointer += BYTES_PER_CHUNK
-            await task
-            data2 = await file.read(BYTES_PER_CHUNK)
+    filepath = await content_store.save_upload(file)
+    derivative_cache.schedule(filepath)
 
     item = add_item_detail(data.item_name, data.start_time, data.end_time, data.start_price,filepath)
+    replica_router.mark_write(current_user.user_id)
+    await transition_scheduler.item_changed(item)
 
     return {"message": "Item Added", "item_id": item}
 
 
+@item_router.post("/bulk_import")
+async def bulk_import_items(file: UploadFile = File(..., description='CSV or JSON lines file of items'),
+                            images: Optional[UploadFile] = File(None, description='Zip archive of item images'),
+                            file_format: Optional[str] = Query(None, regex="^(csv|jsonl)$"),
+                            current_user: UserBase = Depends(get_current_active_user)):
+
+    if current_user.user_type == "user":
+        raise UserUser(message="Normal User can't add item login as admin")
+
+    try:
+        summary = await run_in_threadpool(
+            import_items,
+            file.file,
+            file_format or detect_format(file.filename),
+            images.file if images else None,
+        )
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail=generate_details("Images must be a zip archive", "BadZipFile"))
+    replica_router.mark_write(current_user.user_id)
+    await transition_scheduler.item_changed()
+
+    return {"message": "Items imported", **summary}
+
+
 @item_router.put("/update_item_details/{item_id}")
 async def update_item_details(item_id, data: UpdateItem, current_user: UserBase = Depends(get_current_active_user)):
     if current_user.user_type == "user":
@@ -65,25 +100,61 @@ async def update_item_details(item_id, data: UpdateItem, current_user: UserBase
     else:
         item = update_item_detail(item_id, data.item_name, data.start_time, data.end_time, data.start_price,
                                           data.current_bid, data.user_id, data.status, data.won_by)
+        replica_router.mark_write(current_user.user_id)
+        await transition_scheduler.item_changed(item)
 
     return {"message": "Item updated successfully", "item_id": item}
 
 
 @item_router.get("/get_item_details")
-async def get_item_details(current_user: UserBase = Depends(get_current_active_user)):
-
-    if current_user.user_type == "user":
-       item = get_item_detail_for_user()
-    else:
-       item = get_item_detail()
+async def get_item_details(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    current_user: UserBase = Depends(get_current_active_user),
+):
 
-    return {"item on auctions :": item}
+    if_none_match = request.headers.get("if-none-match")
+    try:
+        if current_user.user_type == "user":
+           page = get_item_detail_for_user(limit, cursor, include_total, current_user.user_id, if_none_match)
+        else:
+           page = get_item_detail(limit, cursor, include_total, current_user.user_id, if_none_match)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=e.response_code, detail=generate_details(e.message, e.type))
+
+    headers = {"etag": page["etag"], "cache-control": REVALIDATE_PRIVATE}
+    if page.get("not_modified"):
+        return Response(status_code=304, headers=headers)
+    if "items_json" in page:
+        # rows pre-encoded by the live catalog, only the envelope is encoded here
+        body = b'{"item on auctions :":%s,"next_cursor":%s,"total_estimate":%s}' % (
+            page["items_json"], json.dumps(page["next_cursor"]).encode(), json.dumps(page["total_estimate"]).encode()
+        )
+        return Response(body, media_type="application/json", headers=headers)
+    response.headers.update(headers)
+
+    return {
+        "item on auctions :": page["items"],
+        "next_cursor": page["next_cursor"],
+        "total_estimate": page["total_estimate"],
+    }
 
 @item_router.get("/get_item_details/{item_id}")
-async def get_item_details(item_id, current_user: UserBase = Depends(get_current_active_user)
+async def get_item_details(item_id, request: Request, response: Response,
+                           current_user: UserBase = Depends(get_current_active_user)
 ):
     item = get_item_detail_by_id(item_id)
 
+    if "version" in item:
+        etag = version_etag("item", item["item_id"], item["version"])
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+        response.headers.update({"etag": etag, "cache-control": REVALIDATE_PRIVATE})
+
     return {"message": "your searched item is", item_id: item}
 
 
@@ -93,6 +164,8 @@ async def delete_item_details(item_id, current_user: UserBase = Depends(get_curr
         raise UserUser(message="Normal User can't delete item login as admin")
     else:
         item = delete_item(item_id)
+        replica_router.mark_write(current_user.user_id)
+        await transition_scheduler.item_changed(int(item_id))
 
     return item
 
@@ -20,6 +20,7 @@ from src.db.database import Users
 from src.db.errors import ItemNotFound
 from src.db.functions.find_user import find_user_pass_email, find_user_pass_email_id
 from src.db.functions.logout import user_login, user_logout
+from src.db.routing import replica_router
 from src.db.utils import AsyncDBConnection
 
 token_router = APIRouter()
@@ -67,6 +68,7 @@ class UserInDB(UserBase):
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 
 def get_user(user_email: str):
@@ -151,7 +153,7 @@ async def get_websocket_user(token: str):
             raise credentials_exception
 
         # Corrected: Use the session within the context manager
-        async with AsyncDBConnection(False) as db:
+        async with AsyncDBConnection(False, read_only=True, user_key=email) as db:
             result = await db.execute(select(Users).where(Users.email_id == email))
             user = result.scalar_one_or_none()
             if user is None:
@@ -163,6 +165,20 @@ async def get_websocket_user(token: str):
         print(f"JWT Error: {str(e)}")
         raise credentials_exception
 
+async def get_token_email(token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[str]:
+    """
+    Email of the caller of a public endpoint when a valid token is sent, None otherwise.
+    Only used to route the caller's reads, nothing is authorised with it
+
+    """
+    if not token:
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """
 
@@ -335,6 +351,7 @@ async def login_for_access_token(form_data: AuthUser):
             headers={"WWW-Authenticate": "Bearer"},
         )
     user_login(user.email_id)
+    replica_router.mark_write(user.email_id, user.user_id)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.email_id}, expires_delta=access_token_expires
@@ -359,9 +376,9 @@ async def logout_endpoint(current_user: UserBase = Depends(get_current_active_us
             headers={"WWW-Authenticate": "Bearer"},
         )
     try:
-        user_logout(current_user.email)
+        user_logout(current_user.email_id)
     except UserErrors as e:
-        data = "\n User Email {}  \n ".format(str(current_user.email))
+        data = "\n User Email {}  \n ".format(str(current_user.email_id))
         logging.warning(data, exc_info=True)
         with open("error.log", "a") as f:
             f.write(
@@ -371,7 +388,7 @@ async def logout_endpoint(current_user: UserBase = Depends(get_current_active_us
 
         raise HTTPException(status_code=e.response_code, detail=details)
     except Exception:
-        data = "\n User Email {}  \n ".format(str(current_user.email))
+        data = "\n User Email {}  \n ".format(str(current_user.email_id))
         logging.warning(data, exc_info=True)
         with open("error.log", "a") as f:
             f.write(
@@ -380,4 +397,6 @@ async def logout_endpoint(current_user: UserBase = Depends(get_current_active_us
         details = generate_details("Internal Server Error", "InternalServerError")
         raise HTTPException(status_code=500, detail=details)
 
+    replica_router.mark_write(current_user.email_id, current_user.user_id)
+
     return {"message": "success"}
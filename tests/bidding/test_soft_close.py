@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+
+from src.db.functions.websocket_bids_manager import soft_close_deadline
+
+END = datetime(2025, 1, 1, 12, 0, 0)
+
+
+class TestSoftCloseDeadline(TestCase):
+
+    def test_bid_inside_window_extends(self):
+        deadline = soft_close_deadline(END, END - timedelta(seconds=10), 0,
+                                       window_seconds=30, extension_seconds=60)
+
+        self.assertEqual(deadline, END + timedelta(seconds=60))
+
+    def test_bid_before_window_keeps_end(self):
+        deadline = soft_close_deadline(END, END - timedelta(seconds=31), 0,
+                                       window_seconds=30, extension_seconds=60)
+
+        self.assertIsNone(deadline)
+
+    def test_extensions_are_capped(self):
+        bid_time = END - timedelta(seconds=5)
+
+        self.assertIsNotNone(soft_close_deadline(END, bid_time, 2, window_seconds=30,
+                                                 extension_seconds=60, max_extensions=3))
+        self.assertIsNone(soft_close_deadline(END, bid_time, 3, window_seconds=30,
+                                              extension_seconds=60, max_extensions=3))
+
+    def test_disabled(self):
+        self.assertIsNone(soft_close_deadline(END, END - timedelta(seconds=1), 0,
+                                              window_seconds=0, extension_seconds=60))
@@ -0,0 +1,114 @@
+import io
+import json
+import os
+import tempfile
+import zipfile
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from sqlalchemy.sql import Select
+
+from src.common.utils.file_store import ContentStore
+from src.db.functions.bulk_import import INSERT_FAILED, ItemImporter
+
+
+class FakeSession:
+    """ Refuses every insert holding a row named "refused", like a constraint of the database would """
+
+    def __init__(self, referenced=()):
+        self.rows = []
+        self.pending = []
+        self.inserts = 0
+        self.referenced = list(referenced)
+
+    def execute(self, statement, params=None):
+        if isinstance(statement, Select):
+            return Mock(scalars=Mock(return_value=Mock(all=Mock(return_value=self.referenced))))
+        self.inserts += 1
+        rows = params if isinstance(params, list) else [params]
+        if any(values["name"] == "refused" for values in rows):
+            raise Exception("value too long for type character varying")
+        self.pending.extend(rows)
+
+    def commit(self):
+        self.rows.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+
+def jsonl(*names_and_images) -> io.BytesIO:
+    return io.BytesIO("\n".join(
+        json.dumps({"item_name": name, "start_time": "2030-01-01T10:00:00", "end_time": "2030-01-02T10:00:00",
+                    "start_price": 10, "image": image})
+        for name, image in names_and_images
+    ).encode())
+
+
+def archive(**files) -> zipfile.ZipFile:
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w") as zip_file:
+        for name, content in files.items():
+            zip_file.writestr(name, content)
+    return zipfile.ZipFile(data)
+
+
+class TestItemImporter(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.store = ContentStore(self.folder.name)
+        patcher = patch("src.db.functions.bulk_import.content_store", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.folder.cleanup)
+
+    def importer(self, session: FakeSession, images=None, chunk_size: int = 3) -> ItemImporter:
+        return ItemImporter(SimpleNamespace(session=session), images, chunk_size)
+
+    def test_refused_chunk_is_replayed_row_by_row(self):
+        session = FakeSession()
+        stream = jsonl(("a", None), ("refused", None), ("b", None), ("c", None))
+
+        with self.assertLogs("src.common.utils.error_handlers", "WARNING") as logs:
+            summary = self.importer(session).run(stream, "jsonl")
+
+        self.assertEqual([row["name"] for row in session.rows], ["a", "b", "c"])
+        # the failed chunk, its three rows one by one, then the last chunk
+        self.assertEqual(session.inserts, 5)
+        self.assertEqual(summary["imported"], 3)
+        self.assertEqual(summary["errors"], [{"row": 2, "errors": [INSERT_FAILED]}])
+        self.assertIn("character varying", logs.output[0])
+
+    def test_invalid_rows_extract_nothing(self):
+        session = FakeSession()
+        stream = io.BytesIO(json.dumps({"item_name": "a", "start_price": 10, "image": "a.jpg"}).encode())
+
+        summary = self.importer(session, archive(**{"a.jpg": b"a"})).run(stream, "jsonl")
+
+        self.assertEqual(summary["failed"], 1)
+        self.assertEqual(os.listdir(self.folder.name), [])
+
+    def test_images_of_refused_rows_are_removed(self):
+        session = FakeSession()
+        stream = jsonl(("a", "shared.jpg"), ("refused", "shared.jpg"), ("refused", "only.jpg"))
+
+        summary = self.importer(session, archive(**{"shared.jpg": b"shared", "only.jpg": b"only"})).run(stream, "jsonl")
+
+        self.assertEqual(summary["imported"], 1)
+        self.assertEqual(os.listdir(self.folder.name), [os.path.basename(session.rows[0]["filepath"])])
+
+    def test_images_stored_before_or_referenced_elsewhere_are_kept(self):
+        existing = self.store.save(io.BytesIO(b"existing"), "existing.jpg")
+        other = self.store.save(io.BytesIO(b"other"), "other.jpg")
+        os.remove(other)
+        # the same content uploaded for another item while the import ran
+        session = FakeSession(referenced=[other])
+        stream = jsonl(("refused", "existing.jpg"), ("refused", "other.jpg"))
+
+        self.importer(session, archive(**{"existing.jpg": b"existing", "other.jpg": b"other"})).run(stream, "jsonl")
+
+        self.assertEqual(sorted(os.listdir(self.folder.name)),
+                         sorted(os.path.basename(path) for path in (existing, other)))
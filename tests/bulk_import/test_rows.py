@@ -0,0 +1,97 @@
+import csv
+import io
+from unittest import TestCase
+
+from pydantic import ValidationError
+
+from src.db.functions.bulk_import import NOT_UTF8, ImportItemRow, detect_format, iter_raw_rows
+
+
+def row(**values) -> dict:
+    return {"item_name": "Vase", "start_time": "2030-01-01T10:00:00", "end_time": "2030-01-02T10:00:00",
+            "start_price": "100", **values}
+
+
+class TestImportItemRow(TestCase):
+
+    def test_valid_row(self):
+        item = ImportItemRow.parse_obj(row(image=""))
+
+        self.assertEqual(item.start_price, 100)
+        self.assertIsNone(item.image)
+
+    def test_negative_price(self):
+        with self.assertRaises(ValidationError) as raised:
+            ImportItemRow.parse_obj(row(start_price=-1))
+
+        self.assertEqual(raised.exception.errors()[0]["loc"], ("start_price",))
+
+    def test_end_not_after_start(self):
+        with self.assertRaises(ValidationError):
+            ImportItemRow.parse_obj(row(end_time="2030-01-01T10:00:00"))
+
+    def test_end_after_start_across_offsets(self):
+        # 10:00+02:00 is 08:00 UTC, before the start
+        with self.assertRaises(ValidationError):
+            ImportItemRow.parse_obj(row(start_time="2030-01-01T09:00:00+00:00", end_time="2030-01-01T10:00:00+02:00"))
+
+    def test_missing_fields(self):
+        with self.assertRaises(ValidationError) as raised:
+            ImportItemRow.parse_obj({"item_name": "Vase"})
+
+        self.assertEqual({error["loc"][0] for error in raised.exception.errors()},
+                         {"start_time", "end_time", "start_price"})
+
+
+class TestRawRows(TestCase):
+
+    def test_csv_rows_are_numbered_by_line(self):
+        data = "﻿item_name,start_price\nVase,100\nLamp,50\n".encode()
+
+        rows = list(iter_raw_rows(io.BytesIO(data), "csv"))
+
+        self.assertEqual(rows, [(2, {"item_name": "Vase", "start_price": "100"}),
+                                (3, {"item_name": "Lamp", "start_price": "50"})])
+
+    def test_jsonl_skips_blank_lines_and_reports_bad_json(self):
+        data = b'{"item_name": "Vase"}\n\n{not json}\n{"item_name": "Lamp"}\n'
+
+        rows = list(iter_raw_rows(io.BytesIO(data), "jsonl"))
+
+        self.assertEqual([row_no for row_no, _ in rows], [1, 3, 4])
+        self.assertEqual(rows[0][1], {"item_name": "Vase"})
+        self.assertIsInstance(rows[1][1], ValueError)
+        self.assertEqual(rows[2][1], {"item_name": "Lamp"})
+
+    def test_csv_line_not_utf8_is_a_row_error(self):
+        data = "item_name,start_price\nVase,100\n".encode() + "Café,5\n".encode("latin-1") + b"Lamp,50\n"
+
+        rows = list(iter_raw_rows(io.BytesIO(data), "csv"))
+
+        self.assertEqual([row_no for row_no, _ in rows], [2, 3, 4])
+        self.assertEqual(str(rows[1][1]), NOT_UTF8)
+        self.assertEqual(rows[2][1], {"item_name": "Lamp", "start_price": "50"})
+
+    def test_malformed_csv_record_is_a_row_error(self):
+        data = b"item_name,start_price\nVase,100\n" + b"x" * 20 + b",5\nLamp,50\n"
+        limit = csv.field_size_limit(15)
+        try:
+            rows = list(iter_raw_rows(io.BytesIO(data), "csv"))
+        finally:
+            csv.field_size_limit(limit)
+
+        self.assertEqual([row_no for row_no, _ in rows], [2, 3, 4])
+        self.assertIn("Invalid CSV", str(rows[1][1]))
+        self.assertEqual(rows[2][1], {"item_name": "Lamp", "start_price": "50"})
+
+    def test_jsonl_line_not_utf8_is_a_row_error(self):
+        rows = list(iter_raw_rows(io.BytesIO(b'{"a": 1}\n{"b": "\xe9"}\n{"c": 2}\n'), "jsonl"))
+
+        self.assertEqual(rows[0], (1, {"a": 1}))
+        self.assertEqual(str(rows[1][1]), NOT_UTF8)
+        self.assertEqual(rows[2], (3, {"c": 2}))
+
+    def test_detect_format(self):
+        self.assertEqual(detect_format("items.NDJSON"), "jsonl")
+        self.assertEqual(detect_format("items.csv"), "csv")
+        self.assertEqual(detect_format(None), "csv")
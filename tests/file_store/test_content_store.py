@@ -0,0 +1,47 @@
+import io
+import os
+import tempfile
+from unittest import TestCase
+
+from src.common.utils.file_store import ContentStore
+from src.common.utils.user_defined_errors import FileTooLarge
+
+
+class TestContentStore(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.store = ContentStore(self.folder.name, chunk_size=4, max_bytes=64)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_same_content_is_stored_once(self):
+        first = self.store.save(io.BytesIO(b"lot photo bytes"), "vase.JPG")
+        second = self.store.save(io.BytesIO(b"lot photo bytes"), "copy.jpg")
+
+        self.assertEqual(first, second)
+        self.assertTrue(first.endswith(".jpg"))
+        self.assertEqual(os.listdir(self.folder.name), [os.path.basename(first)])
+        self.assertEqual((self.store.stored, self.store.deduplicated), (1, 1))
+
+    def test_too_large_leaves_nothing(self):
+        with self.assertRaises(FileTooLarge):
+            self.store.save(io.BytesIO(b"x" * 65), "big.png")
+
+        self.assertEqual(os.listdir(self.folder.name), [])
+
+    def test_unusual_extension_is_dropped(self):
+        path = self.store.save(io.BytesIO(b"abc"), "../../evil.sh;rm")
+
+        self.assertEqual(os.path.dirname(path), self.folder.name)
+        self.assertNotIn(".", os.path.basename(path))
+
+    def test_store_tells_new_files_apart(self):
+        path, created = self.store.store(io.BytesIO(b"abc"), "a.png")
+        again, created_again = self.store.store(io.BytesIO(b"abc"), "b.png")
+
+        self.assertEqual((path, created, created_again), (again, True, False))
+        self.store.discard(path)
+        self.store.discard(path)
+        self.assertEqual(os.listdir(self.folder.name), [])
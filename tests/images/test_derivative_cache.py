@@ -0,0 +1,51 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from src.common.utils.image_derivatives import DerivativeCache, image_urls
+from src.common.utils.user_defined_errors import FileNotFound
+
+
+class TestDerivativeCache(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache = DerivativeCache(self.folder.name, os.path.join(self.folder.name, "derived"), max_bytes=250)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def _write(self, name: str, mtime: int) -> str:
+        path = self.cache.path("thumb", name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"x" * 100)
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_evicts_least_recently_used(self):
+        oldest = self._write("a.jpg", 1000)
+        middle = self._write("b.jpg", 2000)
+        newest = self._write("c.jpg", 3000)
+
+        self.assertEqual(self.cache._evict(), 200)
+        self.assertFalse(os.path.exists(oldest))
+        self.assertTrue(os.path.exists(middle) and os.path.exists(newest))
+
+    def test_names_outside_the_folder_are_refused(self):
+        for name in ("../secret.jpg", ".hidden", ""):
+            with self.assertRaises(FileNotFound):
+                self.cache.source_path(name)
+
+
+class TestImageUrls(TestCase):
+
+    def test_urls(self):
+        urls = image_urls("/srv/files/abc.jpg")
+
+        self.assertEqual(urls["image_url"], "/api/images/abc.jpg")
+        self.assertEqual(urls["thumbnail_url"], "/api/images/thumb/abc.jpg")
+        self.assertEqual(urls["medium_url"], "/api/images/medium/abc.jpg")
+
+    def test_no_image(self):
+        self.assertEqual(set(image_urls(None).values()), {None})
@@ -0,0 +1,39 @@
+from unittest import TestCase
+
+from src.common.utils.etags import etag_matches
+from src.common.utils.static_files import RangeNotSatisfiable, content_etag, parse_range
+
+SHA = "ab" * 32
+
+
+class TestParseRange(TestCase):
+
+    def test_ranges(self):
+        self.assertEqual(parse_range("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(parse_range("bytes=900-", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=-100", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=990-5000", 1000), (990, 999))
+
+    def test_ignored(self):
+        for header in (None, "", "items=0-1", "bytes=0-1,5-6", "bytes=abc", "bytes=5-1"):
+            self.assertIsNone(parse_range(header, 1000), header)
+
+    def test_unsatisfiable(self):
+        for header in ("bytes=1000-", "bytes=-0"):
+            with self.assertRaises(RangeNotSatisfiable):
+                parse_range(header, 1000)
+
+
+class TestETags(TestCase):
+
+    def test_content_etag(self):
+        self.assertEqual(content_etag(f"{SHA}.jpg"), f'"{SHA}"')
+        self.assertEqual(content_etag(f"{SHA}.jpg", "thumb240"), f'"{SHA}-thumb240"')
+        self.assertIsNone(content_etag("holiday.jpg"))
+
+    def test_if_none_match(self):
+        self.assertTrue(etag_matches(f'"x", "{SHA}"', f'"{SHA}"'))
+        self.assertTrue(etag_matches(f'W/"{SHA}"', f'"{SHA}"'))
+        self.assertTrue(etag_matches("*", f'"{SHA}"'))
+        self.assertFalse(etag_matches('"other"', f'"{SHA}"'))
+        self.assertFalse(etag_matches(None, f'"{SHA}"'))
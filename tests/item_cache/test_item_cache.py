@@ -0,0 +1,67 @@
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import patch
+
+from src.db.database import ItemStatus
+from src.db.functions.item_cache import CachedItem, ItemCache, WORKER_ID
+
+
+def cached_item(item_id: int, current_bid: int = 100) -> CachedItem:
+    return CachedItem(item_id=item_id, name=f"Item {item_id}", start_time=datetime(2025, 1, 1),
+                      end_time=datetime(2025, 1, 2), current_bid=current_bid, user_id=None,
+                      status=ItemStatus.LIVE, start_price=100, won_by=None, filepath=None)
+
+
+class TestItemCache(TestCase):
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ItemCache(max_size=2, ttl_seconds=60)
+        cache.put(cached_item(1))
+        cache.put(cached_item(2))
+        cache.get(1)
+        cache.put(cached_item(3))
+
+        self.assertIsNone(cache.get(2))
+        self.assertIsNotNone(cache.get(1))
+        self.assertEqual(cache.evictions, 1)
+
+    def test_entries_expire(self):
+        cache = ItemCache(max_size=10, ttl_seconds=30)
+        with patch("src.db.functions.item_cache.time.monotonic", return_value=1000.0):
+            cache.put(cached_item(1))
+        with patch("src.db.functions.item_cache.time.monotonic", return_value=1031.0):
+            self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.expired, 1)
+
+    def test_update_in_place(self):
+        cache = ItemCache(max_size=10, ttl_seconds=60)
+        cache.put(cached_item(1))
+        cache.update(1, current_bid=250, won_by=7)
+        cache.update(2, current_bid=999)
+
+        item = cache.get(1)
+
+        self.assertEqual((item.current_bid, item.won_by), (250, 7))
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.stats()["hit_rate"], 0.5)
+
+    def test_notifications_of_other_workers_invalidate(self):
+        cache = ItemCache(max_size=10, ttl_seconds=60)
+        cache.put(cached_item(1))
+        cache.on_notify(None, 0, "item_cache", f"1:{WORKER_ID}")
+        self.assertIsNotNone(cache.get(1))
+
+        cache.on_notify(None, 0, "item_cache", "1:other-host:42")
+        self.assertIsNone(cache.get(1))
+
+    def test_other_workers_bids_update_in_place(self):
+        cache = ItemCache(max_size=10, ttl_seconds=60)
+        cache.put(cached_item(1))
+        cache.apply_bid({"item_id": 1, "current_bid": 300, "won_by": 4, "end_time": "2025-01-02 00:00:00",
+                         "extensions": 0, "version": 2})
+        self.assertEqual((cache.get(1).current_bid, cache.get(1).version), (300, 2))
+
+        # an admin edit in between was missed, the copy is dropped rather than patched
+        cache.apply_bid({"item_id": 1, "current_bid": 500, "won_by": 4, "end_time": "2025-01-02 00:00:00",
+                         "extensions": 0, "version": 4})
+        self.assertIsNone(cache.get(1))
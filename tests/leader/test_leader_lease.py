@@ -0,0 +1,153 @@
+import asyncio
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import patch
+
+from sqlalchemy.sql import Insert, Update
+
+from src.db.leader import LeaderLease
+
+
+class FakeConnection:
+    """ Answers the lease's statements, `locked` when another worker holds the advisory lock """
+
+    def __init__(self, locked: bool = False, heartbeat_rows: int = 1):
+        self.locked = locked
+        self.heartbeat_rows = heartbeat_rows
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        if isinstance(statement, Insert):
+            self.statements.append("upsert")
+            return SimpleNamespace(rowcount=1)
+        if isinstance(statement, Update):
+            self.statements.append("heartbeat")
+            return SimpleNamespace(rowcount=self.heartbeat_rows)
+        self.statements.append(str(statement))
+        return SimpleNamespace(scalar=lambda: not self.locked)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def invalidate(self):
+        self.statements.append("invalidate")
+
+
+class FakeEngine:
+    def __init__(self, connection: FakeConnection):
+        self.connection = connection
+
+    def connect(self):
+        engine = self
+
+        class Connect:
+            async def __aenter__(self):
+                return engine.connection
+
+            async def __aexit__(self, *exc_info):
+                return False
+
+        return Connect()
+
+
+class TestLeaderLease(TestCase):
+
+    def setUp(self):
+        self.lease = LeaderLease("test_jobs", heartbeat_seconds=1)
+        self.events = []
+
+        async def acquired():
+            self.events.append("acquired")
+
+        async def lost():
+            self.events.append("lost")
+
+        self.lease.on_acquired.append(acquired)
+        self.lease.on_lost.append(lost)
+
+    def test_lock_held_elsewhere(self):
+        connection = FakeConnection(locked=True)
+
+        self.assertFalse(asyncio.run(self.lease._acquire(connection)))
+
+        self.assertFalse(self.lease.is_leader)
+        self.assertEqual(connection.statements, ["SELECT pg_try_advisory_lock(:key)"])
+        self.assertEqual(self.events, [])
+
+    def test_lock_taken(self):
+        connection = FakeConnection()
+
+        self.assertTrue(asyncio.run(self.lease._acquire(connection)))
+
+        self.assertTrue(self.lease.is_leader)
+        self.assertIsNotNone(self.lease.acquired_at)
+        self.assertEqual(connection.statements[1:], ["upsert"])
+        # nothing left open between heartbeats
+        self.assertEqual(connection.commits, 2)
+        self.assertEqual(self.events, ["acquired"])
+
+    def test_failing_callback_keeps_the_lease(self):
+        async def broken():
+            raise RuntimeError("boom")
+
+        self.lease.on_acquired.insert(0, broken)
+
+        self.assertTrue(asyncio.run(self.lease._acquire(FakeConnection())))
+        self.assertEqual(self.events, ["acquired"])
+
+    def test_heartbeat_keeps_the_lease(self):
+        connection = FakeConnection()
+
+        async def run():
+            await self.lease._acquire(connection)
+            await self.lease._heartbeat(connection)
+
+        asyncio.run(run())
+
+        self.assertTrue(self.lease.is_leader)
+        self.assertEqual(connection.statements[-1], "heartbeat")
+
+    def test_heartbeat_on_a_taken_over_lease_steps_down(self):
+        connection = FakeConnection(heartbeat_rows=0)
+
+        async def run():
+            await self.lease._acquire(connection)
+            try:
+                await self.lease._heartbeat(connection)
+            except RuntimeError:
+                await self.lease._step_down()
+
+        asyncio.run(run())
+
+        self.assertFalse(self.lease.is_leader)
+        self.assertIsNone(self.lease.acquired_at)
+        self.assertEqual(self.events, ["acquired", "lost"])
+
+    def test_run_steps_down_when_the_heartbeat_finds_no_lease(self):
+        connection = FakeConnection(heartbeat_rows=0)
+        self.lease.heartbeat_seconds = 0.01
+
+        async def run():
+            stop = asyncio.Event()
+
+            async def lost():
+                stop.set()
+
+            self.lease.on_lost.append(lost)
+            with patch("src.db.leader.engine", FakeEngine(connection)):
+                await asyncio.wait_for(self.lease.run(stop), timeout=5)
+
+        with self.assertLogs("src.common.utils.error_handlers", "ERROR") as logs:
+            asyncio.run(run())
+
+        self.assertFalse(self.lease.is_leader)
+        self.assertEqual(self.events, ["acquired", "lost"])
+        # the connection that may still hold the lock never goes back to the pool
+        self.assertEqual(connection.statements[-2:], ["heartbeat", "invalidate"])
+        self.assertIn("taken over", logs.output[0])
+
+    def test_step_down_when_not_leader_does_nothing(self):
+        asyncio.run(self.lease._step_down())
+
+        self.assertEqual(self.events, [])
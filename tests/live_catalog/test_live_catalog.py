@@ -0,0 +1,116 @@
+import asyncio
+import json
+from dataclasses import replace
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from src.common.utils.etags import version_etag
+from src.common.utils.pagination import decode_cursor
+from src.db.database import ItemStatus
+from src.db.functions.item_cache import CachedItem
+from src.db.functions.live_catalog import LiveCatalog
+
+
+def cached_item(item_id: int, version: int = 1, status: ItemStatus = ItemStatus.LIVE, current_bid: int = 100):
+    return CachedItem(item_id=item_id, name=f"Item {item_id}", start_time=datetime(2025, 1, 1),
+                      end_time=datetime(2025, 1, 2), current_bid=current_bid, user_id=None,
+                      status=status, start_price=100, won_by=None, filepath=None, version=version)
+
+
+class FakeConnection:
+    """ AsyncDBConnection returning `rows`, running `during` while the query is in flight """
+
+    def __init__(self, rows, during=None):
+        self.rows = rows
+        self.during = during
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        if self.during:
+            self.during()
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = self.rows
+        return result
+
+
+def loaded(catalog: LiveCatalog, rows, during=None):
+    with patch("src.db.functions.live_catalog.AsyncDBConnection", return_value=FakeConnection(rows, during)):
+        asyncio.run(catalog.load())
+
+
+class TestLiveCatalog(TestCase):
+
+    def test_older_versions_are_ignored(self):
+        catalog = LiveCatalog()
+        loaded(catalog, [cached_item(1, version=3)])
+
+        self.assertFalse(catalog.apply(cached_item(1, version=2, current_bid=50)))
+        self.assertTrue(catalog.apply(cached_item(1, version=4, current_bid=300)))
+        self.assertEqual(catalog.snapshot.entries[0].item.current_bid, 300)
+        self.assertEqual(catalog.stale, 1)
+
+        catalog.apply(cached_item(1, version=5, status=ItemStatus.COMPLETED))
+        self.assertEqual(catalog.snapshot.ids, ())
+
+    def test_snapshots_are_immutable(self):
+        catalog = LiveCatalog()
+        loaded(catalog, [cached_item(1)])
+        before = catalog.snapshot
+        catalog.apply(cached_item(2))
+
+        self.assertEqual(before.ids, (1,))
+        self.assertEqual(catalog.snapshot.ids, (1, 2))
+        self.assertGreater(catalog.snapshot.version, before.version)
+        self.assertEqual([item["item_id"] for item in json.loads(catalog.snapshot.feed_json)], [1, 2])
+
+    def test_page_matches_the_database_listing(self):
+        catalog = LiveCatalog()
+        loaded(catalog, [cached_item(item_id, version=item_id) for item_id in (3, 1, 2)])
+
+        page = catalog.snapshot.page(2, include_total=True)
+        self.assertEqual([row["item_id"] for row in json.loads(page["items_json"])], [1, 2])
+        self.assertEqual(json.loads(page["items_json"])[0]["status"], "live")
+        self.assertEqual(decode_cursor(page["next_cursor"]), 2)
+        self.assertEqual(page["total_estimate"], 3)
+        self.assertEqual(page["etag"], version_etag("items", "live", 2, None, True, [(1, 1), (2, 2), (3, 3)]))
+
+        self.assertTrue(catalog.snapshot.page(2, include_total=True, if_none_match=page["etag"])["not_modified"])
+        # the same page without the total is a different response
+        self.assertNotIn("not_modified", catalog.snapshot.page(2, if_none_match=page["etag"]))
+        last = catalog.snapshot.page(2, 2)
+        self.assertEqual([row["item_id"] for row in json.loads(last["items_json"])], [3])
+        self.assertIsNone(last["next_cursor"])
+
+    def test_changes_during_a_load_survive_it(self):
+        catalog = LiveCatalog()
+        bid = cached_item(1, version=2, current_bid=500)
+        # the load read item 1 before the bid committed, item 2 closed after being read
+        loaded(catalog, [cached_item(1), cached_item(2)],
+               during=lambda: (catalog.apply(bid), catalog.apply(replace(cached_item(2, version=2),
+                                                                          status=ItemStatus.COMPLETED))))
+
+        self.assertEqual(catalog.snapshot.ids, (1,))
+        self.assertEqual(catalog.snapshot.entries[0].item.current_bid, 500)
+
+    def test_other_workers_bids_are_applied(self):
+        catalog = LiveCatalog()
+        loaded(catalog, [cached_item(1, version=3)])
+        catalog.apply_bid({"event": "bid_placed", "item_id": 1, "current_bid": 400, "won_by": 9,
+                           "end_time": "2025-01-02 00:05:00", "extensions": 1, "version": 4})
+
+        item = catalog.snapshot.entries[0].item
+        self.assertEqual((item.current_bid, item.won_by, item.version), (400, 9, 4))
+        self.assertEqual(item.end_time, datetime(2025, 1, 2, 0, 5))
+
+        # version 5 was missed, the item is read again instead
+        with patch.object(catalog, "changed") as changed:
+            catalog.apply_bid({"event": "bid_placed", "item_id": 1, "current_bid": 600, "won_by": 2,
+                               "end_time": "2025-01-02 00:05:00", "extensions": 1, "version": 6})
+        changed.assert_called_once_with(1)
+        self.assertEqual(catalog.snapshot.entries[0].item.current_bid, 400)
@@ -0,0 +1,64 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from src.common.utils.email_templates import EmailTemplates
+from src.common.utils.send_notification import auction_result_messages
+
+
+def result(email: str, item_name: str, amount: int, winner: bool = False) -> dict:
+    return {"email": email, "item_name": item_name, "amount": amount, "user_name": email.split("@")[0], "winner": winner}
+
+
+class TestEmailTemplates(TestCase):
+
+    def setUp(self):
+        self.templates = EmailTemplates()
+        self.templates.load()
+
+    def test_shared_block_is_rendered_once_per_batch(self):
+        bodies = self.templates.render_batch(
+            "loser_email.html",
+            [{"user_name": "ann"}, {"user_name": "bob"}, {"user_name": "cy"}],
+            shared={"item_name": "Lamp", "amount": 120},
+            blocks={"item_block": "auction_result_block.html"},
+        )
+
+        self.assertEqual(len(bodies), 3)
+        self.assertIn("Hi bob,", bodies[1])
+        self.assertTrue(all("₹120" in body for body in bodies))
+        self.assertEqual((self.templates.block_misses, self.templates.block_hits), (1, 0))
+
+        self.templates.render_batch("winner_email.html", [{"user_name": "dee"}],
+                                    shared={"item_name": "Lamp", "amount": 120},
+                                    blocks={"item_block": "auction_result_block.html"})
+        self.assertEqual((self.templates.block_misses, self.templates.block_hits), (1, 1))
+
+    def test_block_cache_is_bounded(self):
+        templates = EmailTemplates(block_cache_size=2)
+        for amount in (1, 2, 3):
+            templates.block("auction_result_block.html", item_name="Lamp", amount=amount)
+        templates.block("auction_result_block.html", item_name="Lamp", amount=1)
+
+        self.assertEqual(len(templates.blocks), 2)
+        self.assertEqual((templates.block_misses, templates.block_hits), (4, 0))
+
+    def test_auction_results_are_rendered_per_auction(self):
+        payloads = [
+            result("ann@x", "Lamp", 120),
+            result("bob@x", "Vase", 80, winner=True),
+            result("cy@x", "Lamp", 120, winner=True),
+            result("dee@x", "Lamp", 120),
+            result("eve@x", "Vase", 80),
+        ]
+
+        with patch("src.common.utils.send_notification.email_templates", self.templates):
+            messages = auction_result_messages(payloads)
+
+        self.assertEqual([m["To"] for m in messages], ["ann@x", "bob@x", "cy@x", "dee@x", "eve@x"])
+        self.assertEqual(messages[2]["Subject"], "🎉 You won the auction!")
+        self.assertEqual(messages[3]["Subject"], "Auction ended: Lamp")
+        self.assertIn("Hi dee,", messages[3].get_content())
+        self.assertIn("₹80", messages[4].get_content())
+        # one rendering of each auction's block, winners and losers share it
+        self.assertEqual((self.templates.block_misses, self.templates.block_hits), (2, 2))
+        self.assertEqual(self.templates.renders, 2 + len(payloads))
@@ -0,0 +1,133 @@
+import smtplib
+from email.message import EmailMessage
+from unittest import TestCase
+from unittest.mock import patch
+
+from src.common.utils.mailer import RateLimiter, SMTPPool
+
+
+class FakeSMTP:
+    """ Stand-in for `smtplib.SMTP`, `failures` holds what the next sends raise, None to accept """
+    opened = []
+    failures = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.closed = False
+        FakeSMTP.opened.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        pass
+
+    def noop(self):
+        return 250, b"OK"
+
+    def send_message(self, message):
+        failure = FakeSMTP.failures.pop(0) if FakeSMTP.failures else None
+        if failure is not None:
+            raise failure
+        self.sent.append(message["To"])
+
+    def quit(self):
+        self.closed = True
+
+    close = quit
+
+
+def message(to: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["To"] = to
+    msg.set_content("hi")
+    return msg
+
+
+class TestSMTPPool(TestCase):
+
+    def setUp(self):
+        FakeSMTP.opened = []
+        FakeSMTP.failures = []
+        patcher = patch("src.common.utils.mailer.smtplib.SMTP", FakeSMTP)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def pool(self, **kwargs) -> SMTPPool:
+        return SMTPPool(host="localhost", port=25, username=None, use_tls=False, size=2, rate_per_second=0,
+                        **{"max_messages": 100, **kwargs})
+
+    def test_batch_shares_one_connection(self):
+        pool = self.pool()
+
+        self.assertEqual(pool.send_many([message("a@x"), message("b@x"), message("c@x")]), [None, None, None])
+        pool.send(message("d@x"))
+
+        self.assertEqual(len(FakeSMTP.opened), 1)
+        self.assertEqual(FakeSMTP.opened[0].sent, ["a@x", "b@x", "c@x", "d@x"])
+
+    def test_reconnects_when_the_server_drops_the_connection(self):
+        pool = self.pool()
+        FakeSMTP.failures = [None, smtplib.SMTPServerDisconnected("gone")]
+
+        results = pool.send_many([message("a@x"), message("b@x"), message("c@x")])
+
+        self.assertEqual(results, [None, None, None])
+        self.assertEqual(len(FakeSMTP.opened), 2)
+        self.assertTrue(FakeSMTP.opened[0].closed)
+        self.assertEqual(FakeSMTP.opened[1].sent, ["b@x", "c@x"])
+        self.assertEqual(pool.reconnects, 1)
+
+    def test_refused_message_keeps_the_connection(self):
+        pool = self.pool()
+        FakeSMTP.failures = [smtplib.SMTPRecipientsRefused({"a@x": (550, b"no")})]
+
+        results = pool.send_many([message("a@x"), message("b@x")])
+
+        self.assertIsInstance(results[0], smtplib.SMTPRecipientsRefused)
+        self.assertIsNone(results[1])
+        self.assertEqual(len(FakeSMTP.opened), 1)
+        self.assertEqual(pool.send_failures, 1)
+
+    def test_connection_is_rotated_after_max_messages(self):
+        pool = self.pool(max_messages=2)
+
+        pool.send_many([message("a@x"), message("b@x"), message("c@x")])
+
+        self.assertEqual([smtp.sent for smtp in FakeSMTP.opened], [["a@x", "b@x"], ["c@x"]])
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class TestRateLimiter(TestCase):
+
+    def test_bursts_up_to_the_rate_then_waits(self):
+        clock = FakeClock()
+        with patch("src.common.utils.mailer.time", clock):
+            limiter = RateLimiter(2)
+            for _ in range(3):
+                limiter.acquire()
+
+        self.assertEqual(len(clock.slept), 1)
+        self.assertAlmostEqual(clock.slept[0], 0.5)
+
+    def test_zero_rate_is_unlimited(self):
+        clock = FakeClock()
+        with patch("src.common.utils.mailer.time", clock):
+            limiter = RateLimiter(0)
+            for _ in range(100):
+                limiter.acquire()
+
+        self.assertEqual(clock.slept, [])
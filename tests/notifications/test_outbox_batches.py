@@ -0,0 +1,89 @@
+import asyncio
+import smtplib
+from collections import namedtuple
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from src.common.utils.mailer import SMTPPool
+from src.db.functions.notification_worker import NotificationWorker
+from src.db.functions.outbox import OutboxDispatcher
+from tests.notifications.test_mailer import FakeSMTP, message as message_to
+
+Row = namedtuple("Row", "id kind payload")
+
+
+def outbid(number: int) -> Row:
+    return Row(number, "outbid", {"email_to": f"bidder{number}@x", "item_name": "Lamp", "bid_amount": 100 + number})
+
+
+class TestOutboxBatches(TestCase):
+
+    def setUp(self):
+        FakeSMTP.opened = []
+        FakeSMTP.failures = []
+
+    def send(self, rows, concurrency: int):
+        """ Errors of `_send_batch` and the batches handed to the pool """
+        pool = SMTPPool(host="localhost", port=25, username=None, use_tls=False, size=concurrency,
+                        rate_per_second=0, max_messages=100)
+        batches = []
+        send_many = pool.send_many
+        pool.send_many = lambda messages: batches.append([m["To"] for m in messages]) or send_many(messages)
+        worker = NotificationWorker(concurrency=concurrency)
+
+        async def run():
+            await worker.start()
+            try:
+                return await OutboxDispatcher(concurrency=concurrency, backend="inprocess")._send_batch(rows)
+            finally:
+                await worker.stop()
+
+        with patch("src.common.utils.mailer.smtplib.SMTP", FakeSMTP), \
+                patch("src.db.functions.outbox.mail_pool", pool), \
+                patch("src.db.functions.outbox.notification_worker", worker):
+            return asyncio.run(run()), batches
+
+    def test_batch_is_sent_in_groups_over_pooled_connections(self):
+        rows = [outbid(number) for number in range(5)] + [Row(9, "unknown", {})]
+
+        errors, batches = self.send(rows, concurrency=2)
+
+        self.assertEqual(errors[:5], [None] * 5)
+        self.assertIn("unknown notification kind", errors[5])
+        self.assertEqual(batches, [["bidder0@x", "bidder1@x", "bidder2@x"], ["bidder3@x", "bidder4@x"]])
+        self.assertEqual(sum(len(smtp.sent) for smtp in FakeSMTP.opened), 5)
+
+    def test_auction_results_are_built_together(self):
+        rows = [
+            outbid(0),
+            Row(1, "auction_result", {"email": "ann@x", "item_name": "Lamp", "amount": 120, "user_name": "ann"}),
+            Row(2, "auction_result", {"email": "bob@x", "item_name": "Lamp", "amount": 120, "user_name": "bob",
+                                      "winner": True}),
+            Row(3, "auction_result", {"email": "cy@x"}),
+        ]
+
+        build = Mock(side_effect=lambda payloads: [message_to(payload["email"]) for payload in payloads])
+        with patch.dict("src.db.functions.outbox.BATCH_MESSAGES", {"auction_result": build}):
+            errors, batches = self.send(rows, concurrency=1)
+
+        build.assert_called_once_with([row.payload for row in rows[1:]])
+        self.assertEqual(errors, [None] * 4)
+        self.assertEqual(batches, [["bidder0@x", "ann@x", "bob@x", "cy@x"]])
+
+    def test_failed_batch_build_fails_its_rows(self):
+        rows = [outbid(0), Row(1, "auction_result", {"email": "ann@x"})]
+
+        errors, batches = self.send(rows, concurrency=1)
+
+        self.assertIsNone(errors[0])
+        self.assertIn("item_name", errors[1])
+        self.assertEqual(batches, [["bidder0@x"]])
+
+    def test_failures_are_reported_per_notification(self):
+        FakeSMTP.failures = [None, smtplib.SMTPRecipientsRefused({})]
+
+        errors, _ = self.send([outbid(number) for number in range(3)], concurrency=1)
+
+        self.assertIsNone(errors[0])
+        self.assertIsNotNone(errors[1])
+        self.assertIsNone(errors[2])
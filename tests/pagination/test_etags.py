@@ -0,0 +1,29 @@
+from unittest import TestCase
+
+from src.common.utils.etags import version_etag, etag_matches
+
+
+class TestEtags(TestCase):
+
+    def test_version_etag_follows_versions(self):
+        etag = version_etag("items", "live", 20, None, [(1, 3), (2, 1)])
+
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertEqual(etag, version_etag("items", "live", 20, None, [(1, 3), (2, 1)]))
+        self.assertNotEqual(etag, version_etag("items", "live", 20, None, [(1, 4), (2, 1)]))
+        self.assertNotEqual(etag, version_etag("items", "all", 20, None, [(1, 3), (2, 1)]))
+
+    def test_etag_matches(self):
+        etag = version_etag("bids", 7, 20, None, False, (41,))
+
+        self.assertTrue(etag_matches(etag, etag))
+        self.assertTrue(etag_matches(f'"other", {etag[2:]}', etag))
+        self.assertTrue(etag_matches("*", etag))
+        self.assertFalse(etag_matches(None, etag))
+        self.assertFalse(etag_matches('W/"other"', etag))
+
+    def test_total_is_part_of_the_version(self):
+        rows = [(1, 3), (2, 1)]
+
+        self.assertNotEqual(version_etag("items", "live", 20, None, False, rows),
+                            version_etag("items", "live", 20, None, True, rows))
@@ -0,0 +1,39 @@
+from unittest import TestCase
+
+from src.common.utils.pagination import encode_cursor, decode_cursor, build_page
+from src.common.utils.user_defined_errors import InvalidCursorError
+
+
+class TestPagination(TestCase):
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor(50123)
+
+        self.assertEqual(decode_cursor(cursor), 50123)
+        self.assertNotIn("=", cursor)
+
+    def test_first_page_has_no_cursor(self):
+        self.assertIsNone(decode_cursor(None))
+        self.assertIsNone(decode_cursor(""))
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursorError):
+            decode_cursor("not-a-cursor")
+
+    def test_cursor_key_must_be_an_id(self):
+        for key in ("x", True, 1.5, None, [1]):
+            with self.assertRaises(InvalidCursorError):
+                decode_cursor(encode_cursor(key))
+
+    def test_build_page(self):
+        rows = [5, 4, 3]
+        page = build_page(rows, 2, key=lambda row: row, serialize=lambda row: {"bid_id": row})
+
+        self.assertEqual(page["items"], [{"bid_id": 5}, {"bid_id": 4}])
+        self.assertEqual(decode_cursor(page["next_cursor"]), 4)
+        self.assertIsNone(page["total_estimate"])
+
+    def test_build_last_page(self):
+        page = build_page([2, 1], 2, key=lambda row: row, serialize=lambda row: {"bid_id": row})
+
+        self.assertIsNone(page["next_cursor"])
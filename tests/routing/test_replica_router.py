@@ -0,0 +1,97 @@
+import asyncio
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from src.db.routing import ReplicaRouter
+
+
+class FakeEngine:
+    """ Replica engine whose lag query returns `lag`, or raises it when it's an exception """
+
+    def __init__(self, lag):
+        self.lag = lag
+        self.queries = 0
+
+    def connect(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement):
+        self.queries += 1
+        if isinstance(self.lag, Exception):
+            raise self.lag
+        result = MagicMock()
+        result.scalar.return_value = self.lag
+        return result
+
+
+class FakeAsyncEngine(FakeEngine):
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        return FakeEngine.execute(self, statement)
+
+
+def replica(lag):
+    """ Both replica engines sharing one query counter """
+    engine = FakeAsyncEngine(lag)
+    sync_engine = FakeEngine(lag)
+    sync_engine.__dict__ = engine.__dict__
+    return engine, patch.multiple("src.db.routing", replica_engine=engine, sync_replica_engine=sync_engine)
+
+
+class TestReplicaRouter(TestCase):
+
+    def test_primary_without_a_replica(self):
+        router = ReplicaRouter(max_lag=5, check_interval=10, pin_seconds=10)
+        with patch.multiple("src.db.routing", replica_engine=None, sync_replica_engine=None):
+            self.assertFalse(router.use_replica())
+
+    def test_lag_decides(self):
+        engine, engines = replica(1.5)
+        with engines:
+            self.assertTrue(ReplicaRouter(max_lag=5, check_interval=10, pin_seconds=10).use_replica())
+        engine, engines = replica(30.0)
+        with engines:
+            self.assertFalse(ReplicaRouter(max_lag=5, check_interval=10, pin_seconds=10).use_replica())
+
+    def test_failed_lag_check_falls_back_to_primary(self):
+        engine, engines = replica(ConnectionError("replica down"))
+        with engines:
+            router = ReplicaRouter(max_lag=5, check_interval=10, pin_seconds=10)
+            self.assertFalse(router.use_replica())
+            self.assertFalse(asyncio.run(router.use_replica_async()))
+        self.assertIsNone(router.lag)
+
+    def test_lag_is_checked_once_per_interval(self):
+        engine, engines = replica(0.0)
+        router = ReplicaRouter(max_lag=5, check_interval=10, pin_seconds=10)
+        with engines, patch("src.db.routing.time.monotonic", return_value=1000.0):
+            router.use_replica()
+            router.use_replica()
+            self.assertTrue(asyncio.run(router.use_replica_async()))
+        self.assertEqual(engine.queries, 1)
+
+    def test_writers_are_pinned_for_a_while(self):
+        engine, engines = replica(0.0)
+        router = ReplicaRouter(max_lag=5, check_interval=10, pin_seconds=10)
+        with engines:
+            with patch("src.db.routing.time.monotonic", return_value=1000.0):
+                router.mark_write(7, "bidder@example.com", None)
+                self.assertTrue(router.is_pinned(7))
+                self.assertTrue(router.is_pinned("bidder@example.com"))
+                self.assertFalse(router.use_replica(7))
+                self.assertTrue(router.use_replica(8))
+            with patch("src.db.routing.time.monotonic", return_value=1011.0):
+                self.assertFalse(router.is_pinned(7))
+                self.assertTrue(router.use_replica(7))
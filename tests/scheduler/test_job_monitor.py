@@ -0,0 +1,130 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest import TestCase
+
+from apscheduler.events import (
+    EVENT_JOB_SUBMITTED, EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED, JobEvent, JobExecutionEvent, JobSubmissionEvent,
+)
+
+from src.common.utils.Schedulars_logging import JobMonitor, JobStats, _count_rows
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.jobs = []
+
+    def add_job(self, func, trigger, **kwargs):
+        self.jobs.append((func, trigger, kwargs))
+
+
+class TestCountRows(TestCase):
+
+    def test_counts(self):
+        self.assertEqual(_count_rows(3), 3)
+        self.assertEqual(_count_rows([1, 2]), 2)
+        self.assertEqual(_count_rows({}), 0)
+
+    def test_no_count(self):
+        self.assertIsNone(_count_rows(None))
+        # True is an int, not a number of rows
+        self.assertIsNone(_count_rows(True))
+        self.assertIsNone(_count_rows(object()))
+
+
+class TestJobMonitor(TestCase):
+
+    def setUp(self):
+        self.monitor = JobMonitor()
+        self.monitor.jobs["close"] = JobStats("close")
+        self.stats = self.monitor.jobs["close"]
+
+    def run_job(self, func):
+        with self.assertLogs("src.common.utils.error_handlers", "INFO") as logs:
+            asyncio.run(self.monitor._run("close", func))
+        return logs.output
+
+    def test_add_job_never_overlaps_and_coalesces(self):
+        scheduler = FakeScheduler()
+
+        self.monitor.add_job(scheduler, "open", self.run_job, "interval", seconds=5)
+
+        func, trigger, kwargs = scheduler.jobs[0]
+        self.assertEqual(kwargs["max_instances"], 1)
+        self.assertTrue(kwargs["coalesce"])
+        self.assertIsNone(kwargs["misfire_grace_time"])
+        self.assertEqual(kwargs["id"], "open")
+        self.assertIn("open", self.monitor.jobs)
+
+    def test_overlap_is_counted(self):
+        with self.assertLogs("src.common.utils.error_handlers", "WARNING"):
+            self.monitor._on_event(JobEvent(EVENT_JOB_MAX_INSTANCES, "close", "default"))
+            self.monitor._on_event(JobEvent(EVENT_JOB_MAX_INSTANCES, "close", "default"))
+
+        self.assertEqual(self.stats.skipped_overlaps, 2)
+
+    def test_coalesced_runs_are_counted(self):
+        due = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        times = [due, due + timedelta(seconds=5), due + timedelta(seconds=10)]
+
+        self.monitor._on_event(JobSubmissionEvent(EVENT_JOB_SUBMITTED, "close", "default", times))
+
+        self.assertEqual(self.stats.coalesced, 2)
+        self.assertEqual(self.stats.scheduled_for, times[-1])
+
+    def test_missed_run_is_counted(self):
+        with self.assertLogs("src.common.utils.error_handlers", "WARNING"):
+            self.monitor._on_event(JobExecutionEvent(EVENT_JOB_MISSED, "close", "default", datetime.now(timezone.utc)))
+
+        self.assertEqual(self.stats.missed, 1)
+
+    def test_unknown_job_is_ignored(self):
+        self.monitor._on_event(JobEvent(EVENT_JOB_MAX_INSTANCES, "other", "default"))
+
+        self.assertEqual(self.stats.skipped_overlaps, 0)
+
+    def test_lag_is_measured_from_the_scheduled_time(self):
+        self.stats.scheduled_for = datetime.now(timezone.utc) - timedelta(seconds=30)
+
+        async def job():
+            return 4
+
+        self.run_job(job)
+
+        self.assertGreaterEqual(self.stats.last_lag_seconds, 30)
+        self.assertLess(self.stats.last_lag_seconds, 60)
+        self.assertEqual(self.stats.max_lag_seconds, self.stats.last_lag_seconds)
+
+    def test_successful_runs_add_up_rows(self):
+        results = iter([[1, 2, 3], 2, None])
+
+        async def job():
+            return next(results)
+
+        for _ in range(3):
+            self.run_job(job)
+
+        self.assertEqual((self.stats.runs, self.stats.failures), (3, 0))
+        self.assertEqual(self.stats.rows_total, 5)
+        self.assertIsNone(self.stats.last_rows)
+        self.assertFalse(self.stats.running)
+        self.assertIsNone(self.stats.last_error)
+
+    def test_failure_is_recorded_and_cleared_by_the_next_success(self):
+        async def failing():
+            raise RuntimeError()
+
+        async def job():
+            return 1
+
+        output = self.run_job(failing)
+
+        self.assertEqual((self.stats.runs, self.stats.failures), (1, 1))
+        self.assertEqual(self.stats.last_error, "RuntimeError")
+        self.assertFalse(self.stats.running)
+        self.assertTrue(any("Error running close" in line for line in output))
+
+        self.run_job(job)
+
+        self.assertEqual((self.stats.runs, self.stats.failures), (2, 1))
+        self.assertIsNone(self.stats.last_error)
+        self.assertEqual(self.monitor.stats()["close"]["last_rows"], 1)
@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime
+from unittest import TestCase
+
+from src.db.database import ItemStatus
+from src.db.functions.transitions import TRANSITION_CHANNEL, TransitionScheduler
+
+
+class FakeListener:
+    """ The asyncpg connection side of LISTEN, `notify` delivers a payload like the server would """
+
+    def __init__(self):
+        self.listeners = {}
+
+    def add_listener(self, channel, callback):
+        self.listeners.setdefault(channel, []).append(callback)
+
+    def notify(self, channel, payload: str):
+        for callback in self.listeners.get(channel, []):
+            callback(self, 4242, channel, payload)
+
+
+class TestTransitionNotifications(TestCase):
+
+    def setUp(self):
+        self.scheduler = TransitionScheduler()
+        self.scheduler.reload_requested = False
+        self.listener = FakeListener()
+        self.listener.add_listener(TRANSITION_CHANNEL, self.scheduler._on_notify)
+
+    def test_star_reloads_everything(self):
+        self.listener.notify(TRANSITION_CHANNEL, "*")
+
+        self.assertTrue(self.scheduler.reload_requested)
+        self.assertEqual(self.scheduler.pending, set())
+
+    def test_item_id_is_read_again(self):
+        self.listener.notify(TRANSITION_CHANNEL, "17")
+        self.listener.notify(TRANSITION_CHANNEL, "18")
+
+        self.assertEqual(self.scheduler.pending, {17, 18})
+        self.assertFalse(self.scheduler.reload_requested)
+
+    def test_moved_end_is_scheduled_without_a_read(self):
+        end_time = datetime(2030, 1, 1, 12, 30, 15, 250000)
+
+        self.listener.notify(TRANSITION_CHANNEL, f"17@{end_time.isoformat()}")
+
+        self.assertEqual(self.scheduler.pending, set())
+        self.assertEqual(self.scheduler.queue.next_due(), end_time)
+        due = self.scheduler.queue.pop_due(end_time)
+        self.assertEqual([(item_id, target) for _, item_id, target in due], [(17, ItemStatus.COMPLETED)])
+
+    def test_notify_wakes_the_running_loop(self):
+        self.scheduler.wakeup = asyncio.Event()
+
+        self.listener.notify(TRANSITION_CHANNEL, "17")
+
+        self.assertTrue(self.scheduler.wakeup.is_set())
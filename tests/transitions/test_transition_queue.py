@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+
+from src.db.database import ItemStatus
+from src.db.functions.transitions import TransitionQueue
+
+NOW = datetime(2025, 1, 1, 12, 0, 0)
+
+
+class TestTransitionQueue(TestCase):
+
+    def test_fires_in_time_order(self):
+        queue = TransitionQueue()
+        queue.schedule(1, NOW + timedelta(minutes=5), NOW + timedelta(minutes=30))
+        queue.schedule(2, NOW + timedelta(minutes=1), NOW + timedelta(minutes=10))
+
+        self.assertEqual(queue.next_due(), NOW + timedelta(minutes=1))
+        due = queue.pop_due(NOW + timedelta(minutes=10))
+
+        self.assertEqual([(item_id, target) for _, item_id, target in due], [
+            (2, ItemStatus.LIVE), (1, ItemStatus.LIVE), (2, ItemStatus.COMPLETED),
+        ])
+        self.assertEqual(len(queue), 1)
+
+    def test_nothing_due_yet(self):
+        queue = TransitionQueue()
+        queue.schedule(1, NOW + timedelta(minutes=5), NOW + timedelta(minutes=30))
+
+        self.assertEqual(queue.pop_due(NOW), [])
+
+    def test_reschedule_replaces_old_times(self):
+        queue = TransitionQueue()
+        queue.schedule(1, NOW, NOW + timedelta(minutes=10))
+        queue.schedule(1, NOW, NOW + timedelta(minutes=20))
+
+        due = queue.pop_due(NOW + timedelta(minutes=15))
+
+        self.assertEqual([target for _, _, target in due], [ItemStatus.LIVE])
+        self.assertEqual(queue.next_due(), NOW + timedelta(minutes=20))
+
+    def test_cancel(self):
+        queue = TransitionQueue()
+        queue.schedule(1, NOW, NOW + timedelta(minutes=10))
+        queue.cancel(1)
+
+        self.assertIsNone(queue.next_due())
+        self.assertEqual(queue.pop_due(NOW + timedelta(days=1)), [])
+
+    def test_load_replaces_everything(self):
+        queue = TransitionQueue()
+        queue.schedule(1, NOW, NOW + timedelta(minutes=10))
+        queue.load([(2, None, NOW + timedelta(minutes=5))])
+
+        due = queue.pop_due(NOW + timedelta(hours=1))
+
+        self.assertEqual([(item_id, target) for _, item_id, target in due], [(2, ItemStatus.COMPLETED)])
+
+    def test_start_and_end_at_the_same_time(self):
+        queue = TransitionQueue()
+        queue.schedule(1, NOW, NOW)
+        queue.load([(1, NOW, NOW), (2, NOW, NOW)])
+        due = queue.pop_due(NOW)
+
+        self.assertEqual([(item_id, target) for _, item_id, target in due], [
+            (1, ItemStatus.LIVE), (1, ItemStatus.COMPLETED), (2, ItemStatus.LIVE), (2, ItemStatus.COMPLETED),
+        ])